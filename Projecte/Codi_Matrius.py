@@ -1,12 +1,18 @@
 import csv
+import json
 import os
+from array import array
 import numpy as np
 import scipy.sparse as sp
 from typing import List, Dict, Optional, Union, Tuple
 from abc import ABC, abstractmethod
+from utilitats import (IngestaIncremental, _llegir_blocs, _llegir_valoracions_massiu, _dtype_isbn, _index_ordenat,
+                       _buscar_idx, _mostrar_informe, MAX_ELEMENTS_BLOC, _mida_bloc, _top_n_files, _top_n_no_valorats)
 
 # === CLASSES BASE ===
 class Usuari:
+    __slots__ = ('_id', '_location', '_age')
+
     def __init__(self, user_id: int, location: str, age: float):
         self._id = user_id
         self._location = location
@@ -16,6 +22,8 @@ class Usuari:
         return self._id
 
 class Item(ABC):
+    __slots__ = ('_id', '_titol', '_categoria')
+
     def __init__(self, item_id: Union[int, str], titol: str, categoria: str):
         self._id = item_id
         self._titol = titol
@@ -32,6 +40,8 @@ class Item(ABC):
 
 # === CLASSES ESPECÍFIQUES ===
 class Llibre(Item):
+    __slots__ = ('_any', '_autor', '_editorial')
+
     def __init__(self, item_id: str, titol: str, any_publicacio: int, autor: str, editorial: str = "Desconeguda"):
         super().__init__(item_id, titol, "Llibre")
         self._any = any_publicacio
@@ -42,6 +52,8 @@ class Llibre(Item):
         return f"Autor: {self._autor}, Any: {self._any}, Editorial: {self._editorial}"
 
 class Peli(Item):
+    __slots__ = ('_genere', '_imdb_id', '_tmdb_id')
+
     def __init__(self, item_id: int, titol: str, genere: str, imdb_id: int = 0, tmdb_id: int = 0):
         super().__init__(item_id, titol, "Peli")
         self._genere = genere
@@ -51,20 +63,622 @@ class Peli(Item):
     def get_info(self) -> str:
         return f"Gènere: {self._genere}, IMDb: {self._imdb_id}"
 
+# === CACHE BINÀRIA ===
+VERSIO_CACHE = 3
+
+def _signatura_fonts(fonts: List[str]) -> Dict[str, List[int]]:
+    # La cache és vàlida mentre cap fitxer font canviï de mida o data de modificació
+    signatura = {}
+    for font in fonts:
+        info = os.stat(font)
+        signatura[os.path.abspath(font)] = [info.st_size, info.st_mtime_ns]
+    return signatura
+
+def _desar_npy(path: str, array: np.ndarray):
+    # S'escriu a un fitxer temporal i se substitueix d'un cop: el fitxer antic pot estar mapat en
+    # memòria (cache o factors carregats amb mmap) i np.save no el pot sobreescriure mentre el llegeix
+    temporal = path + '.tmp'
+    with open(temporal, 'wb') as f:
+        np.save(f, np.ascontiguousarray(array))
+    os.replace(temporal, path)
+
+def _textos_a_columna(textos: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    # Columna de text com a bytes UTF-8 concatenats + desplaçaments
+    codificats = [t.encode('utf-8') for t in textos]
+    offsets = np.zeros(len(codificats) + 1, dtype=np.int64)
+    np.cumsum([len(c) for c in codificats], out=offsets[1:])
+    return np.frombuffer(b''.join(codificats), dtype=np.uint8), offsets
+
+def _columna_a_textos(bytes_col: np.ndarray, offsets: np.ndarray) -> List[str]:
+    buffer = bytes_col.tobytes()
+    return [buffer[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(offsets) - 1)]
+
+def _posicions_csc(matriu: sp.csc_matrix, files: np.ndarray, columnes: np.ndarray) -> np.ndarray:
+    # Posició a data de cada parella (fila, columna) de l'estructura de la CSC canònica, o -1 si
+    # no hi és (encara que hi hagi un 0 desat). Cerca binària vectoritzada dins de cada columna
+    inici = matriu.indptr[columnes].astype(np.int64)
+    final = matriu.indptr[columnes + 1].astype(np.int64)
+    baix, dalt = inici.copy(), final.copy()
+    while True:
+        actius = baix < dalt
+        if not actius.any():
+            break
+        mig = (baix + dalt) // 2
+        menor = actius & (matriu.indices[np.minimum(mig, matriu.indices.size - 1)] < files)
+        baix = np.where(menor, mig + 1, baix)
+        dalt = np.where(actius & ~menor, mig, dalt)
+    trobades = baix < final
+    trobades[trobades] = matriu.indices[baix[trobades]] == files[trobades]
+    return np.where(trobades, baix, -1)
+
+# === CATÀLEG D'ÍTEMS ===
+# Esquemes: camp -> (tipus, valor per defecte). 'text' es desa com a bytes UTF-8 + desplaçaments,
+# 'codi' com a codis int32 d'un vocabulari internat (textos molt repetits) i la resta com a
+# array NumPy del tipus indicat
+ESQUEMA_LLIBRES = {'titol': ('text', ''), 'any': (np.int32, 0), 'autor': ('codi', 'Desconegut'),
+                   'editorial': ('codi', 'Desconeguda')}
+ESQUEMA_PELIS = {'titol': ('text', ''), 'genere': ('codi', '(no genres listed)'), 'imdb': (np.int64, 0),
+                 'tmdb': (np.int64, 0)}
+
+class Cataleg:
+    # Fitxes dels ítems en columnes (struct-of-arrays), una posició per índex d'ítem. Mentre es
+    # construeix cada columna és una llista; tancar() la converteix al format compacte. Els
+    # objectes Item només es creen com a vistes quan se'n demana un (Dades.get_item_per_idx)
+    __slots__ = ('_esquema', '_columnes', '_vocabularis', '_mida')
+
+    def __init__(self, esquema: Dict[str, Tuple[object, object]]):
+        self._esquema = esquema
+        self._columnes: Dict[str, object] = {camp: [] for camp in esquema}
+        # Durant la construcció, text -> codi; un cop tancat, array codi -> text
+        self._vocabularis: Dict[str, object] = {camp: {} for camp, (tipus, _) in esquema.items() if tipus == 'codi'}
+        self._mida = 0
+
+    def __len__(self) -> int:
+        return self._mida
+
+    def afegir(self, idx: int, camps: Dict[str, object]):
+        # Fila nova si idx és la següent; si no, se substitueix la fila idx (ítem repetit)
+        for camp, (tipus, defecte) in self._esquema.items():
+            valor = camps.get(camp, defecte)
+            if tipus == 'codi':
+                vocabulari = self._vocabularis[camp]
+                valor = vocabulari.setdefault(valor, len(vocabulari))
+            columna = self._columnes[camp]
+            if idx == len(columna):
+                columna.append(valor)
+            else:
+                columna[idx] = valor
+        self._mida = max(self._mida, idx + 1)
+
+    def tancar(self):
+        for camp, (tipus, _) in self._esquema.items():
+            columna = self._columnes[camp]
+            if tipus == 'text':
+                self._columnes[camp] = _textos_a_columna(columna)
+            elif tipus == 'codi':
+                self._columnes[camp] = np.asarray(columna, dtype=np.int32)
+                textos = np.empty(len(self._vocabularis[camp]), dtype=object)
+                textos[:] = list(self._vocabularis[camp])
+                self._vocabularis[camp] = textos
+            else:
+                self._columnes[camp] = np.asarray(columna, dtype=tipus)
+
+    def ampliar(self, files: List[Dict[str, object]]):
+        # Files noves al final d'un catàleg tancat (ítems que arriben amb afegir_valoracions)
+        for camp, (tipus, defecte) in self._esquema.items():
+            valors = [fila.get(camp, defecte) for fila in files]
+            columna = self._columnes[camp]
+            if tipus == 'text':
+                bytes_nous, offsets_nous = _textos_a_columna(valors)
+                self._columnes[camp] = (np.concatenate([columna[0], bytes_nous]),
+                                        np.concatenate([columna[1], offsets_nous[1:] + columna[1][-1]]))
+            elif tipus == 'codi':
+                vocabulari = {text: codi for codi, text in enumerate(self._vocabularis[camp].tolist())}
+                codis = [vocabulari.setdefault(valor, len(vocabulari)) for valor in valors]
+                textos = np.empty(len(vocabulari), dtype=object)
+                textos[:] = list(vocabulari)
+                self._vocabularis[camp] = textos
+                self._columnes[camp] = np.concatenate([columna, np.asarray(codis, dtype=np.int32)])
+            else:
+                self._columnes[camp] = np.concatenate([columna, np.asarray(valors, dtype=tipus)])
+        self._mida += len(files)
+
+    def valor(self, camp: str, idx: int):
+        tipus = self._esquema[camp][0]
+        columna = self._columnes[camp]
+        if tipus == 'text':
+            bytes_col, offsets = columna
+            return bytes_col[offsets[idx]:offsets[idx + 1]].tobytes().decode('utf-8')
+        if tipus == 'codi':
+            return self._vocabularis[camp][columna[idx]]
+        return columna[idx].item()
+
+    def valors(self, camp: str) -> List:
+        # Columna sencera com a llista de valors Python
+        tipus = self._esquema[camp][0]
+        columna = self._columnes[camp]
+        if tipus == 'text':
+            return _columna_a_textos(*columna)
+        if tipus == 'codi':
+            return self._vocabularis[camp][columna].tolist()
+        return columna.tolist()
+
+    def assignar(self, camp: str, idx: int, valor):
+        # Només per a columnes numèriques d'un catàleg tancat
+        self._columnes[camp][idx] = valor
+
+    def columnes(self) -> Dict[str, np.ndarray]:
+        # Arrays per a la cache binària
+        sortida = {}
+        for camp, (tipus, _) in self._esquema.items():
+            columna = self._columnes[camp]
+            if tipus == 'text':
+                sortida[camp + '_bytes'], sortida[camp + '_offsets'] = columna
+            elif tipus == 'codi':
+                sortida[camp] = columna
+                sortida[camp + '_vocab_bytes'], sortida[camp + '_vocab_offsets'] = _textos_a_columna(
+                    self._vocabularis[camp].tolist())
+            else:
+                sortida[camp] = columna
+        return sortida
+
+    @classmethod
+    def restaurar(cls, esquema: Dict[str, Tuple[object, object]], llegir) -> 'Cataleg':
+        # Inversa de columnes(): els textos es queden mapats; codis i numèriques es copien perquè
+        # s'hi pugui escriure (enllaços, ampliacions)
+        cataleg = cls(esquema)
+        for camp, (tipus, _) in esquema.items():
+            if tipus == 'text':
+                cataleg._columnes[camp] = (llegir(camp + '_bytes'), llegir(camp + '_offsets'))
+                cataleg._mida = len(cataleg._columnes[camp][1]) - 1
+            elif tipus == 'codi':
+                cataleg._columnes[camp] = np.array(llegir(camp))
+                cataleg._mida = len(cataleg._columnes[camp])
+                textos = np.empty(len(llegir(camp + '_vocab_offsets')) - 1, dtype=object)
+                textos[:] = _columna_a_textos(llegir(camp + '_vocab_bytes'), llegir(camp + '_vocab_offsets'))
+                cataleg._vocabularis[camp] = textos
+            else:
+                cataleg._columnes[camp] = np.array(llegir(camp))
+                cataleg._mida = len(cataleg._columnes[camp])
+        return cataleg
+
+SEGONS_DIA = 86_400
+
 # === CLASSE ABSTRACTA DADES ===
-class Dades(ABC):
+class Dades(IngestaIncremental, ABC):
+    _esquema: Dict[str, Tuple[object, object]] = {}  # Camps del catàleg d'ítems de cada subclasse
+
     def __init__(self):
         self._ratings_matrix = sp.csc_matrix((0, 0), dtype=np.float32)
+        self._ratings_csr = None  # (matriu d'origen, còpia CSR)
         self._users: Dict[int, Usuari] = {}  # Optimització amb diccionari
-        self._items: Dict[Union[int, str], Item] = {} 
+        self._cataleg = Cataleg(self._esquema)  # Fitxes dels ítems per índex
         self._user_id_to_idx: Dict[int, int] = {}
         self._item_id_to_idx: Dict[Union[int, str], int] = {}
+        # Índex d'estadístiques per ítem (es calcula un cop en carregar valoracions)
+        self._num_vots = np.zeros(0, dtype=np.int64)
+        self._suma_valoracions = np.zeros(0, dtype=np.float64)
+        self._mitjana_global = 0.0
+        self._idx_to_item_id = np.empty(0, dtype=object)
+        self._massiu = False
+        self._informe_valoracions: Dict[str, int] = {}
+        # Valoracions noves pendents de fusionar amb la matriu base: (user_idx, item_idx) -> valoració
+        self._pendents: Dict[Tuple[int, int], float] = {}
+        # Versió global de la matriu i de cada fila/columna, per actualitzar càlculs derivats
+        self._versio_matriu = 0
+        self._versions_usuaris = np.zeros(0, dtype=np.int64)
+        self._versions_items = np.zeros(0, dtype=np.int64)
+        # Timestamp de cada valoració, alineat amb _ratings_matrix.data (None si la font no en té)
+        self._timestamps: Optional[np.ndarray] = None
+        self._timestamps_pendents: Dict[Tuple[int, int], int] = {}
+        self._timestamps_csr = None  # (matriu CSR, timestamps en l'ordre de les seves dades)
+        self._index_temporal = None  # (matriu d'origen, posicions ordenades per timestamp, timestamps ordenats)
+        # Etiquetes: vocabulari internat (etiqueta normalitzada -> columna) i recomptes dispersos
+        self._vocabulari_tags: Dict[str, int] = {}
+        self._tags = np.empty(0, dtype=object)
+        self._items_tags: Optional[sp.csr_matrix] = None  # ítems x etiquetes
+        self._usuaris_tags: Optional[sp.csr_matrix] = None  # usuaris x etiquetes
+        self._index_tags = None  # (matriu ítems x etiquetes d'origen, índex invertit en CSC)
 
     def get_usuari(self, user_id: int) -> Optional[Usuari]:
         return self._users.get(user_id)
 
     def get_item(self, item_id: Union[int, str]) -> Optional[Item]:
-        return self._items.get(item_id)
+        idx = self._item_id_to_idx.get(item_id)
+        return None if idx is None else self._item_vista(idx)
+
+    def get_item_per_idx(self, idx: int) -> Optional[Item]:
+        return self._item_vista(idx) if 0 <= idx < len(self._idx_to_item_id) else None
+
+    def get_item_id_per_idx(self, idx: int) -> Optional[Union[int, str]]:
+        return self._idx_to_item_id[idx] if 0 <= idx < len(self._idx_to_item_id) else None
+
+    def _iniciar_items(self):
+        self._item_id_to_idx = {}
+        self._idx_to_item_id = []
+        self._cataleg = Cataleg(self._esquema)
+
+    def _registrar_item(self, item_id: Union[int, str], **camps):
+        # Índexs densos en ordre de lectura; un ítem repetit conserva el seu índex i se'n
+        # substitueix la fitxa
+        idx = self._item_id_to_idx.get(item_id)
+        if idx is None:
+            idx = len(self._idx_to_item_id)
+            self._item_id_to_idx[item_id] = idx
+            self._idx_to_item_id.append(item_id)
+        self._cataleg.afegir(idx, camps)
+
+    def _tancar_items(self):
+        # Taula idx -> item_id i catàleg en columnes, compartits per tots els recomanadors
+        ids = np.empty(len(self._idx_to_item_id), dtype=object)
+        ids[:] = self._idx_to_item_id
+        self._idx_to_item_id = ids
+        self._cataleg.tancar()
+
+    def _restaurar_cataleg(self, ids: List[Union[int, str]], llegir):
+        # Ítems des de la cache: ids en ordre d'índex i columnes del catàleg ja compactes
+        self._item_id_to_idx = {item_id: idx for idx, item_id in enumerate(ids)}
+        self._idx_to_item_id = np.empty(len(ids), dtype=object)
+        self._idx_to_item_id[:] = ids
+        self._cataleg = Cataleg.restaurar(self._esquema, lambda nom: llegir('item_' + nom))
+
+    def _columnes_cataleg(self) -> Dict[str, np.ndarray]:
+        return {'item_' + nom: columna for nom, columna in self._cataleg.columnes().items()}
+
+    def get_rating_matrix_csr(self) -> sp.csr_matrix:
+        # Còpia per files (usuaris) que es refà només si canvia la matriu de valoracions
+        if self._ratings_csr is None or self._ratings_csr[0] is not self._ratings_matrix:
+            self._ratings_csr = (self._ratings_matrix, self._ratings_matrix.tocsr())
+        return self._ratings_csr[1]
+
+    # ---- Timestamps ----
+    def get_timestamps(self) -> Optional[np.ndarray]:
+        return self._timestamps
+
+    def get_timestamps_csr(self) -> Optional[np.ndarray]:
+        # Timestamps en l'ordre de get_rating_matrix_csr().data: la mateixa conversió CSC -> CSR
+        # aplicada a les posicions dona la permutació
+        if self._timestamps is None:
+            return None
+        per_files = self.get_rating_matrix_csr()
+        if self._timestamps_csr is None or self._timestamps_csr[0] is not per_files:
+            base = self._ratings_matrix
+            posicions = sp.csc_matrix((np.arange(base.nnz, dtype=np.int64), base.indices, base.indptr),
+                                      shape=base.shape).tocsr().data
+            self._timestamps_csr = (per_files, self._timestamps[posicions])
+        return self._timestamps_csr[1]
+
+    def timestamp_maxim(self) -> int:
+        return int(self._timestamps.max()) if self._timestamps is not None and self._timestamps.size else 0
+
+    def _ordre_temporal(self) -> Tuple[np.ndarray, np.ndarray]:
+        # Índex de les valoracions ordenades per timestamp; es refà només si canvia la matriu
+        if self._index_temporal is None or self._index_temporal[0] is not self._ratings_matrix:
+            ordre = np.argsort(self._timestamps, kind='stable')
+            self._index_temporal = (self._ratings_matrix, ordre, self._timestamps[ordre])
+        return self._index_temporal[1], self._index_temporal[2]
+
+    def posicions_finestra(self, desde: int, fins: Optional[int] = None) -> np.ndarray:
+        # Posicions (dins de _ratings_matrix.data) de les valoracions amb timestamp a [desde, fins),
+        # amb dues cerques binàries sobre l'índex temporal
+        if self._timestamps is None:
+            return np.empty(0, dtype=np.int64)
+        ordre, ordenats = self._ordre_temporal()
+        inici = np.searchsorted(ordenats, desde, side='left')
+        final = ordenats.size if fins is None else np.searchsorted(ordenats, fins, side='left')
+        return ordre[inici:final]
+
+    def matriu_finestra(self, desde: int, fins: Optional[int] = None) -> sp.csc_matrix:
+        # Submatriu (mateixa forma i índexs) amb només les valoracions de la finestra
+        base = self._ratings_matrix
+        posicions = np.sort(self.posicions_finestra(desde, fins))
+        indptr = np.searchsorted(posicions, base.indptr, side='left')
+        return sp.csc_matrix((base.data[posicions], base.indices[posicions], indptr), shape=base.shape)
+
+    def _alinear_timestamps(self, files: np.ndarray, columnes: np.ndarray, timestamps: np.ndarray):
+        # Ordena els timestamps com les dades de la CSC canònica (columna, fila); les parelles
+        # repetides, que tocsc suma en una sola entrada, es queden amb el timestamp més recent
+        claus = columnes.astype(np.int64) * self._ratings_matrix.shape[0] + files
+        ordre = np.argsort(claus, kind='stable')
+        claus = claus[ordre]
+        if claus.size == 0:
+            self._timestamps = np.empty(0, dtype=np.int64)
+            return
+        inicis = np.flatnonzero(np.concatenate([[True], claus[1:] != claus[:-1]]))
+        self._timestamps = np.maximum.reduceat(timestamps.astype(np.int64)[ordre], inicis)
+
+    # ---- Etiquetes ----
+    @staticmethod
+    def _normalitzar_tag(tag: str) -> str:
+        return " ".join(tag.lower().split())
+
+    def _construir_tags(self, files_items: np.ndarray, files_usuaris: np.ndarray, columnes: np.ndarray,
+                        vocabulari: Dict[str, int]):
+        # Una aplicació d'etiqueta per entrada; coo -> csr suma les repetides en recomptes
+        num_tags = len(vocabulari)
+        num_items = max(self._ratings_matrix.shape[1], len(self._idx_to_item_id))
+        num_usuaris = max(self._ratings_matrix.shape[0], len(self._user_id_to_idx))
+        self._vocabulari_tags = vocabulari
+        self._tags = np.empty(num_tags, dtype=object)
+        self._tags[:] = list(vocabulari)
+        self._items_tags = sp.csr_matrix((np.ones(columnes.size, dtype=np.float32), (files_items, columnes)),
+                                         shape=(num_items, num_tags))
+        coneguts = files_usuaris >= 0
+        self._usuaris_tags = sp.csr_matrix(
+            (np.ones(int(np.count_nonzero(coneguts)), dtype=np.float32), (files_usuaris[coneguts], columnes[coneguts])),
+            shape=(num_usuaris, num_tags))
+        self._index_tags = None
+
+    @staticmethod
+    def _ampliar_files(matriu: sp.csr_matrix, num_files: int) -> sp.csr_matrix:
+        indptr = np.concatenate([matriu.indptr, np.full(num_files - matriu.shape[0], matriu.indptr[-1],
+                                                        dtype=matriu.indptr.dtype)])
+        return sp.csr_matrix((matriu.data, matriu.indices, indptr), shape=(num_files, matriu.shape[1]), copy=False)
+
+    def get_matriu_tags_items(self) -> Optional[sp.csr_matrix]:
+        # Ítems x etiquetes amb una fila per columna de la matriu de valoracions: els ítems
+        # afegits després de carregar les etiquetes hi surten sense cap etiqueta
+        if self._items_tags is not None and self._items_tags.shape[0] < self._ratings_matrix.shape[1]:
+            self._items_tags = self._ampliar_files(self._items_tags, self._ratings_matrix.shape[1])
+        return self._items_tags
+
+    def get_matriu_tags_usuaris(self) -> Optional[sp.csr_matrix]:
+        if self._usuaris_tags is not None and self._usuaris_tags.shape[0] < self._ratings_matrix.shape[0]:
+            self._usuaris_tags = self._ampliar_files(self._usuaris_tags, self._ratings_matrix.shape[0])
+        return self._usuaris_tags
+
+    def items_amb_tags(self, tags: List[str], totes: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+        # Ítems que tenen totes les etiquetes (o alguna, amb totes=False) i quantes vegades els
+        # n'han posat, ordenats de més a menys. Les llistes d'ítems de cada etiqueta surten de
+        # l'índex invertit (les columnes de la CSC) i la intersecció comença per la més curta
+        buit = np.empty(0, dtype=np.int64)
+        matriu = self.get_matriu_tags_items()
+        if matriu is None:
+            return buit, buit
+        if self._index_tags is None or self._index_tags[0] is not matriu:
+            self._index_tags = (matriu, matriu.tocsc())
+        index = self._index_tags[1]
+        columnes = [self._vocabulari_tags.get(self._normalitzar_tag(tag), -1) for tag in tags]
+        if totes and -1 in columnes:
+            return buit, buit
+        columnes = sorted({c for c in columnes if c >= 0}, key=lambda c: index.indptr[c + 1] - index.indptr[c])
+        if not columnes:
+            return buit, buit
+        llistes = [index.indices[index.indptr[c]:index.indptr[c + 1]] for c in columnes]
+        if totes:
+            items = llistes[0]
+            for llista in llistes[1:]:
+                items = np.intersect1d(items, llista, assume_unique=True)
+        else:
+            items = np.unique(np.concatenate(llistes))
+        items = items.astype(np.int64)
+        comptes = np.asarray(matriu[items][:, columnes].sum(axis=1)).ravel().astype(np.int64)
+        ordre = np.lexsort((items, -comptes))
+        return items[ordre], comptes[ordre]
+
+    def _calcular_estadistiques_items(self):
+        # Vots i suma de valoracions per columna directament de l'estructura CSC
+        matriu = self._ratings_matrix
+        self._num_vots = np.diff(matriu.indptr).astype(np.int64)
+        self._suma_valoracions = np.asarray(matriu.sum(axis=0, dtype=np.float64)).ravel()
+        self._mitjana_global = float(np.mean(matriu.data, dtype=np.float64)) if matriu.data.size > 0 else 0.0
+        # La matriu s'ha carregat sencera: tot és nou i no queda res pendent
+        self._pendents = {}
+        self._timestamps_pendents = {}
+        self._versio_matriu += 1
+        self._versions_usuaris = np.full(matriu.shape[0], self._versio_matriu, dtype=np.int64)
+        self._versions_items = np.full(matriu.shape[1], self._versio_matriu, dtype=np.int64)
+
+    # ---- Ingesta incremental (afegir_valoracions és a IngestaIncremental) ----
+    def _usuari_nou(self, user_id: int) -> Usuari:
+        return Usuari(user_id, "", 0.0)
+
+    def _registrar_items_nous(self, item_ids: List[Union[int, str]]):
+        self._cataleg.ampliar([self._fitxa_item_nou(item_id) for item_id in item_ids])
+
+    def _timestamp_per_defecte(self) -> int:
+        # El més recent de les dades (base i pendents): una valoració sense timestamp compta com
+        # la darrera de les dades i no mou el moment de referència de RecomanadorRecent
+        if self._timestamps is None:
+            return super()._timestamp_per_defecte()
+        maxim = max(self.timestamp_maxim(), max(self._timestamps_pendents.values(), default=0))
+        return maxim if maxim > 0 else super()._timestamp_per_defecte()
+
+    def _valoracions_afegides(self, files: np.ndarray, columnes: np.ndarray, valors: np.ndarray,
+                              anteriors: np.ndarray, timestamps: np.ndarray):
+        # Les estadístiques per ítem s'actualitzen al moment, sense esperar la fusió
+        if self._timestamps is not None:
+            self._timestamps_pendents.update(zip(zip(files.tolist(), columnes.tolist()), timestamps.tolist()))
+        pendent = ~np.isnan(anteriors)
+        nova = ~pendent
+        if nova.any():
+            # A la base hi ha valoració si la parella és a l'estructura, encara que valgui 0
+            posicions = _posicions_csc(self._ratings_matrix, files[~pendent], columnes[~pendent])
+            a_la_base = posicions >= 0
+            base = np.zeros(posicions.size)
+            base[a_la_base] = self._ratings_matrix.data[posicions[a_la_base]]
+            anteriors[~pendent] = base
+            nova[~pendent] = ~a_la_base
+        # Un vot nou per cada parella sense valoració anterior, ni a la base ni pendent;
+        # si ja n'hi havia, només canvia la suma
+        np.add.at(self._num_vots, columnes, nova)
+        np.add.at(self._suma_valoracions, columnes, valors - anteriors)
+        total_vots = int(self._num_vots.sum())
+        self._mitjana_global = float(self._suma_valoracions.sum() / total_vots) if total_vots else 0.0
+
+    def _ampliar_matriu(self, num_files: int, num_columnes: int):
+        # Files i columnes buides al final sense copiar les dades: només creix indptr.
+        # Si la còpia CSR és vigent també s'amplia, per no haver-la de refer
+        base = self._ratings_matrix
+        columnes_noves = num_columnes - base.shape[1]
+        indptr = np.concatenate([base.indptr, np.full(columnes_noves, base.indptr[-1], dtype=base.indptr.dtype)])
+        ampliada = sp.csc_matrix((base.data, base.indices, indptr), shape=(num_files, num_columnes), copy=False)
+        if self._ratings_csr is not None and self._ratings_csr[0] is base:
+            csr = self._ratings_csr[1]
+            indptr = np.concatenate([csr.indptr, np.full(num_files - csr.shape[0], csr.indptr[-1], dtype=csr.indptr.dtype)])
+            self._ratings_csr = (ampliada, sp.csr_matrix((csr.data, csr.indices, indptr),
+                                                         shape=(num_files, num_columnes), copy=False))
+            if self._timestamps_csr is not None and self._timestamps_csr[0] is csr:
+                self._timestamps_csr = (self._ratings_csr[1], self._timestamps_csr[1])
+        # Les posicions de data no canvien: l'índex temporal continua sent vàlid
+        if self._index_temporal is not None and self._index_temporal[0] is base:
+            self._index_temporal = (ampliada,) + self._index_temporal[1:]
+        self._ratings_matrix = ampliada
+        self._num_vots = np.concatenate([self._num_vots, np.zeros(columnes_noves, dtype=np.int64)])
+        self._suma_valoracions = np.concatenate([self._suma_valoracions, np.zeros(columnes_noves)])
+        self._versio_matriu += 1
+        self._versions_usuaris = np.concatenate([
+            self._versions_usuaris,
+            np.full(num_files - self._versions_usuaris.size, self._versio_matriu, dtype=np.int64)])
+        self._versions_items = np.concatenate([
+            self._versions_items, np.full(columnes_noves, self._versio_matriu, dtype=np.int64)])
+
+    def fusionar_valoracions(self):
+        # Les pendents s'incorporen a la CSC canònica en una passada: les parelles que ja hi són
+        # se sobreescriuen al seu lloc i les noves s'insereixen a la posició que els toca per
+        # (columna, fila). Els timestamps segueixen exactament les mateixes posicions
+        if not self._pendents:
+            return
+        files, columnes, valors = self._claus_pendents()
+        timestamps = np.fromiter((self._timestamps_pendents.get(clau, 0) for clau in self._pendents),
+                                 dtype=np.int64, count=len(self._pendents))
+        base = self._ratings_matrix
+        num_files, num_columnes = base.shape
+        claus_base = np.repeat(np.arange(num_columnes, dtype=np.int64), np.diff(base.indptr)) * num_files
+        claus_base += base.indices
+        claus_noves = columnes * num_files + files
+        ordre = np.argsort(claus_noves)
+        claus_noves, files, columnes = claus_noves[ordre], files[ordre], columnes[ordre]
+        valors, timestamps = valors[ordre], timestamps[ordre]
+        posicions = np.searchsorted(claus_base, claus_noves)
+        existents = posicions < claus_base.size
+        existents[existents] = claus_base[posicions[existents]] == claus_noves[existents]
+        noves = ~existents
+        data = np.array(base.data, dtype=np.float32)
+        data[posicions[existents]] = valors[existents]
+        data = np.insert(data, posicions[noves], valors[noves])
+        indices = np.insert(base.indices, posicions[noves], files[noves])
+        # Cada columna es desplaça tantes posicions com valoracions noves hi ha a les anteriors
+        indptr = base.indptr + np.searchsorted(columnes[noves], np.arange(num_columnes + 1), side='left')
+        if self._timestamps is not None:
+            actuals = self._timestamps.copy()
+            actuals[posicions[existents]] = timestamps[existents]
+            self._timestamps = np.insert(actuals, posicions[noves], timestamps[noves])
+        self._ratings_matrix = sp.csc_matrix((data, indices, indptr), shape=base.shape)
+        self._pendents = {}
+        self._timestamps_pendents = {}
+        self._versio_matriu += 1
+        self._versions_usuaris[files] = self._versio_matriu
+        self._versions_items[columnes] = self._versio_matriu
+
+    def _valoracio_valida(self, rating: float) -> bool:
+        return True
+
+    def _convertir_item_id(self, item_id) -> Union[int, str]:
+        return item_id
+
+    def _fitxa_item_nou(self, item_id: Union[int, str]) -> Dict[str, object]:
+        # Camps del catàleg per a un ítem que arriba amb una valoració abans que la seva fitxa
+        return {'titol': "(sense títol)"}
+
+    @abstractmethod
+    def _item_vista(self, idx: int) -> Item:
+        # Objecte Item creat al moment a partir de la fila idx del catàleg
+        pass
+
+    def _directori_cache(self) -> str:
+        return os.path.join(self._path, '.cache')
+
+    def desar_cache(self, fonts: List[str]):
+        self.fusionar_valoracions()
+        directori = self._directori_cache()
+        manifest_path = os.path.join(directori, 'manifest.json')
+        try:
+            os.makedirs(directori, exist_ok=True)
+            # Primer s'invalida el manifest perquè una escriptura a mitges no es llegeixi mai
+            if os.path.exists(manifest_path):
+                os.remove(manifest_path)
+            columnes = {
+                'data': self._ratings_matrix.data,
+                'indices': self._ratings_matrix.indices,
+                'indptr': self._ratings_matrix.indptr,
+            }
+            if self._timestamps is not None:
+                columnes['timestamps'] = self._timestamps
+            usuaris = list(self._users.values())
+            columnes['user_id'] = np.array([u.get_id() for u in usuaris], dtype=np.int64)
+            columnes['user_idx'] = np.array([self._user_id_to_idx.get(u.get_id(), -1) for u in usuaris], dtype=np.int64)
+            columnes['user_age'] = np.array([u._age for u in usuaris], dtype=np.float64)
+            textos = {'user_location': [u._location for u in usuaris]}
+            cols_items, textos_items = self._columnes_items()
+            columnes.update(cols_items)
+            textos.update(textos_items)
+            for nom, text in textos.items():
+                columnes[nom + '_bytes'], columnes[nom + '_offsets'] = _textos_a_columna(text)
+            for nom, columna in columnes.items():
+                _desar_npy(os.path.join(directori, nom + '.npy'), columna)
+            manifest = {
+                'versio': VERSIO_CACHE,
+                'classe': type(self).__name__,
+                'fonts': _signatura_fonts(fonts),
+                'shape': list(self._ratings_matrix.shape),
+                'timestamps': self._timestamps is not None,
+                'textos': sorted(textos),
+            }
+            # El manifest va l'últim i també se substitueix d'un cop
+            with open(manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(manifest, f)
+            os.replace(manifest_path + '.tmp', manifest_path)
+        except OSError as e:
+            print(f"Error desant la cache a {directori}: {str(e)}")
+
+    def carregar_cache(self, fonts: List[str]) -> bool:
+        # Retorna False si no hi ha cache o si algun fitxer font ha canviat
+        directori = self._directori_cache()
+        manifest_path = os.path.join(directori, 'manifest.json')
+        if not os.path.exists(manifest_path):
+            return False
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if (manifest.get('versio') != VERSIO_CACHE or manifest.get('classe') != type(self).__name__
+                    or manifest.get('fonts') != _signatura_fonts(fonts)):
+                return False
+
+            def llegir(nom: str) -> np.ndarray:
+                return np.load(os.path.join(directori, nom + '.npy'), mmap_mode='r')
+
+            columnes = {nom: llegir(nom) for nom in ('user_id', 'user_idx', 'user_age')}
+            textos = {nom: _columna_a_textos(llegir(nom + '_bytes'), llegir(nom + '_offsets'))
+                      for nom in manifest['textos']}
+            ratings = sp.csc_matrix(
+                (llegir('data'), llegir('indices'), llegir('indptr')),
+                shape=tuple(manifest['shape']), copy=False
+            )
+            timestamps = llegir('timestamps') if manifest.get('timestamps') else None
+            self._users = {}
+            self._user_id_to_idx = {}
+            for user_id, user_idx, age, location in zip(columnes['user_id'].tolist(), columnes['user_idx'].tolist(),
+                                                         columnes['user_age'].tolist(), textos['user_location']):
+                self._users[user_id] = Usuari(user_id, location, age)
+                if user_idx >= 0:
+                    self._user_id_to_idx[user_id] = user_idx
+            self._restaurar_items(llegir, textos)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Cache no vàlida a {directori}: {str(e)}")
+            return False
+        self._ratings_matrix = ratings
+        self._timestamps = timestamps
+        self._calcular_estadistiques_items()
+        return True
+
+    @abstractmethod
+    def _columnes_items(self) -> Tuple[Dict[str, np.ndarray], Dict[str, List[str]]]:
+        pass
+
+    @abstractmethod
+    def _restaurar_items(self, llegir, textos: Dict[str, List[str]]):
+        pass
 
     @abstractmethod
     def carregar_usuaris(self, path: str):
@@ -80,9 +694,12 @@ class Dades(ABC):
 
 # === IMPLEMENTACIONS CONCRETES ===
 class DadesLlibres(Dades):
-    def __init__(self, path: str):
+    _esquema = ESQUEMA_LLIBRES
+
+    def __init__(self, path: str, massiu: bool = False):
         super().__init__()
         self._path = path
+        self._massiu = massiu  # Lectura de valoracions per blocs amb NumPy
 
     def _carregar_csv(self, fitxer: str) -> List[List[str]]:
         try:
@@ -114,9 +731,8 @@ class DadesLlibres(Dades):
 
     def carregar_items(self, path: str):
         data = self._carregar_csv(path)
-        self._items = {}
-        self._item_id_to_idx = {}
-        for idx, line in enumerate(data):
+        self._iniciar_items()
+        for line in data:
             if len(line) < 4:  # Validar ISBN, títol, autor, any
                 print(f"Línia invàlida a Books.csv: {line}")
                 continue
@@ -126,10 +742,38 @@ class DadesLlibres(Dades):
                 year = int(year_str) if year_str.strip().isdigit() else 0  # Correcció any
             except ValueError:
                 year = 0
-            self._items[isbn] = Llibre(isbn, title, year, author, publisher)
-            self._item_id_to_idx[isbn] = idx
+            self._registrar_item(isbn, titol=title, any=year, autor=author, editorial=publisher)
+        self._tancar_items()
+
+    def _valoracio_valida(self, rating: float) -> bool:
+        return 0 < rating <= 10
+
+    def _convertir_item_id(self, item_id) -> str:
+        return str(item_id)
+
+    def _item_vista(self, idx: int) -> Item:
+        cataleg = self._cataleg
+        return Llibre(self._idx_to_item_id[idx], cataleg.valor('titol', idx), cataleg.valor('any', idx),
+                      cataleg.valor('autor', idx), cataleg.valor('editorial', idx))
+
+    def _columnes_items(self) -> Tuple[Dict[str, np.ndarray], Dict[str, List[str]]]:
+        return self._columnes_cataleg(), {'item_id': self._idx_to_item_id.tolist()}
+
+    def _restaurar_items(self, llegir, textos: Dict[str, List[str]]):
+        self._restaurar_cataleg(textos['item_id'], llegir)
 
     def carregar_valoracions(self, path: str):
+        if self._massiu:
+            (rows, cols, vals), self._informe_valoracions = _llegir_valoracions_massiu(
+                path, self._user_id_to_idx, self._item_id_to_idx, _dtype_isbn(self._item_id_to_idx),
+                lambda r: (r > 0) & (r <= 10))
+            self._ratings_matrix = sp.coo_matrix(
+                (vals, (rows, cols)),
+                shape=(len(self._users), len(self._idx_to_item_id)),
+                dtype=np.float32
+            ).tocsc()
+            self._calcular_estadistiques_items()
+            return
         data = self._carregar_csv(path)
         rows, cols, data_vals = [], [], []
         for line in data:
@@ -146,8 +790,7 @@ class DadesLlibres(Dades):
                 print(f"Valoració invàlida a Ratings.csv: {line}")
                 continue
             user = self._users.get(user_id)
-            item = self._items.get(isbn)
-            if user and item:
+            if user and isbn in self._item_id_to_idx:
                 user_idx = self._user_id_to_idx[user_id]
                 item_idx = self._item_id_to_idx[isbn]
                 rows.append(user_idx)
@@ -155,19 +798,24 @@ class DadesLlibres(Dades):
                 data_vals.append(rating)
         if data_vals:
             num_users = len(self._users)
-            num_items = len(self._items)
+            num_items = len(self._idx_to_item_id)
             self._ratings_matrix = sp.coo_matrix(
                 (data_vals, (rows, cols)), 
                 shape=(num_users, num_items)
             ).tocsc()
         else:
-            self._ratings_matrix = sp.csc_matrix((len(self._users), len(self._items)), dtype=np.float32)
+            self._ratings_matrix = sp.csc_matrix((len(self._users), len(self._idx_to_item_id)), dtype=np.float32)
+        self._calcular_estadistiques_items()
 
 class DadesPelis(Dades):
-    def __init__(self, path: str):
+    _esquema = ESQUEMA_PELIS
+
+    def __init__(self, path: str, massiu: bool = False):
         super().__init__()
         self._path = path
-        self._metadata = {'links': [], 'tags': []}
+        self._massiu = massiu  # Lectura de ratings.csv per blocs amb NumPy
+        self._metadata = {'links': []}
+        self._valoracions_llegides = None
 
     def _carregar_csv(self, fitxer: str) -> List[List[str]]:
         try:
@@ -179,25 +827,93 @@ class DadesPelis(Dades):
             print(f"Error llegint {fitxer}: {str(e)}")
             return []
 
+    def _llegir_files(self, fitxer: str):
+        # Lectura en streaming: no es construeix cap llista amb totes les files
+        try:
+            with open(fitxer, 'r', encoding='utf-8') as f:
+                reader = csv.reader(f)
+                next(reader, None)
+                for line in reader:
+                    if line:
+                        yield line
+        except Exception as e:
+            print(f"Error llegint {fitxer}: {str(e)}")
+
+    def _llegir_valoracions_pelis_massiu(self, path: str):
+        # Mateix resultat que _llegir_valoracions però parsejant blocs sencers amb NumPy
+        dtype = [('user', np.int64), ('movie', np.int64), ('rating', np.float32), ('timestamp', np.int64)]
+        tots_users, users, movies, ratings, timestamps = [], [], [], [], []
+        informe = {'acceptades': 0, 'format': 0, 'rang': 0, 'desconeguts': 0}
+        for bloc, rebutjades in _llegir_blocs(path, dtype, (0, 1, 2, 3)):
+            informe['format'] += rebutjades
+            tots_users.append(bloc['user'])
+            en_rang = (bloc['rating'] >= 0) & (bloc['rating'] <= 5)  # Validar rang 0-5
+            informe['rang'] += int(np.count_nonzero(~en_rang))
+            users.append(bloc['user'][en_rang])
+            movies.append(bloc['movie'][en_rang])
+            ratings.append(bloc['rating'][en_rang])
+            timestamps.append(bloc['timestamp'][en_rang])
+        if not ratings:
+            buit = np.empty(0, dtype=np.int64)
+            return os.path.abspath(path), buit, buit, buit, buit, np.empty(0, dtype=np.float32), buit
+        user_ids = np.unique(np.concatenate(tots_users))
+        users_pos = np.searchsorted(user_ids, np.concatenate(users))
+        movie_ids, movies_pos = np.unique(np.concatenate(movies), return_inverse=True)
+        ratings = np.concatenate(ratings)
+        informe['acceptades'] = int(ratings.size)
+        self._informe_valoracions = informe
+        return (os.path.abspath(path), user_ids, movie_ids, users_pos, movies_pos.ravel(), ratings,
+                np.concatenate(timestamps))
+
+    def _llegir_valoracions(self, path: str):
+        if self._massiu:
+            return self._llegir_valoracions_pelis_massiu(path)
+        # Una sola passada pel fitxer: els índexs (provisionals) d'usuari i d'ítem
+        # s'assignen al vol i les valoracions van a arrays tipats que creixen
+        user_pos: Dict[int, int] = {}
+        movie_pos: Dict[int, int] = {}
+        users, items, ratings, timestamps = array('i'), array('i'), array('f'), array('q')
+        for line in self._llegir_files(path):
+            try:
+                user_id = int(line[0])
+                upos = user_pos.setdefault(user_id, len(user_pos))
+            except ValueError:
+                user_id = None
+            if len(line) < 4:
+                print(f"Línia invàlida a ratings.csv: {line}")
+                continue
+            try:
+                if user_id is None:
+                    raise ValueError(line[0])
+                movie_id = int(line[1])
+                rating = float(line[2])
+                timestamp = int(line[3])
+            except ValueError:
+                print(f"Valoració invàlida a ratings.csv: {line}")
+                continue
+            if rating < 0 or rating > 5:  # Validar rang 0-5
+                continue
+            users.append(upos)
+            items.append(movie_pos.setdefault(movie_id, len(movie_pos)))
+            ratings.append(rating)
+            timestamps.append(timestamp)
+        return (os.path.abspath(path),
+                np.fromiter(user_pos, dtype=np.int64, count=len(user_pos)),
+                np.fromiter(movie_pos, dtype=np.int64, count=len(movie_pos)),
+                np.frombuffer(users, dtype=np.int32), np.frombuffer(items, dtype=np.int32),
+                np.frombuffer(ratings, dtype=np.float32), np.frombuffer(timestamps, dtype=np.int64))
+
     def carregar_usuaris(self, path: str):
-        # Processar tots els user_ids únics de ratings i tags
+        # Processar tots els user_ids únics de ratings i tags; les valoracions llegides
+        # es guarden per a carregar_valoracions i així ratings.csv només es llegeix un cop
         base_dir = os.path.dirname(path)
-        ratings_data = self._carregar_csv(path)
-        tags_path = os.path.join(base_dir, 'tags.csv')
-        tags_data = self._carregar_csv(tags_path)
-        user_ids = set()
-        for line in ratings_data:
-            if len(line) >= 1:
-                try:
-                    user_ids.add(int(line[0]))
-                except ValueError:
-                    pass
-        for line in tags_data:
-            if len(line) >= 1:
-                try:
-                    user_ids.add(int(line[0]))
-                except ValueError:
-                    pass
+        self._valoracions_llegides = self._llegir_valoracions(path)
+        user_ids = set(self._valoracions_llegides[1].tolist())
+        for line in self._llegir_files(os.path.join(base_dir, 'tags.csv')):
+            try:
+                user_ids.add(int(line[0]))
+            except ValueError:
+                pass
         self._users = {}
         self._user_id_to_idx = {user_id: idx for idx, user_id in enumerate(sorted(user_ids))}
         for user_id in user_ids:
@@ -205,10 +921,8 @@ class DadesPelis(Dades):
 
     def carregar_items(self, path: str):
         data = self._carregar_csv(path)
-        self._items = {}
-        self._item_id_to_idx = {}
-        movie_id_to_idx = {}  # Optimització per a links
-        for idx, line in enumerate(data):
+        self._iniciar_items()
+        for line in data:
             if len(line) < 3:
                 print(f"Línia invàlida a movies.csv: {line}")
                 continue
@@ -218,9 +932,8 @@ class DadesPelis(Dades):
             except ValueError:
                 print(f"ID invàlid a movies.csv: {line}")
                 continue
-            self._items[movie_id] = Peli(movie_id, title, genres)
-            movie_id_to_idx[movie_id] = idx
-            self._item_id_to_idx[movie_id] = idx
+            self._registrar_item(movie_id, titol=title, genere=genres)
+        self._tancar_items()
 
         # Processar links amb diccionari
         for link in self._metadata['links']:
@@ -233,51 +946,82 @@ class DadesPelis(Dades):
                 tmdb_id = int(tmdb_id_str) if tmdb_id_str else 0
             except ValueError:
                 continue
-            if movie_id in movie_id_to_idx:
-                idx = movie_id_to_idx[movie_id]
-                self._items[movie_id]._imdb_id = imdb_id
-                self._items[movie_id]._tmdb_id = tmdb_id
+            idx = self._item_id_to_idx.get(movie_id)
+            if idx is not None:
+                self._cataleg.assignar('imdb', idx, imdb_id)
+                self._cataleg.assignar('tmdb', idx, tmdb_id)
 
     def carregar_valoracions(self, path: str):
-        data = self._carregar_csv(path)
-        rows, cols, data_vals = [], [], []
-        for line in data:
-            if len(line) < 4:
-                print(f"Línia invàlida a ratings.csv: {line}")
-                continue
-            user_id_str, movie_id_str, rating_str, _ = line[0], line[1], line[2], line[3]
-            try:
-                user_id = int(user_id_str)
-                movie_id = int(movie_id_str)
-                rating = float(rating_str)
-                if rating < 0 or rating > 5:  # Validar rang 0-5
-                    continue
-            except ValueError:
-                print(f"Valoració invàlida a ratings.csv: {line}")
-                continue
-            user = self._users.get(user_id)
-            item = self._items.get(movie_id)
-            if user and item:
-                user_idx = self._user_id_to_idx[user_id]
-                item_idx = self._item_id_to_idx[movie_id]
-                rows.append(user_idx)
-                cols.append(item_idx)
-                data_vals.append(rating)
-        if data_vals:
-            num_users = len(self._users)
-            num_items = len(self._items)
-            self._ratings_matrix = sp.coo_matrix(
-                (data_vals, (rows, cols)), 
-                shape=(num_users, num_items)
-            ).tocsc()
-        else:
-            self._ratings_matrix = sp.csc_matrix((len(self._users), len(self._items)), dtype=np.float32)
+        llegides, self._valoracions_llegides = self._valoracions_llegides, None
+        if llegides is None or llegides[0] != os.path.abspath(path):
+            llegides = self._llegir_valoracions(path)
+        _, user_ids, movie_ids, users, items, ratings, timestamps = llegides
+
+        # Traduir els índexs provisionals als definitius (-1 si no existeix l'usuari o l'ítem)
+        user_map = _buscar_idx(*_index_ordenat(self._user_id_to_idx), user_ids)
+        item_map = _buscar_idx(*_index_ordenat(self._item_id_to_idx), movie_ids)
+        rows = user_map[users] if users.size else users
+        cols = item_map[items] if items.size else items
+        valides = (rows >= 0) & (cols >= 0)
+        if self._massiu:
+            self._informe_valoracions['desconeguts'] = int(np.count_nonzero(~valides))
+            self._informe_valoracions['acceptades'] = int(np.count_nonzero(valides))
+            _mostrar_informe(path, self._informe_valoracions)
+        rows, cols = rows[valides], cols[valides]
+        self._ratings_matrix = sp.coo_matrix(
+            (ratings[valides], (rows, cols)),
+            shape=(len(self._users), len(self._idx_to_item_id)),
+            dtype=np.float32
+        ).tocsc()
+        self._alinear_timestamps(rows, cols, timestamps[valides])
+        self._calcular_estadistiques_items()
+
+    def _valoracio_valida(self, rating: float) -> bool:
+        return 0 <= rating <= 5
+
+    def _convertir_item_id(self, item_id) -> int:
+        return int(item_id)
+
+    def _item_vista(self, idx: int) -> Item:
+        cataleg = self._cataleg
+        return Peli(self._idx_to_item_id[idx], cataleg.valor('titol', idx), cataleg.valor('genere', idx),
+                    cataleg.valor('imdb', idx), cataleg.valor('tmdb', idx))
+
+    def _columnes_items(self) -> Tuple[Dict[str, np.ndarray], Dict[str, List[str]]]:
+        columnes = self._columnes_cataleg()
+        columnes['item_id'] = self._idx_to_item_id.astype(np.int64)
+        return columnes, {}
+
+    def _restaurar_items(self, llegir, textos: Dict[str, List[str]]):
+        self._restaurar_cataleg(llegir('item_id').tolist(), llegir)
 
     def carregar_links(self, path: str):
         self._metadata['links'] = self._carregar_csv(path)
 
     def carregar_tags(self, path: str):
-        self._metadata['tags'] = self._carregar_csv(path)
+        # Cal haver carregat usuaris i ítems: les etiquetes d'ítems desconeguts es descarten i
+        # les d'usuaris desconeguts només compten per a l'ítem
+        vocabulari: Dict[str, int] = {}
+        files_items, files_usuaris, columnes = array('i'), array('i'), array('i')
+        for line in self._llegir_files(path):
+            if len(line) < 3:
+                print(f"Línia invàlida a tags.csv: {line}")
+                continue
+            try:
+                user_id = int(line[0])
+                movie_id = int(line[1])
+            except ValueError:
+                print(f"Etiqueta invàlida a tags.csv: {line}")
+                continue
+            tag = self._normalitzar_tag(line[2])
+            item_idx = self._item_id_to_idx.get(movie_id)
+            if not tag or item_idx is None:
+                continue
+            files_items.append(item_idx)
+            files_usuaris.append(self._user_id_to_idx.get(user_id, -1))
+            columnes.append(vocabulari.setdefault(tag, len(vocabulari)))
+        self._construir_tags(np.frombuffer(files_items, dtype=np.int32), np.frombuffer(files_usuaris, dtype=np.int32),
+                             np.frombuffer(columnes, dtype=np.int32), vocabulari)
 
 # === RESTA DEL CODI (Recomanador, main) ES MANTÉ IGUAL ===
 
@@ -287,55 +1031,456 @@ class Recomanador(ABC):
         self._dades = dades
 
     @abstractmethod
-    def recomana(self, user_id: int, n: int) -> List[Tuple[Item, float]]:
+    def puntuacions_bloc(self, user_idxs: np.ndarray) -> np.ndarray:
+        # Puntuacions (usuaris, ítems) sobre tot el catàleg; -inf als ítems que no es poden puntuar.
+        # Els ítems ja valorats (també els pendents de fusionar) s'exclouen després, a _top_n_no_valorats
         pass
 
-# === SISTEMA DE RECOMANACIÓ ===
-class RecomanadorSimple(Recomanador):
-    def __init__(self, dades: Dades, min_vots: int = 3):
-        super().__init__(dades)
-        self._min_vots = min_vots
+    def puntuacions(self, user_idx: int) -> np.ndarray:
+        return self.puntuacions_bloc(np.array([user_idx]))[0]
+
+    def _preparar(self):
+        # Estructures derivades (similituds, factors...) que puntuacions_bloc construeix o
+        # actualitza quan les necessita
+        pass
+
+    def preparar(self):
+        """Fa per endavant la feina que puntuacions_bloc faria la primera vegada: fusiona les
+        valoracions pendents, crea la còpia CSR i construeix el model. Després només es llegeix,
+        i el recomanador es pot compartir entre processos (precalcul) sense refer res a cada un."""
+        self._dades.fusionar_valoracions()
+        self._dades.get_rating_matrix_csr()
+        self._preparar()
 
     def recomana(self, user_id: int, n: int = 5) -> List[Tuple[Item, float]]:
         usuari = self._dades.get_usuari(user_id)
         if not usuari:
             raise ValueError(f"Usuari {user_id} no trobat")
         user_idx = self._dades._user_id_to_idx.get(user_id)
-        if user_idx is None:
+        if user_idx is None or n <= 0:
             return []
-        
-        user_ratings = self._dades._ratings_matrix.getrow(user_idx)
-        items_valorats = user_ratings.indices  # Índexs dels items valorats
-
-        # Càlcul de la mitjana global (excloent 0s)
-        total_ratings = self._dades._ratings_matrix.data
-        avg_global = np.mean(total_ratings) if total_ratings.size > 0 else 0.0
 
+        valorats = self._dades.get_valorats([user_idx])
+        idx_top, scores_top = _top_n_no_valorats(self.puntuacions_bloc(np.array([user_idx])), valorats, n)
+        # Només es creen les tuples (Item, puntuació) dels n finals
         puntuacions = []
-        # Iterar sobre els OBJECTES Item (valors del diccionari)
-        for item in self._dades._items.values():  
-            item_idx = self._dades._item_id_to_idx[item.get_id()]
-            
-            if item_idx in items_valorats:
-                continue  # Saltar items ja valorats
-            
-            # Obtenir valoracions de l'ítem (només dades != 0)
-            item_ratings = self._dades._ratings_matrix.getcol(item_idx)
-            valid_ratings = item_ratings.data
-            num_vots = valid_ratings.size
-            
-            if num_vots < self._min_vots:
-                continue  # Filtrar per mínim de vots
-            
-            avg_item = np.mean(valid_ratings) if num_vots > 0 else 0.0
-            
-            # Fórmula de ponderació
-            score = (num_vots / (num_vots + self._min_vots)) * avg_item
-            score += (self._min_vots / (num_vots + self._min_vots)) * avg_global
-            puntuacions.append((item, score))  # Guardar l'objecte Item
-            
-        puntuacions.sort(key=lambda x: x[1], reverse=True)
-        return puntuacions[:n]
+        for item_idx, puntuacio in zip(idx_top[0], scores_top[0]):
+            if item_idx < 0:
+                break
+            item = self._dades.get_item_per_idx(item_idx)
+            if item is not None:
+                puntuacions.append((item, float(puntuacio)))
+        return puntuacions
+
+    def recomana_batch(self, user_ids: List[int], n: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+        # Retorna índexs d'ítem (usuaris, n) i puntuacions, amb -1 / NaN com a farciment
+        user_idxs = np.array([self._dades._user_id_to_idx.get(u, -1) for u in user_ids], dtype=np.int64)
+        return self.recomana_batch_idx(user_idxs, n)
+
+    def recomana_batch_idx(self, user_idxs: np.ndarray, n: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+        # Blocs d'usuaris (índex -1 = usuari desconegut): puntuacions completes i top-n per files
+        user_idxs = np.asarray(user_idxs, dtype=np.int64)
+        indexos = np.full((len(user_idxs), n), -1, dtype=np.int32)
+        scores = np.full((len(user_idxs), n), np.nan, dtype=np.float32)
+        mida = _mida_bloc(self._dades._ratings_matrix.shape[1])
+        for inici in range(0, len(user_idxs), mida):
+            files = np.arange(inici, min(inici + mida, len(user_idxs)))
+            files = files[user_idxs[files] >= 0]
+            if files.size == 0:
+                continue
+            bloc = user_idxs[files]
+            indexos[files], scores[files] = _top_n_no_valorats(self.puntuacions_bloc(bloc),
+                                                                self._dades.get_valorats(bloc), n)
+        return indexos, scores
+
+FRACCIO_RECONSTRUCCIO = 0.2  # Amb més ítems modificats que aquesta fracció es refan totes les similituds
+
+class RecomanadorSimple(Recomanador):
+    def __init__(self, dades: Dades, min_vots: int = 3):
+        super().__init__(dades)
+        self._min_vots = min_vots
+
+    def _puntuacions_base(self) -> Tuple[np.ndarray, np.ndarray]:
+        # Puntuació de tots els ítems (comuna a tots els usuaris) i màscara de mínim de vots
+        num_vots = self._dades._num_vots
+        with np.errstate(divide='ignore', invalid='ignore'):
+            avg_item = np.where(num_vots > 0, self._dades._suma_valoracions / num_vots, 0.0)
+        # Fórmula de ponderació vectoritzada sobre tots els ítems
+        score = (num_vots / (num_vots + self._min_vots)) * avg_item
+        score += (self._min_vots / (num_vots + self._min_vots)) * self._dades._mitjana_global
+        return score, num_vots >= self._min_vots
+
+    def puntuacions_bloc(self, user_idxs: np.ndarray) -> np.ndarray:
+        # La puntuació de popularitat és la mateixa per a tots els usuaris; -inf als ítems amb pocs vots
+        score, candidats = self._puntuacions_base()
+        return np.repeat(np.where(candidats, score, -np.inf)[None, :], len(user_idxs), axis=0)
+
+def _pesos_decaiment(timestamps: np.ndarray, ara: int, semivida_dies: float) -> np.ndarray:
+    # Pes 2^(-edat / semivida) de cada valoració; les posteriors a `ara` pesen com les d'ara
+    edat = np.maximum(ara - timestamps, 0) / (semivida_dies * SEGONS_DIA)
+    return np.exp2(-edat)
+
+class RecomanadorRecent(RecomanadorSimple):
+    # Popularitat amb decaïment temporal: la mateixa fórmula ponderada de RecomanadorSimple però
+    # amb vots i sumes on cada valoració pesa 2^(-edat / semivida). Amb `finestra_dies` només
+    # compten les valoracions dels últims N dies, que surten de l'índex temporal de Dades sense
+    # recórrer tota la matriu. `ara` és el moment de referència (per defecte, el timestamp més
+    # recent de les dades). Les valoracions pendents hi compten a partir de la fusió.
+    # Sense timestamps es comporta com RecomanadorSimple
+    def __init__(self, dades: Dades, min_vots: int = 3, semivida_dies: float = 30.0,
+                 finestra_dies: Optional[float] = None, ara: Optional[int] = None):
+        super().__init__(dades, min_vots)
+        self._semivida_dies = semivida_dies
+        self._finestra_dies = finestra_dies
+        self._ara = ara
+        self._base = None  # (matriu d'origen, (puntuacions, candidats))
+
+    def _preparar(self):
+        # Les puntuacions són comunes a tots els usuaris: es calculen un cop per matriu
+        if self._base is None or self._base[0] is not self._dades._ratings_matrix:
+            self._base = (self._dades._ratings_matrix, self._calcular_base())
+
+    def _puntuacions_base(self) -> Tuple[np.ndarray, np.ndarray]:
+        self._preparar()
+        return self._base[1]
+
+    def _calcular_base(self) -> Tuple[np.ndarray, np.ndarray]:
+        dades = self._dades
+        timestamps = dades.get_timestamps()
+        if timestamps is None:
+            return super()._puntuacions_base()
+        matriu = dades._ratings_matrix
+        ara = self._ara if self._ara is not None else dades.timestamp_maxim()
+        if self._finestra_dies is None:
+            valors, instants = matriu.data, timestamps
+            columnes = np.repeat(np.arange(matriu.shape[1]), np.diff(matriu.indptr))
+        else:
+            posicions = dades.posicions_finestra(ara - int(self._finestra_dies * SEGONS_DIA), ara + 1)
+            valors, instants = matriu.data[posicions], timestamps[posicions]
+            columnes = np.searchsorted(matriu.indptr, posicions, side='right') - 1
+        pesos = _pesos_decaiment(instants, ara, self._semivida_dies)
+        num_items = matriu.shape[1]
+        vots = np.bincount(columnes, weights=pesos, minlength=num_items)
+        sumes = np.bincount(columnes, weights=pesos * valors, minlength=num_items)
+        total = vots.sum()
+        mitjana_global = sumes.sum() / total if total > 0 else dades._mitjana_global
+        with np.errstate(divide='ignore', invalid='ignore'):
+            avg_item = np.where(vots > 0, sumes / vots, 0.0)
+        score = (vots / (vots + self._min_vots)) * avg_item
+        score += (self._min_vots / (vots + self._min_vots)) * mitjana_global
+        # El mínim de vots es compta sense pesos, sobre les valoracions considerades
+        return score, np.bincount(columnes, minlength=num_items) >= self._min_vots
+
+    def tendencies(self, n: int = 10) -> List[Tuple[Item, float]]:
+        # Llista de tendències comuna a tots els usuaris (no exclou cap ítem valorat)
+        score, candidats = self._puntuacions_base()
+        idx_top, scores_top = _top_n_files(np.where(candidats, score, -np.inf)[None, :], n)
+        tendencies = []
+        for item_idx, puntuacio in zip(idx_top[0], scores_top[0]):
+            if item_idx < 0:
+                break
+            item = self._dades.get_item_per_idx(item_idx)
+            if item is not None:
+                tendencies.append((item, float(puntuacio)))
+        return tendencies
+
+class RecomanadorItemItem(Recomanador):
+    # Filtratge col·laboratiu basat en ítems: la matriu de similituds (ítems x ítems, top-k
+    # veïns per columna) es calcula fora de línia i cada recomanació és un producte dispers
+    def __init__(self, dades: Dades, k: int = 50, ajustat: bool = True):
+        super().__init__(dades)
+        self._k = k
+        self._ajustat = ajustat  # Cosinus ajustat: es resta la mitjana de cada usuari
+        self._similituds = None
+        self._versio_similituds = None  # Versió de la matriu de valoracions amb què es van calcular
+        self._per_files = None
+        self._mitjanes = None
+
+    def _preparar_usuaris(self):
+        per_files = self._dades.get_rating_matrix_csr()
+        if self._per_files is not per_files:
+            self._per_files = per_files
+            vots = np.diff(self._per_files.indptr)
+            sumes = np.asarray(self._per_files.sum(axis=1, dtype=np.float64)).ravel()
+            with np.errstate(divide='ignore', invalid='ignore'):
+                self._mitjanes = np.where(vots > 0, sumes / vots, 0.0).astype(np.float32)
+
+    def _matriu_normalitzada(self) -> Tuple[sp.csc_matrix, sp.csr_matrix]:
+        # Columnes (ítems) centrades per usuari si cal i de norma 1, i la seva transposada
+        self._preparar_usuaris()
+        matriu = self._dades._ratings_matrix.astype(np.float32)  # CSC: columnes = ítems
+        if self._ajustat:
+            matriu.data -= self._mitjanes[matriu.indices]
+        normes = np.sqrt(np.asarray(matriu.multiply(matriu).sum(axis=0)).ravel())
+        with np.errstate(divide='ignore'):
+            matriu = matriu @ sp.diags(np.where(normes > 0, 1.0 / normes, 0.0).astype(np.float32))
+        matriu = sp.csc_matrix(matriu)
+        return matriu, matriu.T.tocsr()
+
+    def _blocs_items(self, matriu: sp.csc_matrix, items: np.ndarray):
+        # Blocs d'ítems amb el producte dispers acotat: cada ítem toca, per cada usuari que l'ha
+        # valorat, totes les valoracions d'aquest usuari (cap bloc dens ítems x ítems)
+        vots_usuaris = np.diff(self._per_files.indptr)
+        columnes = np.repeat(np.arange(matriu.shape[1]), np.diff(matriu.indptr))
+        cost = np.bincount(columnes, weights=vots_usuaris[matriu.indices], minlength=matriu.shape[1])[items]
+        acumulat = np.cumsum(cost)
+        inici = 0
+        while inici < items.size:
+            final = np.searchsorted(acumulat, acumulat[inici] - cost[inici] + MAX_ELEMENTS_BLOC, side='right')
+            final = max(final, inici + 1)
+            yield items[inici:final]
+            inici = final
+
+    def _veins_bloc(self, sims: sp.csr_matrix, bloc: np.ndarray, k: int):
+        # Top-k veïns positius de cada fila de sims (bloc, ítems) com a entrades (veí, ítem del bloc, valor).
+        # Les files curtes es filtren de cop; a les llargues n'hi ha prou amb una selecció parcial
+        # dels k+1 primers, perquè l'ítem mateix hi pot ser i no és veí seu
+        indptr, veins, valors = sims.indptr, sims.indices, sims.data
+        llargades = np.diff(indptr)
+        seleccio = [np.flatnonzero(np.repeat(llargades <= k + 1, llargades))]
+        for j in np.flatnonzero(llargades > k + 1):
+            top = indptr[j] + np.argpartition(-valors[indptr[j]:indptr[j + 1]], k)[:k + 1]
+            propi = veins[top] == bloc[j]
+            seleccio.append(top[~propi] if propi.any() else top[:k])
+        seleccio = np.concatenate(seleccio)
+        files = np.searchsorted(indptr, seleccio, side='right') - 1
+        valids = (valors[seleccio] > 0) & (veins[seleccio] != bloc[files])
+        seleccio, files = seleccio[valids], files[valids]
+        return veins[seleccio], bloc[files], valors[seleccio]
+
+    def construir_similituds(self):
+        # Top-k a partir del producte dispers X^T X per blocs de columnes: la memòria depèn de les
+        # parelles d'ítems amb usuaris en comú, no d'ítems x ítems
+        matriu, transposada = self._matriu_normalitzada()
+        per_files = matriu.tocsr()
+        num_items = matriu.shape[1]
+        k = min(self._k, max(num_items - 1, 0))
+        files, columnes, valors = [], [], []
+        for bloc in (self._blocs_items(matriu, np.arange(num_items)) if k > 0 else ()):
+            sims = transposada[bloc] @ per_files  # (bloc, ítems), per files: sense cap conversió del producte
+            for llista, entrades in zip((files, columnes, valors), self._veins_bloc(sims, bloc, k)):
+                llista.append(entrades)
+        if files:
+            files, columnes, valors = np.concatenate(files), np.concatenate(columnes), np.concatenate(valors)
+        # Columna i = veïns de l'ítem i; la fila j d'un usuari s'hi projecta amb r_u @ S
+        self._similituds = sp.csr_matrix((np.asarray(valors, dtype=np.float32), (files, columnes)),
+                                         shape=(num_items, num_items))
+        self._versio_similituds = self._dades._versio_matriu
+
+    def actualitzar_similituds(self):
+        # Després d'afegir valoracions només es recalculen els veïns dels ítems modificats i, a la
+        # resta de columnes, les similituds amb aquests ítems; cada columna es torna a retallar a k.
+        # Aproximació: un ítem no modificat que havia quedat fora del top-k d'una columna no hi
+        # torna a entrar, ni es recullen els canvis de mitjana d'usuari a la resta d'ítems,
+        # fins a la següent construcció completa
+        tocats = np.flatnonzero(self._dades._versions_items > self._versio_similituds)
+        num_items = self._dades._ratings_matrix.shape[1]
+        if tocats.size > FRACCIO_RECONSTRUCCIO * num_items:
+            self.construir_similituds()
+            return
+        matriu, transposada = self._matriu_normalitzada()
+        es_tocat = np.zeros(num_items, dtype=bool)
+        es_tocat[tocats] = True
+        antigues = self._similituds.tocoo()
+        conserva = ~es_tocat[antigues.row] & ~es_tocat[antigues.col]
+        files, columnes, valors = [antigues.row[conserva]], [antigues.col[conserva]], [antigues.data[conserva]]
+        k = min(self._k, max(num_items - 1, 0))
+        per_files = matriu.tocsr()
+        for bloc in (self._blocs_items(matriu, tocats) if k > 0 else ()):
+            sims = transposada[bloc] @ per_files  # (bloc, ítems)
+            for llista, entrades in zip((files, columnes, valors), self._veins_bloc(sims, bloc, k)):
+                llista.append(entrades)
+            # Per simetria, cada ítem modificat és candidat a veí de les columnes no modificades
+            entrades = sims.tocoo()
+            simetriques = (entrades.data > 0) & ~es_tocat[entrades.col]
+            files.append(bloc[entrades.row[simetriques]])
+            columnes.append(entrades.col[simetriques])
+            valors.append(entrades.data[simetriques])
+        files, columnes = np.concatenate(files).astype(np.int64), np.concatenate(columnes).astype(np.int64)
+        valors = np.concatenate(valors).astype(np.float32)
+        # Top-k per columna: ordre per (columna, -similitud) i posició dins de la columna
+        ordre = np.lexsort((files, -valors, columnes))
+        files, columnes, valors = files[ordre], columnes[ordre], valors[ordre]
+        dins = np.arange(columnes.size) - np.searchsorted(columnes, columnes, side='left') < k
+        self._similituds = sp.csr_matrix((valors[dins], (files[dins], columnes[dins])),
+                                         shape=(num_items, num_items))
+        self._versio_similituds = self._dades._versio_matriu
+
+    def desar_similituds(self, fitxer: str):
+        if self._similituds is None:
+            self.construir_similituds()
+        os.makedirs(os.path.dirname(fitxer) or '.', exist_ok=True)
+        sp.save_npz(fitxer, self._similituds)
+
+    def carregar_similituds(self, fitxer: str) -> bool:
+        if not os.path.exists(fitxer):
+            return False
+        similituds = sp.load_npz(fitxer).tocsr()
+        num_items = self._dades._ratings_matrix.shape[1]
+        if similituds.shape != (num_items, num_items):
+            print(f"Similituds de {fitxer} no corresponen a les dades actuals")
+            return False
+        self._similituds = similituds
+        self._versio_similituds = self._dades._versio_matriu
+        return True
+
+    def _preparar(self):
+        if self._similituds is None:
+            self.construir_similituds()
+        elif self._versio_similituds != self._dades._versio_matriu:
+            self.actualitzar_similituds()
+        self._preparar_usuaris()
+
+    def puntuacions_bloc(self, user_idxs: np.ndarray) -> np.ndarray:
+        # Predicció mitjana_u + sum(sim * (r - mitjana_u)) / sum(|sim|) sobre els veïns valorats;
+        # -inf als ítems sense cap veí valorat
+        self._preparar()
+        files = self._per_files[user_idxs]
+        mitjanes = self._mitjanes[user_idxs]
+        centrades = files.copy()
+        centrades.data -= np.repeat(mitjanes, np.diff(files.indptr))
+        numerador = (centrades @ self._similituds).toarray()
+        binaria = files.copy()
+        binaria.data = np.ones_like(binaria.data)
+        denominador = (binaria @ abs(self._similituds)).toarray()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scores = mitjanes[:, None] + numerador / denominador
+        scores[~(denominador > 0)] = -np.inf
+        return scores
+
+def _resoldre_als(files: sp.csr_matrix, fixos: np.ndarray, regularitzacio: float) -> np.ndarray:
+    # Un pas d'ALS: per a cada fila resol (F_I^T F_I + reg * n_I * I) x = F_I^T r_I.
+    # Les files s'ordenen pel nombre de valoracions i es processen en blocs farcits fins al
+    # màxim del bloc, de manera que les Gram i els sistemes de tot el bloc surten d'un sol
+    # np.matmul i un sol np.linalg.solve
+    num_files, k = files.shape[0], fixos.shape[1]
+    resultat = np.zeros((num_files, k), dtype=np.float32)
+    vots = np.diff(files.indptr)
+    ordre = np.argsort(vots, kind='stable')
+    vots_ordenats = vots[ordre]
+    # Fila extra de zeros per a les posicions de farciment
+    fixos = np.vstack([fixos, np.zeros((1, k), dtype=fixos.dtype)]).astype(np.float64)
+    identitat = np.eye(k)
+    inici = 0
+    while inici < num_files:
+        # Blocs de files amb llargades semblants (com a molt el doble) per limitar el farciment
+        final = int(np.searchsorted(vots_ordenats, 2 * vots_ordenats[inici] + 8, side='right'))
+        final = min(max(final, inici + 1), inici + 1024, num_files)
+        while final - inici > 1 and (final - inici) * vots_ordenats[final - 1] * k > MAX_ELEMENTS_BLOC:
+            final = inici + (final - inici) // 2
+        bloc = ordre[inici:final]
+        llargada = int(vots[bloc].max()) if bloc.size else 0
+        posicions = files.indptr[bloc][:, None] + np.arange(llargada)[None, :]
+        presents = np.arange(llargada)[None, :] < vots[bloc][:, None]
+        posicions = np.where(presents, posicions, 0)
+        columnes = np.where(presents, files.indices[posicions] if files.nnz else 0, fixos.shape[0] - 1)
+        valors = np.where(presents, files.data[posicions] if files.nnz else 0.0, 0.0)
+
+        factors = fixos[columnes]  # (bloc, llargada, k)
+        transposats = np.ascontiguousarray(factors.transpose(0, 2, 1))  # Contigu perquè matmul usi BLAS
+        gram = np.matmul(transposats, factors)
+        gram += regularitzacio * np.maximum(vots[bloc], 1)[:, None, None] * identitat
+        dreta = np.matmul(transposats, valors[:, :, None])
+        resultat[bloc] = np.linalg.solve(gram, dreta)[:, :, 0]
+        inici = final
+    return resultat
+
+class RecomanadorALS(Recomanador):
+    # Factorització de matrius amb mínims quadrats alterns sobre les valoracions observades
+    # (centrades en la mitjana global). Un cop entrenat, puntuar un usuari és un producte
+    # del seu vector de factors amb la matriu de factors dels ítems
+    def __init__(self, dades: Dades, factors: int = 32, regularitzacio: float = 0.1,
+                 iteracions: int = 10, llavor: int = 0):
+        super().__init__(dades)
+        self._factors = factors
+        self._regularitzacio = regularitzacio
+        self._iteracions = iteracions
+        self._llavor = llavor
+        # Factors amb la mitjana global incorporada: columna d'uns als usuaris i de la mitjana als ítems
+        self._factors_usuaris: Optional[np.ndarray] = None
+        self._factors_items: Optional[np.ndarray] = None
+        self._versio_factors = None  # Versió de la matriu de valoracions amb què es van calcular
+
+    def entrenar(self):
+        per_columnes = self._dades._ratings_matrix  # CSC: columnes = ítems
+        mitjana = float(self._dades._mitjana_global)
+        per_columnes = per_columnes.astype(np.float32)
+        per_columnes.data -= mitjana
+        per_files = per_columnes.tocsr()
+        # La transposada d'una CSC té l'estructura d'una CSR d'ítems x usuaris
+        items_x_usuaris = sp.csr_matrix((per_columnes.data, per_columnes.indices, per_columnes.indptr),
+                                        shape=(per_columnes.shape[1], per_columnes.shape[0]))
+
+        rng = np.random.default_rng(self._llavor)
+        usuaris = np.zeros((per_files.shape[0], self._factors), dtype=np.float32)
+        items = (0.1 * rng.standard_normal((per_columnes.shape[1], self._factors))).astype(np.float32)
+        for _ in range(self._iteracions):
+            usuaris = _resoldre_als(per_files, items, self._regularitzacio)
+            items = _resoldre_als(items_x_usuaris, usuaris, self._regularitzacio)
+
+        self._factors_usuaris = np.hstack([usuaris, np.ones((usuaris.shape[0], 1), dtype=np.float32)])
+        self._factors_items = np.hstack([items, np.full((items.shape[0], 1), mitjana, dtype=np.float32)])
+        self._versio_factors = self._dades._versio_matriu
+
+    def actualitzar_factors(self):
+        # Plegat incremental després d'afegir valoracions: es tornen a resoldre només els ítems
+        # modificats (amb els factors d'usuari actuals) i després els usuaris modificats. La resta
+        # de factors i la mitjana global de l'entrenament es mantenen fins al següent entrenar()
+        dades = self._dades
+        num_usuaris, num_items = dades._ratings_matrix.shape
+        mitjana = float(self._factors_items[0, -1]) if len(self._factors_items) else dades._mitjana_global
+        usuaris = np.zeros((num_usuaris, self._factors), dtype=np.float32)
+        usuaris[:len(self._factors_usuaris)] = self._factors_usuaris[:, :-1]
+        items = np.zeros((num_items, self._factors), dtype=np.float32)
+        items[:len(self._factors_items)] = self._factors_items[:, :-1]
+
+        items_tocats = np.flatnonzero(dades._versions_items > self._versio_factors)
+        if items_tocats.size:
+            columnes = dades._ratings_matrix[:, items_tocats].astype(np.float32)
+            columnes.data -= mitjana
+            items_x_usuaris = sp.csr_matrix((columnes.data, columnes.indices, columnes.indptr),
+                                            shape=(items_tocats.size, num_usuaris))
+            items[items_tocats] = _resoldre_als(items_x_usuaris, usuaris, self._regularitzacio)
+        usuaris_tocats = np.flatnonzero(dades._versions_usuaris > self._versio_factors)
+        if usuaris_tocats.size:
+            files = dades.get_rating_matrix_csr()[usuaris_tocats].astype(np.float32)
+            files.data -= mitjana
+            usuaris[usuaris_tocats] = _resoldre_als(files, items, self._regularitzacio)
+
+        self._factors_usuaris = np.hstack([usuaris, np.ones((num_usuaris, 1), dtype=np.float32)])
+        self._factors_items = np.hstack([items, np.full((num_items, 1), mitjana, dtype=np.float32)])
+        self._versio_factors = dades._versio_matriu
+
+    def desar_factors(self, directori: str):
+        if self._factors_usuaris is None:
+            self.entrenar()
+        os.makedirs(directori, exist_ok=True)
+        _desar_npy(os.path.join(directori, "als_usuaris.npy"), self._factors_usuaris)
+        _desar_npy(os.path.join(directori, "als_items.npy"), self._factors_items)
+
+    def carregar_factors(self, directori: str) -> bool:
+        path_usuaris = os.path.join(directori, "als_usuaris.npy")
+        path_items = os.path.join(directori, "als_items.npy")
+        if not (os.path.exists(path_usuaris) and os.path.exists(path_items)):
+            return False
+        usuaris = np.load(path_usuaris, mmap_mode='r')
+        items = np.load(path_items, mmap_mode='r')
+        if (usuaris.shape[0], items.shape[0]) != self._dades._ratings_matrix.shape or usuaris.shape[1] != items.shape[1]:
+            print(f"Factors de {directori} no corresponen a les dades actuals")
+            return False
+        self._factors_usuaris, self._factors_items = usuaris, items
+        self._versio_factors = self._dades._versio_matriu
+        return True
+
+    def _preparar(self):
+        if self._factors_usuaris is None:
+            self.entrenar()
+        elif self._versio_factors != self._dades._versio_matriu:
+            self.actualitzar_factors()
+
+    def puntuacions_bloc(self, user_idxs: np.ndarray) -> np.ndarray:
+        self._preparar()
+        return self._factors_usuaris[user_idxs] @ self._factors_items.T
 
 # === MAIN ===
 def main():
@@ -343,22 +1488,46 @@ def main():
     tipus = input("Selecciona el tipus de dades (llibres/pelis): ").lower()
     
     if tipus == "llibres":
-        dades = DadesLlibres("carpeta_books/")
-        dades.carregar_usuaris("carpeta_books/Users.csv")
-        dades.carregar_items("carpeta_books/Books.csv")
-        dades.carregar_valoracions("carpeta_books/Ratings.csv")
+        dades = DadesLlibres("carpeta_books/", massiu=True)
+        fonts = ["carpeta_books/Users.csv", "carpeta_books/Books.csv", "carpeta_books/Ratings.csv"]
+        # Només es tornen a parsejar els CSV si han canviat des de l'última execució
+        cache_valida = dades.carregar_cache(fonts)
+        if not cache_valida:
+            dades.carregar_usuaris("carpeta_books/Users.csv")
+            dades.carregar_items("carpeta_books/Books.csv")
+            dades.carregar_valoracions("carpeta_books/Ratings.csv")
+            dades.desar_cache(fonts)
     elif tipus == "pelis":
-        dades = DadesPelis("carpeta_movies/")
-        dades.carregar_usuaris("carpeta_movies/ratings.csv")
-        dades.carregar_items("carpeta_movies/movies.csv")
-        dades.carregar_valoracions("carpeta_movies/ratings.csv")
+        dades = DadesPelis("carpeta_movies/", massiu=True)
+        fonts = ["carpeta_movies/ratings.csv", "carpeta_movies/tags.csv", "carpeta_movies/movies.csv"]
+        cache_valida = dades.carregar_cache(fonts)
+        if not cache_valida:
+            dades.carregar_usuaris("carpeta_movies/ratings.csv")
+            dades.carregar_items("carpeta_movies/movies.csv")
+            dades.carregar_valoracions("carpeta_movies/ratings.csv")
+            dades.desar_cache(fonts)
         dades.carregar_links("carpeta_movies/links.csv")
         dades.carregar_tags("carpeta_movies/tags.csv")
     else:
         print("Tipus no vàlid")
         return
 
-    recomanador = RecomanadorSimple(dades, min_vots=3)
+    tipus_rec = input("Selecciona el tipus de recomanador (simple/items/als): ").lower()
+    if tipus_rec == "simple":
+        recomanador = RecomanadorSimple(dades, min_vots=3)
+    elif tipus_rec == "items":
+        recomanador = RecomanadorItemItem(dades, k=50)
+        # Les similituds es calculen fora de línia i es reaprofiten mentre les dades no canviïn
+        fitxer_sims = os.path.join(dades._directori_cache(), "similituds_items.npz")
+        if not (cache_valida and recomanador.carregar_similituds(fitxer_sims)):
+            recomanador.desar_similituds(fitxer_sims)
+    elif tipus_rec == "als":
+        recomanador = RecomanadorALS(dades)
+        if not (cache_valida and recomanador.carregar_factors(dades._directori_cache())):
+            recomanador.desar_factors(dades._directori_cache())
+    else:
+        print("Tipus de recomanador no vàlid")
+        return
 
     while True:
         user_input = input("\nIntrodueix ID d'usuari (ENTER per sortir): ").strip()
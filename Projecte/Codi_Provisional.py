@@ -51,12 +51,66 @@ class Dades(ABC):
         self._users: List[Usuari] = []
         self._items: List[Item] = []
         self._valoracions: Dict[Tuple[int, int], float] = {}
+        # Índexs per id al costat de les llistes per consultes O(1)
+        self._users_per_id: Dict[int, Usuari] = {}
+        self._items_per_id: Dict[int, Item] = {}
+        # Índexs invertits de valoracions (es mantenen en afegir valoracions)
+        self._valoracions_per_usuari: Dict[int, Dict[int, float]] = {}
+        self._valoracions_per_item: Dict[int, Dict[int, float]] = {}
+        self._estadistiques_item: Dict[int, List[float]] = {}  # item_id -> [suma, vots] de valoracions > 0
+        self._versio_valoracions = 0
 
     def get_usuari(self, user_id: int)  -> Union[Usuari, None]:
-        return next((u for u in self._users if u.get_id() == user_id), None)
+        return self._users_per_id.get(user_id)
 
     def get_item(self, item_id: int) -> Union[Item, None]:
-        return next((i for i in self._items if i.get_id() == item_id), None)
+        return self._items_per_id.get(item_id)
+
+    def _set_usuaris(self, usuaris: List[Usuari]):
+        self._users = usuaris
+        self._users_per_id = {}
+        for u in usuaris:
+            self._users_per_id.setdefault(u.get_id(), u)  # Com abans, guanya el primer
+
+    def _set_items(self, items: List[Item]):
+        self._items = items
+        self._items_per_id = {}
+        for i in items:
+            self._items_per_id.setdefault(i.get_id(), i)
+
+    def _set_valoracions(self, valoracions: Dict[Tuple[int, int], float]):
+        self._valoracions = {}
+        self._valoracions_per_usuari = {}
+        self._valoracions_per_item = {}
+        self._estadistiques_item = {}
+        for (user_id, item_id), valor in valoracions.items():
+            self.afegir_valoracio(user_id, item_id, valor)
+
+    def afegir_valoracio(self, user_id: int, item_id: int, valor: float):
+        # Actualitza la valoració i els índexs invertits de manera incremental
+        anterior = self._valoracions.get((user_id, item_id))
+        if anterior is not None and anterior > 0:
+            stats = self._estadistiques_item[item_id]
+            stats[0] -= anterior
+            stats[1] -= 1
+        self._valoracions[(user_id, item_id)] = valor
+        self._versio_valoracions += 1
+        self._valoracions_per_usuari.setdefault(user_id, {})[item_id] = valor
+        self._valoracions_per_item.setdefault(item_id, {})[user_id] = valor
+        if valor > 0:
+            stats = self._estadistiques_item.setdefault(item_id, [0.0, 0])
+            stats[0] += valor
+            stats[1] += 1
+
+    def get_valoracions_usuari(self, user_id: int) -> Dict[int, float]:
+        return self._valoracions_per_usuari.get(user_id, {})
+
+    def get_valoracions_item(self, item_id: int) -> Dict[int, float]:
+        return self._valoracions_per_item.get(item_id, {})
+
+    def get_estadistiques_item(self, item_id: int) -> Tuple[float, int]:
+        suma, vots = self._estadistiques_item.get(item_id, (0.0, 0))
+        return suma, vots
 
     @property
     def recomanacions(self):
@@ -108,15 +162,15 @@ class DadesLlibres(Dades):
 
     def carregar_usuaris(self, path: str):
         files = self.carregar(path)
-        self._users = [Usuari(int(f[0]), f[1], f[2]) for f in files if len(f) >= 3]
+        self._set_usuaris([Usuari(int(f[0]), f[1], f[2]) for f in files if len(f) >= 3])
 
     def carregar_items(self, path: str):
         files = self.carregar(path)
-        self._items = [Item(f[0], f[1], f[2]) for f in files if len(f) >= 3]
+        self._set_items([Item(f[0], f[1], f[2]) for f in files if len(f) >= 3])
 
     def carregar_valoracions(self, path: str):
         files = self.carregar(path)
-        self._valoracions = {(int(f[0]), f[1]): float(f[2]) for f in files if len(f) >= 3}
+        self._set_valoracions({(int(f[0]), f[1]): float(f[2]) for f in files if len(f) >= 3})
 
 # Subclasse per a pel·lícules
 class DadesPelis(Dades):
@@ -146,15 +200,15 @@ class DadesPelis(Dades):
         for f in files:
             if len(f) >= 1:
                 user_ids.add(int(f[0]))
-        self._users = [Usuari(user_id) for user_id in sorted(user_ids)]
+        self._set_usuaris([Usuari(user_id) for user_id in sorted(user_ids)])
 
     def carregar_items(self, path: str):
         files = self.carregar(path)
-        self._items = [Item(int(f[0]), f[1], f[2]) for f in files if len(f) >= 3]
+        self._set_items([Item(int(f[0]), f[1], f[2]) for f in files if len(f) >= 3])
 
     def carregar_valoracions(self, path: str):
         files = self.carregar(path)
-        self._valoracions = {(int(f[0]), int(f[1])): float(f[2]) for f in files if len(f) >= 3}
+        self._set_valoracions({(int(f[0]), int(f[1])): float(f[2]) for f in files if len(f) >= 3})
 
     def carregar_links(self, path: str):
         self._links = self.carregar(path)
@@ -191,6 +245,7 @@ class RecomanadorSimple(Recomanador):
     def __init__(self, dades: Dades, min_vots: int = 3):
         super().__init__(dades)
         self._min_vots = min_vots
+        self._cache_global = None  # (versió de les valoracions, mitjana global)
 
     def recomana(self, user_id: int, n: int = 5):
         """
@@ -216,35 +271,34 @@ class RecomanadorSimple(Recomanador):
         if n < 0:
             raise ValueError("El nombre d'Ã­tems a recomanar (n) no pot ser negatiu")
         
-        valoracions = self._dades.valoracions
         items = self._dades.items
-        items_valorats = {item_id for (uid, item_id), v in valoracions.items() if uid == user_id}
-
-        # Calcular la mitjana de valoracions per cada Ã­tem
-        item_valoracions = {}
-        for (uid, item_id), v in valoracions.items():
-            if v > 0:
-                item_valoracions.setdefault(item_id, []).append(v)
-
-        # Filtrar Ã­tems amb un mÃ­nim de vots
-        item_avg_valids = [np.mean(votes) for item, votes in item_valoracions.items() if len(votes) >= self._min_vots]
-        if not item_avg_valids:
+        items_valorats = self._dades.get_valoracions_usuari(user_id)
+
+        # Suma i vots (valoracions > 0) de cada ítem, mantinguts per l'índex de Dades
+        estadistiques = self._dades._estadistiques_item
+
+        # La mitjana global només es recalcula si les valoracions han canviat
+        if self._cache_global is None or self._cache_global[0] != self._dades._versio_valoracions:
+            item_avg_valids = [suma / vots for suma, vots in estadistiques.values() if vots >= self._min_vots]
+            avg_global = np.mean(item_avg_valids) if item_avg_valids else None
+            self._cache_global = (self._dades._versio_valoracions, avg_global)
+        avg_global = self._cache_global[1]
+        if avg_global is None:
             print("No hi ha prou dades per fer recomanacions.")
             return []
 
-        avg_global = np.mean(item_avg_valids)
-
         #Calcular puntuacions
         puntuacions = []
         for item in items:
             item_id = item.get_id()
             if item_id in items_valorats:
                 continue
-            vots = item_valoracions.get(item_id, [])
-            num_vots = len(vots)
+            avg_item, num_vots = 0.0, 0
+            if item_id in estadistiques:
+                suma, num_vots = estadistiques[item_id]
+                avg_item = suma / num_vots if num_vots > 0 else 0.0
             if num_vots < self._min_vots:
                 continue
-            avg_item = np.mean(vots)
             score = (num_vots / (num_vots + self._min_vots)) * avg_item + (self._min_vots / (num_vots + self._min_vots)) * avg_global
             puntuacions.append((item, score))
         puntuacions.sort(key=lambda x: x[1], reverse=True)
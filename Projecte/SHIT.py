@@ -2,12 +2,17 @@
 
 from abc import ABC, abstractmethod
 import csv
-import os
+from collections import OrderedDict
 import numpy as np
+import scipy.sparse as sp
 from typing import List, Dict, Optional, Union, Tuple
+from utilitats import (IngestaIncremental, _llegir_valoracions_massiu, _dtype_isbn,
+                       _mida_bloc, _top_n_files, _top_n_fila, _top_n_no_valorats)
 
 # ================== CLASSES BASE ==================
 class Usuari:
+    __slots__ = ('_id', '_location', '_age')
+
     def __init__(self, user_id: int, location: str, age: float):
         self._id = user_id
         self._location = location
@@ -17,6 +22,8 @@ class Usuari:
         return self._id
 
 class Item(ABC):
+    __slots__ = ('_id', '_titol', '_categoria')
+
     def __init__(self, item_id: Union[int, str], titol: str, categoria: str):
         self._id = item_id
         self._titol = titol
@@ -33,6 +40,8 @@ class Item(ABC):
 
 # ============== CLASSES ESPECÍFIQUES ==============
 class Llibre(Item):
+    __slots__ = ('_any', '_autor', '_editorial')
+
     def __init__(self, item_id: str, titol: str, any_publicacio: int, autor: str, editorial: str = "Desconeguda"):
         super().__init__(item_id, titol, "Llibre")
         self._any = any_publicacio
@@ -43,6 +52,8 @@ class Llibre(Item):
         return f"Autor: {self._autor}, Any: {self._any}, Editorial: {self._editorial}"
 
 class Peli(Item):
+    __slots__ = ('_genere',)
+
     def __init__(self, item_id: int, titol: str, genere: str, imdb_id: int = 0, tmdb_id: int = 0):
         super().__init__(item_id, titol, "Peli")
         self._genere = genere
@@ -51,13 +62,23 @@ class Peli(Item):
         return f"Gènere: {self._genere}"
 
 # ============== CLASSE ABSTRACTA DADES ==============
-class Dades(ABC):
+class Dades(IngestaIncremental, ABC):
     def __init__(self):
-        self._ratings_matrix: np.ndarray = np.array([])
+        self._ratings_matrix = sp.csr_matrix((0, 0), dtype=np.float32)
+        self._ratings_csc: Optional[sp.csc_matrix] = None
         self._users: Dict[int, Usuari] = {}
         self._items: Dict[Union[int, str], Item] = {}
         self._user_id_to_idx: Dict[int, int] = {}
         self._item_id_to_idx: Dict[Union[int, str], int] = {}
+        self._idx_to_item_id = np.empty(0, dtype=object)
+        self._idx_to_item = np.empty(0, dtype=object)
+        self._massiu = False
+        self._informe_valoracions: Dict[str, int] = {}
+        # Versió global de la matriu i versió de cada fila (usuari) per invalidar càlculs derivats
+        self._versio_matriu = 0
+        self._versions_usuaris = np.zeros(0, dtype=np.int64)
+        # Valoracions noves pendents de fusionar amb la matriu base: (user_idx, item_idx) -> valoració
+        self._pendents: Dict[Tuple[int, int], float] = {}
 
     def get_usuari(self, user_id: int) -> Optional[Usuari]:
         return self._users.get(user_id)
@@ -65,9 +86,124 @@ class Dades(ABC):
     def get_item(self, item_id: Union[int, str]) -> Optional[Item]:
         return self._items.get(item_id)
 
-    def get_rating_matrix(self) -> np.ndarray:
+    def get_item_per_idx(self, idx: int) -> Optional[Item]:
+        return self._idx_to_item[idx] if 0 <= idx < len(self._idx_to_item) else None
+
+    def get_item_id_per_idx(self, idx: int) -> Optional[Union[int, str]]:
+        return self._idx_to_item_id[idx] if 0 <= idx < len(self._idx_to_item_id) else None
+
+    def _iniciar_items(self):
+        self._items = {}
+        self._item_id_to_idx = {}
+        self._idx_to_item_id = []
+        self._idx_to_item = []
+
+    def _registrar_item(self, item: Item):
+        # Índexs densos en ordre de lectura; un ítem repetit conserva el seu índex
+        item_id = item.get_id()
+        idx = self._item_id_to_idx.get(item_id)
+        if idx is None:
+            idx = len(self._idx_to_item_id)
+            self._item_id_to_idx[item_id] = idx
+            self._idx_to_item_id.append(item_id)
+            self._idx_to_item.append(item)
+        else:
+            self._idx_to_item[idx] = item
+        self._items[item_id] = item
+
+    def _tancar_items(self):
+        # Taules idx -> item_id i idx -> Item compartides per tots els recomanadors
+        ids = np.empty(len(self._idx_to_item_id), dtype=object)
+        ids[:] = self._idx_to_item_id
+        items = np.empty(len(self._idx_to_item), dtype=object)
+        items[:] = self._idx_to_item
+        self._idx_to_item_id, self._idx_to_item = ids, items
+
+    def get_rating_matrix(self) -> sp.csr_matrix:
         return self._ratings_matrix
 
+    def get_rating_matrix_csr(self) -> sp.csr_matrix:
+        return self._ratings_matrix
+
+    def get_rating_matrix_csc(self) -> sp.csc_matrix:
+        # Còpia per columnes per als càlculs per ítem (es crea un sol cop)
+        if self._ratings_csc is None:
+            self._ratings_csc = self._ratings_matrix.tocsc()
+        return self._ratings_csc
+
+    def get_versio_usuari(self, user_idx: int) -> int:
+        return int(self._versions_usuaris[user_idx])
+
+    def marcar_files_modificades(self, user_idxs):
+        # S'ha de cridar després de modificar files de la matriu de valoracions
+        self._versio_matriu += 1
+        self._versions_usuaris[np.asarray(user_idxs, dtype=np.int64)] = self._versio_matriu
+        self._ratings_csc = None
+
+    def _construir_matriu(self, rows: List[int], cols: List[int], vals: List[float]):
+        # Matriu dispersa: la memòria depèn del nombre de valoracions, no d'usuaris x ítems
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        vals = np.asarray(vals, dtype=np.float32)
+        num_items = len(self._item_id_to_idx)
+        # Si una valoració es repeteix es queda l'última, com en l'assignació densa
+        claus = rows[::-1] * num_items + cols[::-1]
+        _, primers = np.unique(claus, return_index=True)
+        ultims = rows.size - 1 - primers
+        self._ratings_matrix = sp.csr_matrix(
+            (vals[ultims], (rows[ultims], cols[ultims])),
+            shape=(len(self._user_id_to_idx), num_items),
+            dtype=np.float32
+        )
+        self._ratings_csc = None
+        self._pendents = {}
+        self._versio_matriu += 1
+        self._versions_usuaris = np.full(self._ratings_matrix.shape[0], self._versio_matriu, dtype=np.int64)
+
+    # ---- Ingesta incremental (afegir_valoracions és a IngestaIncremental) ----
+    def _usuari_nou(self, user_id: int) -> Usuari:
+        return Usuari(user_id, "", 0.0)
+
+    def _registrar_items_nous(self, item_ids: List[Union[int, str]]):
+        nous = [self._item_nou(item_id) for item_id in item_ids]
+        self._items.update(zip(item_ids, nous))
+        items = np.empty(len(nous), dtype=object)
+        items[:] = nous
+        self._idx_to_item = np.concatenate([self._idx_to_item, items])
+
+    def _ampliar_matriu(self, num_files: int, num_columnes: int):
+        # Files i columnes buides al final sense copiar les dades: només creix indptr
+        base = self._ratings_matrix
+        files_noves = num_files - base.shape[0]
+        indptr = np.concatenate([base.indptr, np.full(files_noves, base.indptr[-1], dtype=base.indptr.dtype)])
+        self._ratings_matrix = sp.csr_matrix((base.data, base.indices, indptr),
+                                             shape=(num_files, num_columnes), copy=False)
+        self._versions_usuaris = np.concatenate([self._versions_usuaris, np.zeros(files_noves, dtype=np.int64)])
+        self.marcar_files_modificades(np.arange(base.shape[0], num_files))
+
+    def fusionar_valoracions(self):
+        # Les pendents s'incorporen a la matriu base amb una sola suma dispersa (valor nou - anterior)
+        if not self._pendents:
+            return
+        files, columnes, valors = self._claus_pendents()
+        base = self._ratings_matrix
+        anteriors = np.asarray(base[files, columnes]).ravel()
+        delta = sp.csr_matrix((valors - anteriors, (files, columnes)), shape=base.shape)
+        self._ratings_matrix = sp.csr_matrix(base + delta, dtype=np.float32)
+        self._pendents = {}
+        self.marcar_files_modificades(np.unique(files))
+
+    def _valoracio_valida(self, rating: float) -> bool:
+        return True
+
+    def _convertir_item_id(self, item_id) -> Union[int, str]:
+        return item_id
+
+    @abstractmethod
+    def _item_nou(self, item_id: Union[int, str]) -> Item:
+        # Ítem que arriba amb una valoració abans que la seva fitxa
+        pass
+
     @abstractmethod
     def carregar_usuaris(self, path: str):
         pass
@@ -82,9 +218,10 @@ class Dades(ABC):
 
 # ============== IMPLEMENTACIÓ PELÍCULES ==============
 class DadesPelis(Dades):
-    def __init__(self, path: str):
+    def __init__(self, path: str, massiu: bool = False):
         super().__init__()
         self._path = path
+        self._massiu = massiu  # Lectura de valoracions per blocs amb NumPy
 
     def _carregar_csv(self, fitxer: str) -> List[List[str]]:
         try:
@@ -96,6 +233,16 @@ class DadesPelis(Dades):
             print(f"Error llegint {fitxer}: {str(e)}")
             return []
 
+    def _valoracio_valida(self, rating: float) -> bool:
+        return 0 < rating <= 5
+
+    def _convertir_item_id(self, item_id) -> int:
+        return int(item_id)
+
+    def _item_nou(self, item_id: int) -> Item:
+        # Ítem que arriba amb una valoració abans que la seva fitxa
+        return Peli(item_id, "(sense títol)", "(no genres listed)")
+
     def carregar_usuaris(self, path: str):
         data = self._carregar_csv(path)
         self._users = {}
@@ -110,24 +257,25 @@ class DadesPelis(Dades):
 
     def carregar_items(self, path: str):
         data = self._carregar_csv(path)
-        self._items = {}
-        self._item_id_to_idx = {}
-        for idx, line in enumerate(data):
+        self._iniciar_items()
+        for line in data:
             if len(line) >= 3:
                 try:
                     movie_id = int(line[0])
                     title = line[1]
                     genres = line[2]
-                    self._items[movie_id] = Peli(movie_id, title, genres)
-                    self._item_id_to_idx[movie_id] = idx
+                    self._registrar_item(Peli(movie_id, title, genres))
                 except ValueError:
                     continue
+        self._tancar_items()
 
     def carregar_valoracions(self, path: str):
-        num_users = len(self._user_id_to_idx)
-        num_items = len(self._item_id_to_idx)
-        self._ratings_matrix = np.zeros((num_users, num_items), dtype=np.float32)
-
+        if self._massiu:
+            triplets, self._informe_valoracions = _llegir_valoracions_massiu(
+                path, self._user_id_to_idx, self._item_id_to_idx, np.int64, lambda r: (r > 0) & (r <= 5))
+            self._construir_matriu(*triplets)
+            return
+        rows, cols, vals = [], [], []
         with open(path, 'r', encoding='utf-8') as f:
             reader = csv.reader(f)
             next(reader)
@@ -140,30 +288,41 @@ class DadesPelis(Dades):
                         if rating <= 0 or rating > 5:
                             continue
                         if user_id in self._user_id_to_idx and movie_id in self._item_id_to_idx:
-                            u_idx = self._user_id_to_idx[user_id]
-                            i_idx = self._item_id_to_idx[movie_id]
-                            self._ratings_matrix[u_idx, i_idx] = rating
+                            rows.append(self._user_id_to_idx[user_id])
+                            cols.append(self._item_id_to_idx[movie_id])
+                            vals.append(rating)
                     except ValueError:
                         continue
+        self._construir_matriu(rows, cols, vals)
 
 
 # ============== IMPLEMENTACIÓ LLIBRES (CORREGIDA) ==============
 class DadesLlibres(Dades):
-    def __init__(self, path: str):
+    def __init__(self, path: str, massiu: bool = False):
         super().__init__()
         self._path = path
-        self.MAX_BOOKS = 10000  # Només llegir 10k línies
+        self._massiu = massiu  # Lectura de valoracions per blocs amb NumPy
 
     def _carregar_csv(self, fitxer: str) -> List[List[str]]:
         try:
             with open(fitxer, 'r', encoding='utf-8') as f:
                 reader = csv.reader(f)
                 next(reader)  # Saltar capçalera
-                return [line for idx, line in enumerate(reader) if idx < self.MAX_BOOKS and line]  # Llegir fins a 10k línies
+                return [line for line in reader if line]
         except Exception as e:
             print(f"Error llegint {fitxer}: {str(e)}")
             return []
         
+    def _valoracio_valida(self, rating: float) -> bool:
+        return 1 <= rating <= 10
+
+    def _convertir_item_id(self, item_id) -> str:
+        return str(item_id)
+
+    def _item_nou(self, item_id: str) -> Item:
+        # Ítem que arriba amb una valoració abans que la seva fitxa
+        return Llibre(item_id, "(sense títol)", 0, "Desconegut")
+
     def carregar_usuaris(self, path: str):
         data = self._carregar_csv(path)
         self._users = {}
@@ -180,10 +339,9 @@ class DadesLlibres(Dades):
 
     def carregar_items(self, path: str):
         data = self._carregar_csv(path)
-        self._items = {}
-        self._item_id_to_idx = {}
-        
-        for idx, line in enumerate(data):
+        self._iniciar_items()
+
+        for line in data:
             if len(line) >= 4:
                 isbn = line[0]
                 titol = line[1]
@@ -191,16 +349,18 @@ class DadesLlibres(Dades):
                 any_publicacio = int(line[3]) if line[3].strip().isdigit() else 0
                 editorial = line[4] if len(line) > 4 else "Desconeguda"
                 
-                self._items[isbn] = Llibre(isbn, titol, any_publicacio, autor, editorial)
-                self._item_id_to_idx[isbn] = idx  # Índex segons l'ordre de lectura (sense ordenar!)
+                self._registrar_item(Llibre(isbn, titol, any_publicacio, autor, editorial))
+        self._tancar_items()
 
     def carregar_valoracions(self, path: str):
-        # 1. Crear matriu amb mides correctes
-        num_users = len(self._user_id_to_idx)
-        num_items = len(self._item_id_to_idx)
-        self._ratings_matrix = np.zeros((num_users, num_items), dtype=np.float32)
-        
-        # 2. Carregar només valoracions d'usuaris i ítems dins dels 10k
+        if self._massiu:
+            triplets, self._informe_valoracions = _llegir_valoracions_massiu(
+                path, self._user_id_to_idx, self._item_id_to_idx, _dtype_isbn(self._item_id_to_idx),
+                lambda r: (r >= 1) & (r <= 10))
+            self._construir_matriu(*triplets)
+            return
+        # Acumular triplets (usuari, ítem, valoració) per a la matriu dispersa
+        rows, cols, vals = [], [], []
         with open(path, 'r', encoding='utf-8') as f:
             reader = csv.reader(f)
             next(reader)
@@ -217,11 +377,14 @@ class DadesLlibres(Dades):
                             i_idx = self._item_id_to_idx[isbn]
                             
                             if 1 <= rating <= 10:  # Acceptar valors entre 1 i 10
-                                self._ratings_matrix[u_idx, i_idx] = rating
+                                rows.append(u_idx)
+                                cols.append(i_idx)
+                                vals.append(rating)
                     except ValueError:
                         continue
-        
-        print(f"[DEBUG] Valoracions no zero: {np.count_nonzero(self._ratings_matrix)}")
+        self._construir_matriu(rows, cols, vals)
+
+        print(f"[DEBUG] Valoracions no zero: {self._ratings_matrix.nnz}")
 
 
 # ============== RECOMANADOR COL·LABORATIU ==============
@@ -233,55 +396,283 @@ class Recomanador(ABC):
     def recomana(self, user_id: int, n: int) -> List[Tuple[Item, float]]:
         pass
 
+    def recomana_batch(self, user_ids: List[int], n: int) -> Tuple[np.ndarray, np.ndarray]:
+        # Retorna índexs d'ítem (usuaris, n) i puntuacions, amb -1 / NaN com a farciment
+        user_idxs = np.array([self._dades._user_id_to_idx.get(u, -1) for u in user_ids], dtype=np.int64)
+        return self.recomana_batch_idx(user_idxs, n)
+
+    @abstractmethod
+    def puntuacions_bloc(self, user_idxs: np.ndarray) -> np.ndarray:
+        # Puntuacions (usuaris, ítems) sobre tot el catàleg; -inf als ítems que no es poden recomanar
+        pass
+
+    def puntuacions(self, user_idx: int) -> np.ndarray:
+        return self.puntuacions_bloc(np.array([user_idx]))[0]
+
+    def preparar(self):
+        # Fa per endavant la feina mandrosa (valoracions pendents, còpia CSC, matrius derivades)
+        # perquè després només calgui llegir, p. ex. des dels processos de precalcul
+        self._dades.fusionar_valoracions()
+        self._dades.get_rating_matrix_csc()
+
+    def recomana_batch_idx(self, user_idxs: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        # Blocs d'usuaris (índex -1 = usuari desconegut): puntuacions completes i top-n per files
+        matriu = self._dades.get_rating_matrix()
+        user_idxs = np.asarray(user_idxs, dtype=np.int64)
+        indexos = np.full((len(user_idxs), n), -1, dtype=np.int32)
+        scores = np.full((len(user_idxs), n), np.nan, dtype=np.float32)
+        mida = _mida_bloc(max(matriu.shape))
+        for inici in range(0, len(user_idxs), mida):
+            files = np.arange(inici, min(inici + mida, len(user_idxs)))
+            files = files[user_idxs[files] >= 0]
+            if files.size == 0:
+                continue
+            bloc = user_idxs[files]
+            indexos[files], scores[files] = _top_n_no_valorats(self.puntuacions_bloc(bloc),
+                                                                self._dades.get_valorats(bloc), n)
+        return indexos, scores
+
 
 class RecomanadorSimple(Recomanador):
     def __init__(self, dades: Dades, min_vots: int = 3):
         super().__init__(dades)
         self._min_vots = min_vots
 
+    def _puntuacions_base(self) -> Tuple[np.ndarray, np.ndarray]:
+        # Vots i mitjana per ítem directament de l'estructura CSC (sense densificar)
+        matriu = self._dades.get_rating_matrix()
+        per_columnes = self._dades.get_rating_matrix_csc()
+        num_vots = np.diff(per_columnes.indptr)
+        suma_item = np.asarray(per_columnes.sum(axis=0), dtype=np.float64).ravel()
+        avg_global = np.mean(matriu.data) if matriu.nnz > 0 else 0.0
+
+        candidats = num_vots >= self._min_vots
+        scores = np.full(num_vots.size, -np.inf)
+        vots = num_vots[candidats]
+        avg_item = suma_item[candidats] / vots
+        scores[candidats] = (vots / (vots + self._min_vots)) * avg_item + \
+                            (self._min_vots / (vots + self._min_vots)) * avg_global
+        return scores, candidats
+
+    def puntuacions_bloc(self, user_idxs: np.ndarray) -> np.ndarray:
+        # La puntuació de popularitat és la mateixa per a tots els usuaris
+        base, _ = self._puntuacions_base()
+        return np.repeat(base[None, :], len(user_idxs), axis=0)
+
     def recomana(self, user_id: int, n: int = 10) -> List[Tuple[Item, float]]:
         user_idx = self._dades._user_id_to_idx.get(user_id)
         if user_idx is None:
             return []
 
-        matriu = self._dades.get_rating_matrix()
-        valoracions_usuari = matriu[user_idx]
-        #print(valoracions_usuari)
-        items_valorats = set(np.where(valoracions_usuari > 0)[0])
-        #print(items_valorats)
-        
-
-        total_ratings = matriu[matriu > 0]
-        avg_global = np.mean(total_ratings) if total_ratings.size > 0 else 0.0
-
+        valorats = self._dades.get_valorats([user_idx])
+        idx_top, scores_top = _top_n_no_valorats(self.puntuacions_bloc(np.array([user_idx])), valorats, n)
+        # Només es creen les tuples (Item, puntuació) dels n finals
         prediccions = []
-        for item_idx in range(matriu.shape[1]):
-            if item_idx in items_valorats:
-                continue
-
-            ratings_item = matriu[:, item_idx]
-            valid_ratings = ratings_item[ratings_item > 0]
-            num_vots = len(valid_ratings)
-
-            if num_vots < self._min_vots:
-                continue
-
-            avg_item = np.mean(valid_ratings)
-            score = (num_vots / (num_vots + self._min_vots)) * avg_item + \
-                    (self._min_vots / (num_vots + self._min_vots)) * avg_global
-
-            item_id = list(self._dades._item_id_to_idx.keys())[item_idx]
-            item = self._dades.get_item(item_id)
+        for item_idx, score in zip(idx_top[0], scores_top[0]):
+            if item_idx < 0:
+                break
+            item = self._dades.get_item_per_idx(item_idx)
             if item:
-                prediccions.append((item, score))
-
-        prediccions.sort(key=lambda x: x[1], reverse=True)
-        return prediccions[:n]
+                prediccions.append((item, float(score)))
+        return prediccions
+
+class CacheSimilituds:
+    # Veïns (índexs int32 + similituds float32) per usuari amb expulsió LRU limitada per bytes.
+    # Cada entrada guarda la versió de la matriu amb què es va calcular i deixa de ser vàlida si canvia:
+    # els veïns d'un usuari depenen de totes les files, no només de la seva
+    SOBRECOST_ENTRADA = 128  # Bytes aproximats de la clau, la tupla i l'entrada de l'OrderedDict
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self._max_bytes = max_bytes
+        self._entrades: "OrderedDict[int, Tuple[np.ndarray, np.ndarray, int]]" = OrderedDict()
+        self._bytes = 0
+        self.encerts = 0
+        self.fallades = 0
+        self.expulsions = 0
+
+    def _mida(self, entrada) -> int:
+        return entrada[0].nbytes + entrada[1].nbytes + self.SOBRECOST_ENTRADA
+
+    def obtenir(self, user_idx: int, versio: int) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        entrada = self._entrades.get(user_idx)
+        if entrada is None or entrada[2] != versio:
+            if entrada is not None:
+                self.invalida(user_idx)
+            self.fallades += 1
+            return None
+        self._entrades.move_to_end(user_idx)
+        self.encerts += 1
+        return entrada[0], entrada[1]
+
+    def desar(self, user_idx: int, versio: int, veins: np.ndarray, sims: np.ndarray):
+        self.invalida(user_idx)
+        entrada = (np.asarray(veins, dtype=np.int32), np.asarray(sims, dtype=np.float32), versio)
+        if self._mida(entrada) > self._max_bytes:
+            return
+        self._entrades[user_idx] = entrada
+        self._bytes += self._mida(entrada)
+        while self._bytes > self._max_bytes:
+            _, expulsada = self._entrades.popitem(last=False)
+            self._bytes -= self._mida(expulsada)
+            self.expulsions += 1
+
+    def invalida(self, user_idx: int):
+        entrada = self._entrades.pop(user_idx, None)
+        if entrada is not None:
+            self._bytes -= self._mida(entrada)
+
+    def buida(self):
+        self._entrades.clear()
+        self._bytes = 0
+
+    def estadistiques(self) -> Dict[str, int]:
+        return {"entrades": len(self._entrades), "bytes": self._bytes, "encerts": self.encerts,
+                "fallades": self.fallades, "expulsions": self.expulsions}
+
+class IndexLSH:
+    # Cerca aproximada de veïns amb projeccions aleatòries (LSH per al cosinus) sobre les files
+    # normalitzades de la matriu. Cada taula agrupa els usuaris pel signe de `bits` projeccions:
+    # més taules => més candidats i més recall; més bits => cubetes més petites i consultes més ràpides.
+    # L'índex només tria candidats; el recomanador els reordena amb la seva similitud (ítems comuns).
+    # Per defecte 64 taules x 4 bits: a benchmark_ann.py és la configuració més ràpida amb recall >= 0.99
+    def __init__(self, matriu: sp.csr_matrix, num_taules: int = 64, bits: int = 4, llavor: int = 0):
+        if not 0 <= bits <= 62:  # bits = 0: una sola cubeta, és a dir, cerca exacta
+            raise ValueError("bits ha d'estar entre 0 i 62")
+        self._num_taules = num_taules
+        self._bits = bits
+        normes = np.sqrt(np.asarray(matriu.multiply(matriu).sum(axis=1)).ravel())
+        normalitzada = sp.csr_matrix(sp.diags(np.where(normes > 0, 1.0 / np.maximum(normes, 1e-12), 0.0)) @ matriu)
+        projeccions = np.random.default_rng(llavor).standard_normal(
+            (matriu.shape[1], num_taules * bits)).astype(np.float32)
+        pesos = np.left_shift(np.int64(1), np.arange(bits, dtype=np.int64))
+
+        self._codis = np.empty((matriu.shape[0], num_taules), dtype=np.int64)
+        mida = _mida_bloc(num_taules * bits)
+        for inici in range(0, matriu.shape[0], mida):
+            final = min(inici + mida, matriu.shape[0])
+            signes = (normalitzada[inici:final] @ projeccions) > 0
+            self._codis[inici:final] = (signes.reshape(final - inici, num_taules, bits) * pesos).sum(axis=2)
+        # Per taula: usuaris ordenats per codi, per trobar una cubeta amb searchsorted
+        self._ordres = np.argsort(self._codis, axis=0, kind='stable').T.astype(np.int32)
+        self._codis_ordenats = np.take_along_axis(self._codis, self._ordres.T, axis=0).T.copy()
+
+    def candidats(self, user_idx: int) -> np.ndarray:
+        trobats = []
+        for t in range(self._num_taules):
+            codi = self._codis[user_idx, t]
+            inici = np.searchsorted(self._codis_ordenats[t], codi, side='left')
+            final = np.searchsorted(self._codis_ordenats[t], codi, side='right')
+            trobats.append(self._ordres[t, inici:final])
+        candidats = np.unique(np.concatenate(trobats))
+        return candidats[candidats != user_idx]
 
 class RecomanadorCol·laboratiu(Recomanador):
-    def __init__(self, dades: Dades, k: int = 50):  # Augmentar k significativament
+    def __init__(self, dades: Dades, k: int = 50, max_bytes_cache: int = 64 * 1024 * 1024,
+                 aproximat: bool = False, num_taules: int = 64, bits: int = 4):  # Augmentar k significativament
         super().__init__(dades)
         self._k = k
+        self._cache = CacheSimilituds(max_bytes_cache)
+        self._preparat = None  # (versió de la matriu, matrius derivades)
+        # Mode aproximat: els veïns es busquen només entre els candidats de l'índex LSH. Amb MovieLens i
+        # amb les dades sintètiques de llibres no surt a compte (amb recall alt és més lent que la cerca
+        # exacta, vegeu benchmark_ann.py), així que el camí recomanat és aproximat=False
+        self._aproximat = aproximat
+        self._num_taules = num_taules
+        self._bits = bits
+        self._index = None  # (versió de la matriu, IndexLSH)
+
+    def get_cache(self) -> CacheSimilituds:
+        return self._cache
+
+    def _preparat_actual(self):
+        # Les matrius derivades només es refan quan canvia la matriu de valoracions
+        if self._preparat is None or self._preparat[0] != self._dades._versio_matriu:
+            self._preparat = (self._dades._versio_matriu, self._preparar())
+        return self._preparat[1]
+
+    def _index_actual(self) -> IndexLSH:
+        if self._index is None or self._index[0] != self._dades._versio_matriu:
+            self._index = (self._dades._versio_matriu,
+                           IndexLSH(self._dades.get_rating_matrix(), self._num_taules, self._bits))
+        return self._index[1]
+
+    def preparar(self):
+        super().preparar()
+        self._preparat_actual()
+        if self._aproximat:
+            self._index_actual()
+
+    def _veins(self, user_idx: int, preparat) -> Tuple[np.ndarray, np.ndarray]:
+        # Top-k veïns de l'usuari; les consultes repetides no refan la cerca sobre tots els usuaris
+        versio = self._dades._versio_matriu
+        guardat = self._cache.obtenir(user_idx, versio)
+        if guardat is not None:
+            return guardat
+        altres = None
+        if self._aproximat:
+            # Els candidats de l'LSH es reordenen amb la mateixa similitud que la cerca exacta; si n'hi
+            # ha menys de k (l'usuari ha caigut en cubetes gairebé buides) es fa la cerca exacta
+            candidats = self._index_actual().candidats(user_idx)
+            altres = candidats if candidats.size >= self._k else None
+        sims = self._similituds_bloc(np.array([user_idx]), preparat, altres)[0]
+        veins, sims_veins = _top_n_fila(sims, self._k)
+        if altres is not None:
+            veins = altres[veins]
+        self._cache.desar(user_idx, versio, veins, sims_veins)
+        return veins.astype(np.int32), sims_veins
+
+    def _preparar(self):
+        # Matrius derivades compartides per totes les files d'un lot
+        matriu = self._dades.get_rating_matrix()
+        binaria = matriu.copy()
+        binaria.data = (binaria.data > 0).astype(matriu.dtype)
+        quadrats = matriu.multiply(matriu).tocsr()
+        vots = np.diff(matriu.indptr)
+        mitjanes = np.asarray(matriu.sum(axis=1)).ravel() / np.maximum(vots, 1)
+        centrades = matriu.astype(np.float64)
+        centrades.data = centrades.data - np.repeat(mitjanes, vots)
+        return matriu, binaria, quadrats, mitjanes, centrades
+
+    def _similituds_bloc(self, user_idxs: np.ndarray, preparat, altres: np.ndarray = None) -> np.ndarray:
+        # Similitud del cosinus sobre els ítems comuns d'un bloc d'usuaris contra tots (o només
+        # contra `altres`): els zeros de la matriu fan que els productes només sumin els ítems
+        # valorats per tots dos (es calcula en el dtype de la matriu perquè els empats es resolguin com abans)
+        matriu, binaria, quadrats, _, _ = preparat
+        files = matriu[user_idxs]
+        files_binaria = binaria[user_idxs]
+        if altres is None:
+            altres = np.arange(matriu.shape[0])
+        else:
+            matriu, binaria, quadrats = matriu[altres], binaria[altres], quadrats[altres]
+        producte_punt = (files @ matriu.T).toarray()
+        norma_u = np.sqrt((files.multiply(files) @ binaria.T).toarray())
+        norma_v = np.sqrt((files_binaria @ quadrats.T).toarray())
+        items_comuns = (files_binaria @ binaria.T).toarray()
+
+        denominador = norma_u * norma_v
+        sims = np.divide(producte_punt, denominador,
+                         out=np.zeros_like(producte_punt), where=denominador != 0)
+        candidats = (items_comuns >= 1) & (altres[None, :] != user_idxs[:, None])  # Permetre mínim 1 ítem comú
+        return np.where(candidats, sims, -np.inf)
+
+    def _prediccions_bloc(self, user_idxs: np.ndarray, veins: np.ndarray, sims: np.ndarray, preparat) -> np.ndarray:
+        # Predicció centrada en la mitjana de cada veí amb una única suma ponderada dispersa;
+        # -inf als ítems que no es poden recomanar
+        matriu, binaria, _, mitjanes, centrades = preparat
+        valids = veins >= 0
+        files = np.repeat(np.arange(user_idxs.size), valids.sum(axis=1))
+        pesos = sp.csr_matrix((sims[valids].astype(np.float64), (files, veins[valids])),
+                              shape=(user_idxs.size, matriu.shape[0]))
+        scores = (pesos @ centrades).toarray()
+        weights = (abs(pesos) @ binaria).toarray()
+
+        pred = np.full(scores.shape, -np.inf)
+        np.divide(scores, weights, out=pred, where=weights > 0)
+        pred += mitjanes[user_idxs][:, None]
+        valorades = self._dades.get_valorats(user_idxs)
+        pred[np.repeat(np.arange(user_idxs.size), np.diff(valorades.indptr)), valorades.indices] = -np.inf
+        pred[pred <= 0] = -np.inf  # Filtrar prediccions negatives
+        return pred
 
     def recomana(self, user_id: int, n: int = 10) -> List[Tuple[Item, float]]:
         matriu = self._dades.get_rating_matrix()
@@ -289,92 +680,59 @@ class RecomanadorCol·laboratiu(Recomanador):
         if user_idx is None:
             print("⚠️ Usuari no trobat")
             return []
-
-        user_ratings = matriu[user_idx, :]
-        valoracions_valides = user_ratings[user_ratings > 0]
-        if len(valoracions_valides) == 0:
+        if matriu[user_idx].nnz == 0:
             print("⚠️ L'usuari no té valoracions")
             return []
-            
-        mu_u = np.mean(valoracions_valides)
 
-        similituds = []
-        for alt_idx in range(matriu.shape[0]):
-            if alt_idx == user_idx:
-                continue
-            
-            # Trobar ítems comuns AMB VALORACIONS (>0)
-            mascara_comuns = (user_ratings > 0) & (matriu[alt_idx] > 0)
-            items_comuns = np.where(mascara_comuns)[0]
-            
-            if len(items_comuns) < 1:  # Permetre mínim 1 ítem comú
-                continue
-            
-            u = user_ratings[items_comuns]
-            v = matriu[alt_idx][items_comuns]
-            
-            # Càlcul robust de similitud del cosinus
-            producte_punt = np.dot(u, v)
-            norma_u = np.linalg.norm(u)
-            norma_v = np.linalg.norm(v)
-            
-            if norma_u == 0 or norma_v == 0:
-                sim = 0.0
-            else:
-                sim = producte_punt / (norma_u * norma_v)
-            
-            similituds.append((alt_idx, sim))
+        preparat = self._preparat_actual()
+        user_idxs = np.array([user_idx])
 
         # Seleccionar TOP k veïns (fins i tot amb similitud baixa)
-        similituds.sort(key=lambda x: x[1], reverse=True)
-        top_k = similituds[:self._k]
-
-        # Si no hi ha veïns, retornar buit
-        if not top_k:
+        veins, sims_veins = self._veins(user_idx, preparat)
+        if veins.size == 0:
             print("⚠️ No s'han trobat usuaris similars")
             return []
 
-        scores = np.zeros(matriu.shape[1])
-        weights = np.zeros(matriu.shape[1])
-
-        for alt_idx, sim in top_k:
-            alt_ratings = matriu[alt_idx]
-            mu_v = np.mean(alt_ratings[alt_ratings > 0]) if np.any(alt_ratings > 0) else 0.0
-            
-            for i in range(matriu.shape[1]):
-                if user_ratings[i] == 0 and alt_ratings[i] > 0:
-                    scores[i] += sim * (alt_ratings[i] - mu_v)
-                    weights[i] += abs(sim)
-
-        # Generar recomanacions només per ítems no valorats i amb pes > 0
-        recomanacions = []
-        for i in range(matriu.shape[1]):
-            if weights[i] > 0 and user_ratings[i] == 0:
-                pred = mu_u + (scores[i] / weights[i])
-                item_id = list(self._dades._item_id_to_idx.keys())[i]
-                item = self._dades.get_item(item_id)
-                if item and pred > 0:  # Filtrar prediccions negatives
-                    recomanacions.append((item, pred))
-        
-        if not recomanacions:
+        pred = self._prediccions_bloc(user_idxs, veins[None, :], sims_veins[None, :], preparat)[0]
+        idx_top, pred_top = _top_n_fila(pred, n)
+        if idx_top.size == 0:
             print("⚠️ No hi ha suficients dades per generar recomanacions")
             return []
 
-        recomanacions.sort(key=lambda x: x[1], reverse=True)
-        return recomanacions[:n]
-    
+        recomanacions = []
+        for i, puntuacio in zip(idx_top, pred_top):
+            item = self._dades.get_item_per_idx(i)
+            if item:
+                recomanacions.append((item, float(puntuacio)))
+        return recomanacions
+
+    def puntuacions_bloc(self, user_idxs: np.ndarray) -> np.ndarray:
+        # Similituds amb productes matriu-matriu, veïns amb top-k per files i prediccions
+        # amb un producte dispers per bloc
+        preparat = self._preparat_actual()
+        user_idxs = np.asarray(user_idxs, dtype=np.int64)
+        if self._aproximat:
+            veins = np.full((user_idxs.size, self._k), -1, dtype=np.int32)
+            sims = np.full((user_idxs.size, self._k), np.nan, dtype=np.float32)
+            for fila, user_idx in enumerate(user_idxs):
+                veins_u, sims_u = self._veins(user_idx, preparat)
+                veins[fila, :veins_u.size], sims[fila, :sims_u.size] = veins_u, sims_u
+        else:
+            veins, sims = _top_n_files(self._similituds_bloc(user_idxs, preparat), self._k)
+        return self._prediccions_bloc(user_idxs, veins, np.nan_to_num(sims), preparat)
+
 
 def main():
     print("=== SISTEMA DE RECOMANACIÓ ===")
     tipus = input("Selecciona el tipus de dades (llibres/pelis): ").lower()
     
     if tipus == "llibres":
-        dades = DadesLlibres("carpeta_books/")
+        dades = DadesLlibres("carpeta_books/", massiu=True)
         dades.carregar_usuaris("carpeta_books/Users.csv")
         dades.carregar_items("carpeta_books/Books.csv")
         dades.carregar_valoracions("carpeta_books/Ratings.csv")
     elif tipus == "pelis":
-        dades = DadesPelis("carpeta_movies/")
+        dades = DadesPelis("carpeta_movies/", massiu=True)
         dades.carregar_usuaris("carpeta_movies/ratings.csv")
         dades.carregar_items("carpeta_movies/movies.csv")
         dades.carregar_valoracions("carpeta_movies/ratings.csv")
@@ -420,7 +778,7 @@ if __name__ == "__main__":
 
 """
 
-dades = DadesLlibres("carpeta_books/")
+dades = DadesLlibres("carpeta_books/", massiu=True)
 dades.carregar_usuaris("carpeta_books/Users.csv")
 dades.carregar_items("carpeta_books/Books.csv")
 dades.carregar_valoracions("carpeta_books/Ratings.csv")
@@ -433,7 +791,7 @@ def mostrar_usuaris_actius(dades: Dades):
         user_idx = dades._user_id_to_idx.get(user_id)
         if user_idx is not None:
             # Comprovar si té alguna valoració > 0
-            if np.any(matriu[user_idx] > 0):
+            if matriu[user_idx].nnz > 0:
                 usuaris_actius.append(user_id)
     
     print(f"Usuaris amb valoracions: {len(usuaris_actius)}/{len(dades._users)}")
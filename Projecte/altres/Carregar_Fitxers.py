@@ -31,12 +31,27 @@ class Dades(ABC):
         self._users: List[Usuari] = []
         self._items: List[Item] = []
         self._valoracions: Dict[Tuple[int, int], float] = {}
+        # Índexs per id al costat de les llistes per consultes O(1)
+        self._users_per_id: Dict[int, Usuari] = {}
+        self._items_per_id: Dict[int, Item] = {}
 
     def get_usuari(self, user_id: int) -> Union[Usuari, None]:
-        return next((u for u in self._users if u.get_id() == user_id), None)
+        return self._users_per_id.get(user_id)
 
     def get_item(self, item_id: int) -> Union[Item, None]:
-        return next((i for i in self._items if i.get_id() == item_id), None)
+        return self._items_per_id.get(item_id)
+
+    def _set_usuaris(self, usuaris: List[Usuari]):
+        self._users = usuaris
+        self._users_per_id = {}
+        for u in usuaris:
+            self._users_per_id.setdefault(u.get_id(), u)  # Com abans, guanya el primer
+
+    def _set_items(self, items: List[Item]):
+        self._items = items
+        self._items_per_id = {}
+        for i in items:
+            self._items_per_id.setdefault(i.get_id(), i)
 
     @property
     def recomanacions(self):
@@ -88,11 +103,11 @@ class DadesLlibres(Dades):
 
     def carregar_usuaris(self, path: str):
         files = self.carregar(path)
-        self._users = [Usuari(int(f[0]), f[1], f[2]) for f in files if len(f) >= 3]
+        self._set_usuaris([Usuari(int(f[0]), f[1], f[2]) for f in files if len(f) >= 3])
 
     def carregar_items(self, path: str):
         files = self.carregar(path)
-        self._items = [Item(f[0], f[1], f[2]) for f in files if len(f) >= 3]
+        self._set_items([Item(f[0], f[1], f[2]) for f in files if len(f) >= 3])
 
     def carregar_valoracions(self, path: str):
         files = self.carregar(path)
@@ -126,11 +141,11 @@ class DadesPelis(Dades):
         for f in files:
             if len(f) >= 1:
                 user_ids.add(int(f[0]))
-        self._users = [Usuari(user_id) for user_id in sorted(user_ids)]
+        self._set_usuaris([Usuari(user_id) for user_id in sorted(user_ids)])
 
     def carregar_items(self, path: str):
         files = self.carregar(path)
-        self._items = [Item(int(f[0]), f[1], f[2]) for f in files if len(f) >= 3]
+        self._set_items([Item(int(f[0]), f[1], f[2]) for f in files if len(f) >= 3])
 
     def carregar_valoracions(self, path: str):
         files = self.carregar(path)
@@ -0,0 +1,212 @@
+import copy
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import numpy as np
+import scipy.sparse as sp
+from typing import Dict, List, Optional, Tuple
+
+from Codi_Matrius import (DadesPelis, DadesLlibres, RecomanadorSimple, RecomanadorRecent, RecomanadorItemItem,
+                          RecomanadorALS)
+from precalcul import _PicklerCompartit, _UnpicklerCompartit
+from recomenador3 import recomenador_contingut
+from recomanador_hibrid import RecomanadorHibrid
+from utilitats import _mida_bloc, _top_n_no_valorats
+
+# ================== AVALUACIÓ FORA DE LÍNIA ==================
+# Validació creuada (k particions aleatòries o partició temporal) de qualsevol Recomanador:
+# s'entrena amb la part d'entrenament, es prediuen tots els parells reservats per blocs
+# d'usuaris amb puntuacions_bloc i es calculen MAE/RMSE i precision/recall/NDCG@n.
+# Cada parella (recomanador, partició) és una tasca d'un ProcessPoolExecutor.
+
+class Avaluador:
+    # Mètriques vectoritzades sobre arrays alineats de prediccions i valors reals
+    def calcular_mae(self, prediccions: np.ndarray, reals: np.ndarray) -> float:
+        errors = np.abs(np.asarray(prediccions, dtype=np.float64) - np.asarray(reals, dtype=np.float64))
+        return float(errors.mean()) if errors.size else 0.0
+
+    def calcular_rmse(self, prediccions: np.ndarray, reals: np.ndarray) -> float:
+        errors = np.asarray(prediccions, dtype=np.float64) - np.asarray(reals, dtype=np.float64)
+        return float(np.sqrt(np.mean(errors ** 2))) if errors.size else 0.0
+
+    def calcular_ranking(self, recomanats: np.ndarray, rellevants: sp.csr_matrix) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # recomanats: (usuaris, n) índexs d'ítem amb -1 de farciment; rellevants: (usuaris, ítems) binària.
+        # Retorna precision@n, recall@n i NDCG@n per usuari
+        usuaris, n = recomanats.shape
+        valids = recomanats >= 0
+        files = np.repeat(np.arange(usuaris), n)
+        encerts = np.asarray(rellevants[files, np.where(valids, recomanats, 0).ravel()]).reshape(usuaris, n) > 0
+        encerts &= valids
+        num_rellevants = np.diff(rellevants.indptr)
+        descompte = 1.0 / np.log2(np.arange(2, n + 2))
+        ideal = np.concatenate([[0.0], np.cumsum(descompte)])[np.minimum(num_rellevants, n)]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            precisio = encerts.sum(axis=1) / n
+            recall = np.where(num_rellevants > 0, encerts.sum(axis=1) / num_rellevants, 0.0)
+            ndcg = np.where(ideal > 0, (encerts * descompte).sum(axis=1) / ideal, 0.0)
+        return precisio, recall, ndcg
+
+# ---- Particions ----
+def particions_aleatories(num_valoracions: int, k: int = 5, llavor: int = 0) -> np.ndarray:
+    # Partició (0..k-1) de cada valoració
+    return np.random.default_rng(llavor).permutation(num_valoracions) % k
+
+def particio_temporal(timestamps: np.ndarray, fraccio_test: float = 0.2) -> np.ndarray:
+    # Partició 0 (test) per a la fracció més recent de valoracions i -1 (només entrenament) per a la resta
+    particio = np.full(timestamps.size, -1, dtype=np.int64)
+    num_test = int(round(timestamps.size * fraccio_test))
+    if num_test > 0:
+        particio[np.argsort(timestamps, kind='stable')[-num_test:]] = 0
+    return particio
+
+def _dades_entrenament(dades, files: np.ndarray, columnes: np.ndarray, valors: np.ndarray,
+                       timestamps: Optional[np.ndarray] = None):
+    # Còpia superficial de les dades amb una matriu que només conté les valoracions d'entrenament
+    entrenament = copy.copy(dades)
+    if sp.isspmatrix_csc(dades._ratings_matrix):  # Codi_Matrius.py
+        entrenament._ratings_matrix = sp.csc_matrix((valors, (files, columnes)),
+                                                    shape=dades._ratings_matrix.shape, dtype=np.float32)
+        entrenament._ratings_csr = None
+        # Les valoracions ja arriben en ordre de columna: els timestamps continuen alineats
+        entrenament._timestamps = timestamps
+        entrenament._timestamps_csr = None
+        entrenament._index_temporal = None
+        entrenament._calcular_estadistiques_items()
+    else:  # SHIT.py
+        entrenament._construir_matriu(files, columnes, valors)
+    return entrenament
+
+# ---- Treball de cada procés ----
+_estat_worker = None
+
+def _iniciar_worker(directori: str):
+    global _estat_worker
+    with open(os.path.join(directori, "avaluacio.pkl"), 'rb') as f:
+        _estat_worker = _UnpicklerCompartit(f, directori).load()
+
+def _avaluar(tasca: Tuple[str, int]) -> Dict[str, float]:
+    nom, particio = tasca
+    dades, coo, particions, fabriques, n, llindar = _estat_worker
+    test = particions == particio
+    inici = time.perf_counter()
+    timestamps = getattr(dades, '_timestamps', None)
+    entrenament = _dades_entrenament(dades, coo.row[~test], coo.col[~test], coo.data[~test],
+                                     None if timestamps is None else timestamps[~test])
+    recomanador = fabriques[nom](entrenament)
+    per_files = entrenament._ratings_matrix.tocsr()
+
+    # Parells reservats ordenats per usuari
+    ordre = np.argsort(coo.row[test], kind='stable')
+    files_test = coo.row[test][ordre].astype(np.int64)
+    columnes_test = coo.col[test][ordre].astype(np.int64)
+    reals = coo.data[test][ordre].astype(np.float64)
+    usuaris = np.unique(files_test)
+
+    prediccions = np.full(reals.size, np.nan)
+    recomanats = np.full((usuaris.size, n), -1, dtype=np.int32)
+    mida = _mida_bloc(max(per_files.shape))
+    for posicio in range(0, usuaris.size, mida):
+        bloc = usuaris[posicio:posicio + mida]
+        desde = np.searchsorted(files_test, bloc[0], side='left')
+        fins = np.searchsorted(files_test, bloc[-1], side='right')
+        scores = recomanador.puntuacions_bloc(bloc)
+        locals_ = np.searchsorted(bloc, files_test[desde:fins])
+        prediccions[desde:fins] = scores[locals_, columnes_test[desde:fins]]
+        recomanats[posicio:posicio + bloc.size] = _top_n_no_valorats(scores, per_files[bloc], n)[0]
+    temps = time.perf_counter() - inici
+
+    avaluador = Avaluador()
+    predites = np.isfinite(prediccions)
+    rellevants = reals >= llindar
+    matriu_rellevants = sp.csr_matrix((np.ones(int(rellevants.sum())),
+                                       (np.searchsorted(usuaris, files_test[rellevants]), columnes_test[rellevants])),
+                                      shape=(usuaris.size, per_files.shape[1]))
+    amb_rellevants = np.diff(matriu_rellevants.indptr) > 0
+    precisio, recall, ndcg = avaluador.calcular_ranking(recomanats[amb_rellevants], matriu_rellevants[amb_rellevants])
+    return {
+        "recomanador": nom, "particio": particio,
+        "mae": avaluador.calcular_mae(prediccions[predites], reals[predites]),
+        "rmse": avaluador.calcular_rmse(prediccions[predites], reals[predites]),
+        "cobertura": float(predites.mean()) if predites.size else 0.0,
+        "precisio": float(precisio.mean()) if precisio.size else 0.0,
+        "recall": float(recall.mean()) if recall.size else 0.0,
+        "ndcg": float(ndcg.mean()) if ndcg.size else 0.0,
+        "temps": temps, "ms_usuari": 1000 * temps / max(usuaris.size, 1),
+    }
+
+def avalua(dades, fabriques: Dict[str, object], particions: np.ndarray, n: int = 10, llindar: float = 4.0,
+           processos: Optional[int] = None) -> List[Dict[str, float]]:
+    """Avalua cada fàbrica (classe o funció dades -> Recomanador) sobre cada partició de test.
+
+    `particions` té una entrada per valoració en l'ordre de dades._ratings_matrix.tocoo();
+    les particions amb valor negatiu només s'usen per entrenar."""
+    coo = dades._ratings_matrix.tocoo()
+    directori = tempfile.mkdtemp(prefix="avaluacio_")
+    try:
+        # Les dades es desen un sol cop i cada procés les obre amb mmap
+        with open(os.path.join(directori, "avaluacio.pkl"), 'wb') as f:
+            _PicklerCompartit(f, directori).dump((dades, coo, particions, fabriques, n, llindar))
+        tasques = [(nom, int(p)) for nom in fabriques for p in np.unique(particions) if p >= 0]
+        with ProcessPoolExecutor(max_workers=processos, initializer=_iniciar_worker,
+                                 initargs=(directori,)) as pool:
+            resultats = list(pool.map(_avaluar, tasques))
+    finally:
+        shutil.rmtree(directori, ignore_errors=True)
+    return resultats
+
+def mostrar_resultats(resultats: List[Dict[str, float]], n: int = 10):
+    columnes = ["mae", "rmse", "cobertura", "precisio", "recall", "ndcg", "temps", "ms_usuari"]
+    titols = ["MAE", "RMSE", "Cobert.", f"P@{n}", f"R@{n}", f"NDCG@{n}", "Temps (s)", "ms/usuari"]
+    print(f"{'Recomanador':<14}" + "".join(f"{t:>11}" for t in titols))
+    for nom in dict.fromkeys(r["recomanador"] for r in resultats):
+        propis = [r for r in resultats if r["recomanador"] == nom]
+        mitjanes = [np.mean([r[c] for r in propis]) for c in columnes]
+        print(f"{nom:<14}" + "".join(f"{v:>11.4f}" for v in mitjanes))
+
+def _hibrid(dades) -> RecomanadorHibrid:
+    simple = RecomanadorSimple(dades, min_vots=3)
+    return RecomanadorHibrid(dades, [(simple, 0.2), (RecomanadorItemItem(dades, k=50), 0.5),
+                                     (recomenador_contingut(dades), 0.3)], popularitat=simple)
+
+FABRIQUES = {
+    "simple": partial(RecomanadorSimple, min_vots=3),
+    "recent": partial(RecomanadorRecent, min_vots=3, semivida_dies=365.0),
+    "items": partial(RecomanadorItemItem, k=50),
+    "als": partial(RecomanadorALS, factors=32),
+    "contingut": recomenador_contingut,
+    "hibrid": _hibrid,
+}
+
+def main():
+    print("=== AVALUACIÓ DE RECOMANADORS ===")
+    tipus = input("Selecciona el tipus de dades (llibres/pelis): ").lower()
+    if tipus == "llibres":
+        dades = DadesLlibres("carpeta_books/", massiu=True)
+        dades.carregar_usuaris("carpeta_books/Users.csv")
+        dades.carregar_items("carpeta_books/Books.csv")
+        dades.carregar_valoracions("carpeta_books/Ratings.csv")
+        llindar = 8.0
+    elif tipus == "pelis":
+        dades = DadesPelis("carpeta_movies/", massiu=True)
+        dades.carregar_usuaris("carpeta_movies/ratings.csv")
+        dades.carregar_items("carpeta_movies/movies.csv")
+        dades.carregar_valoracions("carpeta_movies/ratings.csv")
+        llindar = 4.0
+    else:
+        print("Tipus de dades no vàlid")
+        return
+
+    mode = input("Partició (kfold/temporal): ").lower()
+    if mode == "temporal" and dades.get_timestamps() is not None:
+        # L'ordre de tocoo() és el de les dades de la CSC, el mateix dels timestamps
+        particions = particio_temporal(dades.get_timestamps())
+    else:
+        particions = particions_aleatories(dades._ratings_matrix.nnz, k=5)
+
+    mostrar_resultats(avalua(dades, FABRIQUES, particions, n=10, llindar=llindar), n=10)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import time
+import numpy as np
+from typing import List, Tuple
+from SHIT import DadesPelis, DadesLlibres, RecomanadorCol·laboratiu
+
+# ================== BENCHMARK VEÏNS EXACTES vs LSH ==================
+# Compara el mode aproximat (LSH) amb la cerca exacta. Els candidats de l'LSH es reordenen amb
+# la mateixa similitud (ítems comuns), de manera que tant el recall dels veïns com el solapament
+# del top-n de recomanacions es mesuren contra els del recomanador exacte.
+# Amb menys de k candidats es fa la cerca exacta, de manera que les configuracions amb cubetes
+# petites tendeixen a la cerca exacta. Resultats de referència (recall veïns, ms/consulta):
+#   MovieLens (610 usuaris):            exacte 5.6 ms; 16x10 1.00 a 5.9 ms (gairebé sempre exacta);
+#                                       32x4 0.90 a 5.0 ms; 64x4 0.99 a 5.7-9.4 ms
+#   llibres sintètics (250k usuaris):   exacte 44 ms;  16x10 0.22 a 7.8 ms; 64x4 1.00 a 414 ms
+# Amb recall acceptable l'LSH no és més ràpid que la cerca exacta en aquestes mides
+
+CONFIGURACIONS = [(4, 10), (8, 8), (16, 8), (16, 6), (32, 6), (32, 4), (64, 4), (64, 2)]  # (num_taules, bits)
+
+def _mesurar(recomanador, user_idxs: np.ndarray, n: int) -> Tuple[List[set], np.ndarray, float, float]:
+    preparat = recomanador._preparat_actual()
+    inici = time.perf_counter()
+    if recomanador._aproximat:
+        recomanador._index_actual()
+    temps_index = time.perf_counter() - inici
+    veins = []
+    inici = time.perf_counter()
+    for user_idx in user_idxs:
+        recomanador.get_cache().buida()  # Es mesura la cerca, no la cache
+        veins.append(set(recomanador._veins(int(user_idx), preparat)[0].tolist()))
+    temps = (time.perf_counter() - inici) / max(len(user_idxs), 1)
+    recomanador.get_cache().buida()
+    indexos, _ = recomanador.recomana_batch_idx(user_idxs, n)
+    return veins, indexos, temps, temps_index
+
+def _solapament(a: np.ndarray, b: np.ndarray) -> float:
+    totals, comuns = 0, 0
+    for fila_a, fila_b in zip(a, b):
+        referencia = set(fila_a[fila_a >= 0].tolist())
+        totals += len(referencia)
+        comuns += len(referencia & set(fila_b[fila_b >= 0].tolist()))
+    return comuns / totals if totals else 1.0
+
+def _recall(referencia: List[set], trobats: List[set]) -> float:
+    return sum(len(a & b) for a, b in zip(referencia, trobats)) / max(sum(len(a) for a in referencia), 1)
+
+def benchmark(dades, k: int = 50, n: int = 10, num_usuaris: int = 200, llavor: int = 0):
+    matriu = dades.get_rating_matrix()
+    actius = np.flatnonzero(np.diff(matriu.indptr) > 0)
+    rng = np.random.default_rng(llavor)
+    user_idxs = np.sort(rng.choice(actius, size=min(num_usuaris, actius.size), replace=False))
+
+    veins_ref, recs_ref, temps_ref, _ = _mesurar(RecomanadorCol·laboratiu(dades, k=k), user_idxs, n)
+
+    print(f"{'mode':<24}{'recall veïns':>13}{'top-n vs exacte':>17}{'ms/consulta':>13}{'índex (s)':>11}")
+    print(f"{'exacte':<24}{1.0:>13.3f}{1.0:>17.3f}{temps_ref * 1000:>13.2f}{'-':>11}")
+    for num_taules, bits in CONFIGURACIONS:
+        veins, recs, temps, temps_index = _mesurar(
+            RecomanadorCol·laboratiu(dades, k=k, aproximat=True, num_taules=num_taules, bits=bits), user_idxs, n)
+        print(f"{f'LSH {num_taules} taules x {bits} bits':<24}{_recall(veins_ref, veins):>13.3f}"
+              f"{_solapament(recs_ref, recs):>17.3f}{temps * 1000:>13.2f}{temps_index:>11.2f}")
+
+def main():
+    tipus = input("Selecciona el tipus de dades (llibres/pelis): ").lower()
+    if tipus == "llibres":
+        dades = DadesLlibres("carpeta_books/", massiu=True)
+        dades.carregar_usuaris("carpeta_books/Users.csv")
+        dades.carregar_items("carpeta_books/Books.csv")
+        dades.carregar_valoracions("carpeta_books/Ratings.csv")
+    elif tipus == "pelis":
+        dades = DadesPelis("carpeta_movies/", massiu=True)
+        dades.carregar_usuaris("carpeta_movies/ratings.csv")
+        dades.carregar_items("carpeta_movies/movies.csv")
+        dades.carregar_valoracions("carpeta_movies/ratings.csv")
+    else:
+        print("Tipus de dades no vàlid")
+        return
+    benchmark(dades)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+import gc
+import inspect
+import json
+import os
+import resource
+import time
+import tracemalloc
+import numpy as np
+from typing import Dict, List, Optional
+
+import Codi_Matrius
+import SHIT
+from generador_sintetic import MIDES, genera_pelis, genera_llibres
+
+# ================== BENCHMARKS DE CÀRREGA I RECOMANACIÓ ==================
+# Temps i memòria pic de carregar_usuaris / carregar_items / carregar_valoracions i de
+# recomana per a tots els recomanadors de Codi_Matrius.py i SHIT.py. El primer recomana
+# (preparació: similituds, entrenament...) es mesura a part de la latència en calent.
+# La memòria pic és la de tracemalloc durant cada pas (NumPy hi declara els seus buffers),
+# que alenteix una mica el codi Python pur; amb memoria=False només es mesura el temps.
+# Els resultats es poden desar en JSON i comparar amb una execució anterior.
+
+MODULS = {"Codi_Matrius": Codi_Matrius, "SHIT": SHIT}
+FITXERS = {
+    "pelis": ("ratings.csv", "movies.csv", "ratings.csv"),
+    "llibres": ("Users.csv", "Books.csv", "Ratings.csv"),
+}
+TOLERANCIA_REGRESSIO = 1.25  # Un pas és regressió si és un 25% més lent o gasta un 25% més de memòria
+MINIM_DIFERENCIA = {"temps": 0.01, "pic_mb": 1.0}  # Per sota d'aquestes diferències és soroll
+
+def _rss_mb() -> float:
+    # Pic de memòria resident del procés (ru_maxrss és en KB a Linux)
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def mesura(funcio, *args, memoria: bool = True):
+    gc.collect()
+    if memoria:
+        tracemalloc.start()
+    inici = time.perf_counter()
+    resultat = funcio(*args)
+    temps = time.perf_counter() - inici
+    pic = 0
+    if memoria:
+        pic = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return resultat, temps, pic / 2 ** 20
+
+def recomanadors(modul) -> Dict[str, type]:
+    # Totes les classes concretes del mòdul que hereten del seu Recomanador
+    return {nom: classe for nom, classe in inspect.getmembers(modul, inspect.isclass)
+            if issubclass(classe, modul.Recomanador) and not inspect.isabstract(classe)
+            and classe.__module__ == modul.__name__}
+
+def _usuaris_mostra(dades, num_usuaris: int, llavor: int) -> List:
+    # Usuaris amb alguna valoració, triats a l'atzar
+    vots = np.diff(dades._ratings_matrix.tocsr().indptr)
+    ids = np.empty(len(dades._user_id_to_idx), dtype=object)
+    for user_id, idx in dades._user_id_to_idx.items():
+        ids[idx] = user_id
+    actius = np.flatnonzero(vots > 0)
+    triats = np.random.default_rng(llavor).choice(actius, size=min(num_usuaris, actius.size), replace=False)
+    return ids[triats].tolist()
+
+def benchmark_modul(nom_modul: str, tipus: str, directori: str, num_usuaris: int = 20, n: int = 5,
+                    memoria: bool = True, llavor: int = 0) -> List[Dict]:
+    modul = MODULS[nom_modul]
+    resultats = []
+
+    def registra(pas: str, temps: float, pic: float, **extra):
+        fila = {"modul": nom_modul, "pas": pas, "temps": temps, "pic_mb": pic, "rss_mb": _rss_mb(), **extra}
+        resultats.append(fila)
+        print(f"{nom_modul:<13}{pas:<46}{temps:>10.3f}s{pic:>10.1f} MB{fila['rss_mb']:>10.1f} MB")
+
+    classe = modul.DadesPelis if tipus == "pelis" else modul.DadesLlibres
+    dades = classe(directori, massiu=True)
+    usuaris, items, valoracions = (os.path.join(directori, fitxer) for fitxer in FITXERS[tipus])
+    for metode, path in (("carregar_usuaris", usuaris), ("carregar_items", items),
+                         ("carregar_valoracions", valoracions)):
+        _, temps, pic = mesura(getattr(dades, metode), path, memoria=memoria)
+        registra(metode, temps, pic)
+
+    mostra = _usuaris_mostra(dades, num_usuaris, llavor)
+    if not mostra:
+        print("No hi ha usuaris amb valoracions")
+        return resultats
+    for nom, classe_recomanador in recomanadors(modul).items():
+        recomanador = classe_recomanador(dades)
+        # Primera crida: inclou la preparació mandrosa del recomanador
+        _, temps, pic = mesura(recomanador.recomana, mostra[0], n, memoria=memoria)
+        registra(f"{nom}.recomana (primera)", temps, pic)
+        latencies, pic_calent = [], 0.0
+        for user_id in mostra[1:] or mostra:
+            _, temps, pic = mesura(recomanador.recomana, user_id, n, memoria=memoria)
+            latencies.append(temps)
+            pic_calent = max(pic_calent, pic)
+        registra(f"{nom}.recomana", float(np.mean(latencies)), pic_calent,
+                 p50=float(np.percentile(latencies, 50)), p95=float(np.percentile(latencies, 95)))
+        del recomanador
+    return resultats
+
+def compara(actuals: List[Dict], anteriors: List[Dict], tolerancia: float = TOLERANCIA_REGRESSIO) -> List[str]:
+    # Passos que han empitjorat en temps o memòria respecte d'una execució anterior
+    previs = {(r["modul"], r["pas"]): r for r in anteriors}
+    regressions = []
+    for fila in actuals:
+        previ = previs.get((fila["modul"], fila["pas"]))
+        if previ is None:
+            continue
+        for camp, unitat in (("temps", "s"), ("pic_mb", " MB")):
+            if (previ[camp] > 0 and fila[camp] > previ[camp] * tolerancia
+                    and fila[camp] - previ[camp] > MINIM_DIFERENCIA[camp]):
+                regressions.append(f"{fila['modul']} {fila['pas']}: {camp} {previ[camp]:.3f}{unitat} -> "
+                                   f"{fila[camp]:.3f}{unitat} (x{fila[camp] / previ[camp]:.2f})")
+    return regressions
+
+def dades_sintetiques(tipus: str, mida: str, directori: str = "dades_sintetiques") -> str:
+    # Genera el conjunt només si no existeix
+    desti = os.path.join(directori, f"{tipus}_{mida}")
+    if not os.path.exists(os.path.join(desti, FITXERS[tipus][2])):
+        print(f"Generant {MIDES[mida]} valoracions sintètiques a {desti}...")
+        (genera_pelis if tipus == "pelis" else genera_llibres)(desti, MIDES[mida])
+    return desti
+
+def executa(tipus: str, directori: str, moduls: Optional[List[str]] = None, fitxer_resultats: str = "",
+            memoria: bool = True) -> List[Dict]:
+    print(f"{'Mòdul':<13}{'Pas':<46}{'Temps':>11}{'Pic':>13}{'RSS':>13}")
+    resultats = []
+    for nom_modul in moduls or list(MODULS):
+        resultats += benchmark_modul(nom_modul, tipus, directori, memoria=memoria)
+        gc.collect()
+    for fila in resultats:
+        fila.update({"tipus": tipus, "directori": directori})
+
+    if fitxer_resultats:
+        if os.path.exists(fitxer_resultats):
+            with open(fitxer_resultats, 'r', encoding='utf-8') as f:
+                regressions = compara(resultats, json.load(f))
+            print("\nRegressions respecte de l'execució anterior:" if regressions else "\nCap regressió")
+            for linia in regressions:
+                print(f"  {linia}")
+        with open(fitxer_resultats, 'w', encoding='utf-8') as f:
+            json.dump(resultats, f, indent=2)
+    return resultats
+
+def main():
+    print("=== BENCHMARKS ===")
+    tipus = input("Selecciona el tipus de dades (llibres/pelis): ").lower()
+    if tipus not in FITXERS:
+        print("Tipus de dades no vàlid")
+        return
+    origen = input(f"Carpeta de dades o mida sintètica ({'/'.join(MIDES)}): ").strip()
+    if origen.upper() in MIDES:
+        directori = dades_sintetiques(tipus, origen.upper())
+    elif origen:
+        directori = origen
+    else:
+        directori = "carpeta_movies/" if tipus == "pelis" else "carpeta_books/"
+    moduls = input("Mòduls (Codi_Matrius/SHIT, ENTER per a tots): ").split() or None
+    if moduls and any(m not in MODULS for m in moduls):
+        print("Mòdul no vàlid")
+        return
+    fitxer_resultats = input("Fitxer JSON de resultats (ENTER per no desar): ").strip()
+    executa(tipus, directori, moduls, fitxer_resultats)
+
+if __name__ == "__main__":
+    main()
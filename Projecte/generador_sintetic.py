@@ -0,0 +1,207 @@
+import csv
+import os
+import time
+import numpy as np
+from typing import Tuple
+
+# ================== GENERADOR DE DADES SINTÈTIQUES ==================
+# CSV amb el mateix format que MovieLens (ratings.csv, movies.csv, tags.csv) i que
+# Book-Crossing (Users.csv, Books.csv, Ratings.csv) a qualsevol escala. La popularitat dels
+# ítems segueix una llei de potència (Zipf) i l'activitat dels usuaris una cua de Pareto,
+# com a les dades reals. Les valoracions s'escriuen per blocs d'usuaris, de manera que la
+# memòria no depèn de la mida final del fitxer.
+
+MIDES = {"1M": 1_000_000, "10M": 10_000_000, "100M": 100_000_000}
+VALORACIONS_BLOC = 1_000_000
+
+GENERES = ["Action", "Adventure", "Animation", "Children", "Comedy", "Crime", "Documentary", "Drama",
+           "Fantasy", "Film-Noir", "Horror", "IMAX", "Musical", "Mystery", "Romance", "Sci-Fi",
+           "Thriller", "War", "Western"]
+LLOCS = ["barcelona, spain", "girona, spain", "lleida, spain", "tarragona, spain", "london, united kingdom",
+         "toronto, canada", "new york, usa", "berlin, germany", "paris, france", "lisboa, portugal"]
+
+# ---- Distribucions ----
+def _popularitat(num_items: int, exponent: float, rng: np.random.Generator) -> np.ndarray:
+    # Probabilitat Zipf (rang^-exponent) repartida en ordre aleatori entre els ítems
+    pesos = rng.permutation(1.0 / np.arange(1, num_items + 1) ** exponent)
+    return pesos / pesos.sum()
+
+def _activitat(num_usuaris: int, num_valoracions: int, minim: int, maxim: int, exponent: float,
+               rng: np.random.Generator) -> np.ndarray:
+    # Valoracions per usuari: mínim fix més una part de Pareto, escalat perquè sumi num_valoracions
+    cua = rng.pareto(exponent, num_usuaris) + 1
+    extra = max(num_valoracions - minim * num_usuaris, 0)
+    comptes = np.minimum(minim + np.floor(cua / cua.sum() * extra).astype(np.int64), maxim)
+    # El que s'ha perdut arrodonint o retallant es reparteix entre els usuaris que encara hi caben
+    resta = num_valoracions - int(comptes.sum())
+    while resta > 0:
+        candidats = np.flatnonzero(comptes < maxim)
+        if candidats.size == 0:
+            break
+        triats = rng.choice(candidats, size=min(resta, candidats.size), replace=False)
+        comptes[triats] += 1
+        resta -= triats.size
+    return comptes
+
+def _parells(comptes: np.ndarray, primer_usuari: int, cdf: np.ndarray,
+             rng: np.random.Generator, intents: int = 8) -> Tuple[np.ndarray, np.ndarray]:
+    # Ítems per a cada usuari del bloc mostrejats per popularitat i sense repetir (usuari, ítem).
+    # Les repeticions es tornen a mostrejar unes quantes vegades; el que falti després es descarta
+    num_items = cdf.size
+    usuaris = np.empty(0, dtype=np.int64)
+    claus = np.empty(0, dtype=np.int64)
+    falten = comptes.copy()
+    for _ in range(intents):
+        if not falten.any():
+            break
+        nous_usuaris = np.repeat(np.arange(comptes.size, dtype=np.int64), falten)
+        nous_items = np.minimum(np.searchsorted(cdf, rng.random(nous_usuaris.size)), num_items - 1)
+        claus = np.sort(np.concatenate([claus, nous_usuaris * num_items + nous_items]))
+        claus = claus[np.concatenate([[True], claus[1:] != claus[:-1]])]
+        usuaris = claus // num_items
+        falten = comptes - np.bincount(usuaris, minlength=comptes.size)
+    return usuaris + primer_usuari, claus % num_items
+
+def _blocs_usuaris(comptes: np.ndarray):
+    # Talls [inici, fi) d'usuaris consecutius amb aproximadament VALORACIONS_BLOC valoracions
+    acumulat = np.cumsum(comptes)
+    inici = 0
+    while inici < comptes.size:
+        base = acumulat[inici - 1] if inici else 0
+        fi = max(int(np.searchsorted(acumulat, base + VALORACIONS_BLOC, side='right')), inici + 1)
+        yield inici, min(fi, comptes.size)
+        inici = fi
+
+def _valoracions(mitjana: float, items: np.ndarray, usuaris: np.ndarray, qualitat: np.ndarray,
+                 biaix: np.ndarray, soroll: float, pas: float, minim: float, maxim: float,
+                 rng: np.random.Generator) -> np.ndarray:
+    # Mitjana + qualitat de l'ítem + biaix de l'usuari + soroll, arrodonit a l'escala
+    bruta = mitjana + qualitat[items] + biaix[usuaris] + rng.normal(0.0, soroll, items.size)
+    return np.clip(np.round(bruta / pas) * pas, minim, maxim)
+
+# ---- MovieLens ----
+def genera_pelis(directori: str, num_valoracions: int, exponent: float = 1.0, llavor: int = 0):
+    """ratings.csv, movies.csv i tags.csv amb el format de MovieLens.
+
+    Proporcions semblants a ml-25m: ~150 valoracions per usuari (mínim 20), ~6·sqrt(n) pel·lícules,
+    valoracions de 0.5 a 5 en mitges estrelles i ~1 tag per cada 100 valoracions."""
+    rng = np.random.default_rng(llavor)
+    os.makedirs(directori, exist_ok=True)
+    num_usuaris = max(num_valoracions // 150, 1)
+    num_items = max(int(6 * np.sqrt(num_valoracions)), 100)
+    movie_ids = np.sort(rng.choice(num_items * 4, size=num_items, replace=False)) + 1
+    popularitat = _popularitat(num_items, exponent, rng)
+    cdf = np.cumsum(popularitat)
+    qualitat = rng.normal(0.0, 0.5, num_items)
+    biaix = rng.normal(0.0, 0.4, num_usuaris)
+    comptes = _activitat(num_usuaris, num_valoracions, min(20, num_items // 2), num_items // 2, 1.2, rng)
+    inici_usuari = rng.integers(946684800, 1672531200, num_usuaris)  # 2000-01-01 .. 2023-01-01
+
+    with open(os.path.join(directori, "movies.csv"), 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["movieId", "title", "genres"])
+        anys = rng.integers(1920, 2023, num_items)
+        for movie_id, any_estrena in zip(movie_ids.tolist(), anys.tolist()):
+            generes = rng.choice(GENERES, size=int(rng.integers(1, 4)), replace=False)
+            writer.writerow([movie_id, f"Pel·lícula {movie_id} ({any_estrena})", "|".join(generes)])
+
+    with open(os.path.join(directori, "ratings.csv"), 'w', encoding='utf-8', newline='') as f:
+        f.write("userId,movieId,rating,timestamp\n")
+        for inici, fi in _blocs_usuaris(comptes):
+            usuaris, items = _parells(comptes[inici:fi], inici, cdf, rng)
+            notes = _valoracions(3.5, items, usuaris, qualitat, biaix, 0.9, 0.5, 0.5, 5.0, rng)
+            timestamps = inici_usuari[usuaris] + rng.exponential(90 * 86400, usuaris.size).astype(np.int64)
+            f.writelines(f"{u},{m},{r:.1f},{ts}\n" for u, m, r, ts in
+                         zip((usuaris + 1).tolist(), movie_ids[items].tolist(), notes.tolist(), timestamps.tolist()))
+
+    # Tags: pocs usuaris en posen molts, i els ítems i les paraules també segueixen Zipf
+    num_tags = max(num_valoracions // 100, 1)
+    vocabulari = np.array([f"tag{i}" for i in range(max(int(np.sqrt(num_tags)), 10))])
+    cdf_tags = np.cumsum(_popularitat(vocabulari.size, 1.1, rng))
+    cdf_usuaris = np.cumsum(_popularitat(num_usuaris, 1.5, rng))
+    with open(os.path.join(directori, "tags.csv"), 'w', encoding='utf-8', newline='') as f:
+        f.write("userId,movieId,tag,timestamp\n")
+        for inici in range(0, num_tags, VALORACIONS_BLOC):
+            mida = min(VALORACIONS_BLOC, num_tags - inici)
+            usuaris = np.minimum(np.searchsorted(cdf_usuaris, rng.random(mida)), num_usuaris - 1)
+            items = np.minimum(np.searchsorted(cdf, rng.random(mida)), num_items - 1)
+            tags = vocabulari[np.minimum(np.searchsorted(cdf_tags, rng.random(mida)), vocabulari.size - 1)]
+            timestamps = inici_usuari[usuaris] + rng.exponential(90 * 86400, mida).astype(np.int64)
+            f.writelines(f"{u},{m},{t},{ts}\n" for u, m, t, ts in
+                         zip((usuaris + 1).tolist(), movie_ids[items].tolist(), tags.tolist(), timestamps.tolist()))
+
+# ---- Book-Crossing ----
+def genera_llibres(directori: str, num_valoracions: int, exponent: float = 0.9, llavor: int = 0):
+    """Users.csv, Books.csv i Ratings.csv amb el format de Book-Crossing.
+
+    Com a l'original hi ha tants llibres com usuaris (~1 per cada 4 valoracions), només ~40%
+    dels usuaris valoren algun llibre i ~62% de les valoracions són implícites (0)."""
+    rng = np.random.default_rng(llavor)
+    os.makedirs(directori, exist_ok=True)
+    num_usuaris = max(num_valoracions // 4, 1)
+    num_items = max(num_valoracions // 4, 100)
+    num_actius = max(int(num_usuaris * 0.4), 1)
+    isbns = rng.permutation(num_items).astype(np.int64) * 7919 + 100_000_000
+    popularitat = _popularitat(num_items, exponent, rng)
+    cdf = np.cumsum(popularitat)
+    qualitat = rng.normal(0.0, 0.8, num_items)
+    actius = np.sort(rng.choice(num_usuaris, size=num_actius, replace=False))
+    biaix = rng.normal(0.0, 1.0, num_actius)
+    comptes = _activitat(num_actius, num_valoracions, 1, num_items // 2, 0.8, rng)
+
+    with open(os.path.join(directori, "Users.csv"), 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["User-ID", "Location", "Age"])
+        llocs = rng.integers(0, len(LLOCS), num_usuaris)
+        edats = rng.integers(10, 90, num_usuaris)
+        sense_edat = rng.random(num_usuaris) < 0.4
+        for user_id, lloc, edat, buida in zip(range(1, num_usuaris + 1), llocs.tolist(), edats.tolist(),
+                                              sense_edat.tolist()):
+            writer.writerow([user_id, LLOCS[lloc], "" if buida else edat])
+
+    with open(os.path.join(directori, "Books.csv"), 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["ISBN", "Book-Title", "Book-Author", "Year-Of-Publication", "Publisher"])
+        # Autors i editorials també amb cua llarga
+        autors = np.minimum(np.searchsorted(np.cumsum(_popularitat(max(num_items // 3, 1), 1.0, rng)),
+                                            rng.random(num_items)), max(num_items // 3, 1) - 1)
+        editorials = np.minimum(np.searchsorted(np.cumsum(_popularitat(max(num_items // 50, 1), 1.2, rng)),
+                                                rng.random(num_items)), max(num_items // 50, 1) - 1)
+        anys = np.where(rng.random(num_items) < 0.02, 0, rng.integers(1950, 2005, num_items))
+        for isbn, autor, editorial, any_publicacio in zip(isbns.tolist(), autors.tolist(), editorials.tolist(),
+                                                          anys.tolist()):
+            writer.writerow([f"{isbn:010d}", f"Llibre {isbn:010d}", f"Autor {autor}", any_publicacio,
+                             f"Editorial {editorial}"])
+
+    with open(os.path.join(directori, "Ratings.csv"), 'w', encoding='utf-8', newline='') as f:
+        f.write("User-ID,ISBN,Book-Rating\n")
+        for inici, fi in _blocs_usuaris(comptes):
+            usuaris, items = _parells(comptes[inici:fi], inici, cdf, rng)
+            notes = _valoracions(7.6, items, usuaris, qualitat, biaix, 1.8, 1.0, 1.0, 10.0, rng)
+            notes[rng.random(notes.size) < 0.62] = 0
+            f.writelines(f"{u},{isbn:010d},{r:.0f}\n" for u, isbn, r in
+                         zip((actius[usuaris] + 1).tolist(), isbns[items].tolist(), notes.tolist()))
+
+def main():
+    print("=== GENERADOR DE DADES SINTÈTIQUES ===")
+    tipus = input("Selecciona el tipus de dades (llibres/pelis): ").lower()
+    if tipus not in ("llibres", "pelis"):
+        print("Tipus de dades no vàlid")
+        return
+    mida = input(f"Nombre de valoracions ({'/'.join(MIDES)} o un enter): ").strip().upper()
+    try:
+        num_valoracions = MIDES[mida] if mida in MIDES else int(mida)
+    except ValueError:
+        print("Mida no vàlida")
+        return
+    directori = input("Carpeta de sortida: ").strip() or f"dades_sintetiques/{tipus}_{mida}/"
+
+    inici = time.perf_counter()
+    if tipus == "pelis":
+        genera_pelis(directori, num_valoracions)
+    else:
+        genera_llibres(directori, num_valoracions)
+    print(f"Dades generades a {directori} en {time.perf_counter() - inici:.1f}s")
+
+if __name__ == "__main__":
+    main()
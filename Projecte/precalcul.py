@@ -0,0 +1,143 @@
+import json
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from typing import Optional, Tuple
+
+# ================== PRECÀLCUL DE RECOMANACIONS ==================
+# Calcula el top-n de tots els usuaris repartint el rang d'índexs entre processos.
+# El recomanador (amb les seves dades) es desa un sol cop a disc: els arrays grans
+# van a fitxers .npy que cada procés obre amb mmap, de manera que la matriu de
+# valoracions no es copia ni s'envia per pickle a cada worker.
+
+MIN_BYTES_COMPARTIT = 1 << 16
+USUARIS_PER_TASCA = 2048
+VERSIO_PRECALCUL = 1
+
+class _PicklerCompartit(pickle.Pickler):
+    def __init__(self, fitxer, directori: str):
+        super().__init__(fitxer, protocol=pickle.HIGHEST_PROTOCOL)
+        self._directori = directori
+        self._desats = {}
+
+    def persistent_id(self, obj):
+        # Els arrays numèrics grans es desen a part i es referencien pel nom del fitxer
+        if not isinstance(obj, np.ndarray) or obj.dtype == object or obj.nbytes < MIN_BYTES_COMPARTIT:
+            return None
+        if id(obj) not in self._desats:
+            nom = f"array_{len(self._desats)}.npy"
+            np.save(os.path.join(self._directori, nom), np.asarray(obj))
+            self._desats[id(obj)] = (nom, obj)
+        return self._desats[id(obj)][0]
+
+class _UnpicklerCompartit(pickle.Unpickler):
+    def __init__(self, fitxer, directori: str):
+        super().__init__(fitxer)
+        self._directori = directori
+
+    def persistent_load(self, nom):
+        return np.load(os.path.join(self._directori, nom), mmap_mode='r')
+
+def _desar_recomanador(recomanador, directori: str):
+    os.makedirs(directori, exist_ok=True)
+    # El model (similituds, factors, còpies de la matriu) es construeix aquí un sol cop i es
+    # comparteix amb mmap, en lloc que cada procés el refaci en la seva primera tasca
+    recomanador.preparar()
+    with open(os.path.join(directori, "recomanador.pkl"), 'wb') as f:
+        _PicklerCompartit(f, directori).dump(recomanador)
+
+# ---- Estat de cada procés ----
+_recomanador_worker = None
+
+def _iniciar_worker(directori: str):
+    global _recomanador_worker
+    with open(os.path.join(directori, "recomanador.pkl"), 'rb') as f:
+        _recomanador_worker = _UnpicklerCompartit(f, directori).load()
+
+def _calcular_tasca(tasca: Tuple[int, int, int, str]) -> int:
+    inici, final, n, directori = tasca
+    indexos, scores = _recomanador_worker.recomana_batch_idx(np.arange(inici, final), n)
+    # Cada tasca escriu directament la seva franja de files: no es retornen resultats pel pipe
+    sortida_idx = np.load(os.path.join(directori, "indexos.npy"), mmap_mode='r+')
+    sortida_scores = np.load(os.path.join(directori, "scores.npy"), mmap_mode='r+')
+    sortida_idx[inici:final] = indexos
+    sortida_scores[inici:final] = scores
+    sortida_idx.flush()
+    sortida_scores.flush()
+    return final - inici
+
+def _user_ids_per_idx(dades, num_usuaris: int) -> np.ndarray:
+    user_ids = np.full(num_usuaris, -1, dtype=np.int64)
+    for user_id, idx in dades._user_id_to_idx.items():
+        user_ids[idx] = user_id
+    return user_ids
+
+def precalcula(recomanador, directori: str, n: int = 10, processos: Optional[int] = None,
+               usuaris_per_tasca: int = USUARIS_PER_TASCA) -> str:
+    """Desa a `directori` el top-n de tots els usuaris: indexos.npy (int32), scores.npy (float32) i user_ids.npy."""
+    os.makedirs(directori, exist_ok=True)
+    directori_compartit = os.path.join(directori, "compartit")
+    inici_temps = time.time()
+
+    dades = recomanador._dades
+    num_usuaris = dades._ratings_matrix.shape[0]
+    _desar_recomanador(recomanador, directori_compartit)
+
+    np.save(os.path.join(directori, "user_ids.npy"), _user_ids_per_idx(dades, num_usuaris))
+    np.lib.format.open_memmap(os.path.join(directori, "indexos.npy"), mode='w+', dtype=np.int32, shape=(num_usuaris, n))[:] = -1
+    np.lib.format.open_memmap(os.path.join(directori, "scores.npy"), mode='w+', dtype=np.float32, shape=(num_usuaris, n))[:] = np.nan
+
+    tasques = [(inici, min(inici + usuaris_per_tasca, num_usuaris), n, directori)
+               for inici in range(0, num_usuaris, usuaris_per_tasca)]
+    fets = 0
+    with ProcessPoolExecutor(max_workers=processos, initializer=_iniciar_worker,
+                             initargs=(directori_compartit,)) as pool:
+        for fets_tasca in pool.map(_calcular_tasca, tasques):
+            fets += fets_tasca
+
+    with open(os.path.join(directori, "manifest.json"), 'w', encoding='utf-8') as f:
+        json.dump({"versio": VERSIO_PRECALCUL, "recomanador": type(recomanador).__name__,
+                   "n": n, "usuaris": num_usuaris}, f)
+    print(f"Precàlcul: {fets} usuaris en {time.time() - inici_temps:.1f}s amb {processos or os.cpu_count()} processos")
+    return directori
+
+def carregar_precalcul(directori: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Retorna (user_ids, indexos, scores); la fila r correspon a l'usuari d'índex r
+    return (np.load(os.path.join(directori, "user_ids.npy")),
+            np.load(os.path.join(directori, "indexos.npy"), mmap_mode='r'),
+            np.load(os.path.join(directori, "scores.npy"), mmap_mode='r'))
+
+def main():
+    from SHIT import DadesLlibres, DadesPelis, RecomanadorSimple, RecomanadorCol·laboratiu
+
+    print("=== PRECÀLCUL DE RECOMANACIONS ===")
+    tipus = input("Selecciona el tipus de dades (llibres/pelis): ").lower()
+    if tipus == "llibres":
+        dades = DadesLlibres("carpeta_books/", massiu=True)
+        dades.carregar_usuaris("carpeta_books/Users.csv")
+        dades.carregar_items("carpeta_books/Books.csv")
+        dades.carregar_valoracions("carpeta_books/Ratings.csv")
+    elif tipus == "pelis":
+        dades = DadesPelis("carpeta_movies/", massiu=True)
+        dades.carregar_usuaris("carpeta_movies/ratings.csv")
+        dades.carregar_items("carpeta_movies/movies.csv")
+        dades.carregar_valoracions("carpeta_movies/ratings.csv")
+    else:
+        print("Tipus de dades no vàlid")
+        return
+
+    tipus_rec = input("Selecciona el tipus de recomanador (simple/col·laboratiu): ").lower()
+    if tipus_rec == "simple":
+        recomanador = RecomanadorSimple(dades)
+    elif tipus_rec == "col·laboratiu":
+        recomanador = RecomanadorCol·laboratiu(dades)
+    else:
+        print("Tipus de recomanador no vàlid")
+        return
+
+    precalcula(recomanador, os.path.join(dades._path, ".cache", f"precalcul_{tipus_rec}"), n=10)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+#recomenador colaboratiu
+import numpy as np
+import scipy.sparse as sp
+from typing import Optional, Tuple
+
+from Codi_Matrius import Recomanador, Dades, DadesPelis, DadesLlibres, _pesos_decaiment
+from utilitats import _mida_bloc, _top_n_files
+
+
+class RecomanadorCol·laboratiu(Recomanador):
+    # Filtratge col·laboratiu basat en usuaris sobre la matriu dispersa compartida de Dades.
+    # Similitud: cosinus restringit als ítems que han valorat tots dos usuaris.
+    # Predicció: mitjana_u + sum(sim * (r_v - mitjana_v)) / sum(|sim|) sobre els k veïns que han
+    # valorat l'ítem; si cap veí l'ha valorat, la predicció és la mitjana de l'usuari
+    def __init__(self, dades: Dades, k: int = 50):
+        super().__init__(dades)
+        self._k = k
+        self._origen = None  # Matriu CSR de la qual s'han derivat les auxiliars
+
+    def _preparar(self):
+        per_files = self._dades.get_rating_matrix_csr()
+        if self._origen is per_files:
+            return
+        valors = per_files.astype(np.float64, copy=True)
+        valors.eliminate_zeros()  # Una valoració 0 compta com a no valorat
+        vots = np.diff(valors.indptr)
+        sumes = np.asarray(valors.sum(axis=1)).ravel()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self._mitjanes = np.where(vots > 0, sumes / vots, 0.0)
+        self._valors = valors
+        self._binaria = sp.csr_matrix((np.ones_like(valors.data), valors.indices, valors.indptr), shape=valors.shape)
+        self._quadrats = sp.csr_matrix((valors.data ** 2, valors.indices, valors.indptr), shape=valors.shape)
+        self._centrades = sp.csr_matrix((valors.data - np.repeat(self._mitjanes, vots), valors.indices, valors.indptr),
+                                        shape=valors.shape)
+        self._pesos_valoracions = self._binaria  # Pes de cada valoració a la predicció
+        self._origen = per_files
+
+    def calcula_k(self, user_idxs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # Els k usuaris més similars de cada usuari del bloc: índexs (b, k) i similituds,
+        # amb -1 / NaN de farciment. Els empats es resolen per l'índex d'usuari més baix
+        self._preparar()
+        user_idxs = np.asarray(user_idxs, dtype=np.int64)
+        bloc = self._valors[user_idxs]
+        # Sumes només sobre els ítems comuns: la binària d'un costat filtra els quadrats de l'altre
+        numerador = (self._valors @ bloc.T).toarray().T
+        quadrats_u = (self._binaria @ self._quadrats[user_idxs].T).toarray().T
+        quadrats_v = (self._quadrats @ self._binaria[user_idxs].T).toarray().T
+        denominador = np.sqrt(quadrats_u) * np.sqrt(quadrats_v)
+        sims = np.divide(numerador, denominador, out=np.zeros_like(numerador), where=denominador > 0)
+        sims[np.arange(user_idxs.size), user_idxs] = -np.inf  # Un usuari no és veí de si mateix
+        return _top_n_files(sims, self._k)
+
+    def puntuacions_bloc(self, user_idxs: np.ndarray) -> np.ndarray:
+        self._preparar()
+        user_idxs = np.asarray(user_idxs, dtype=np.int64)
+        num_usuaris, num_items = self._valors.shape
+        scores = np.empty((user_idxs.size, num_items))
+        # Les similituds són (bloc, usuaris): el bloc es limita també pel nombre d'usuaris
+        mida = _mida_bloc(max(num_usuaris, num_items))
+        for inici in range(0, user_idxs.size, mida):
+            bloc = user_idxs[inici:inici + mida]
+            veins, sims = self.calcula_k(bloc)
+            valids = veins >= 0
+            pesos = sp.csr_matrix((sims[valids], (np.nonzero(valids)[0], veins[valids])),
+                                  shape=(bloc.size, num_usuaris))
+            numerador = (pesos @ self._centrades).toarray()
+            denominador = (abs(pesos) @ self._pesos_valoracions).toarray()
+            ajust = np.divide(numerador, denominador, out=np.zeros_like(numerador), where=denominador != 0)
+            scores[inici:inici + bloc.size] = self._mitjanes[bloc, None] + ajust
+        return scores
+
+
+class RecomanadorCol·laboratiuRecent(RecomanadorCol·laboratiu):
+    # Igual que RecomanadorCol·laboratiu però, a la predicció, cada valoració d'un veí pesa
+    # 2^(-edat / semivida): numerador sum(sim * pes * (r_v - mitjana_v)) i denominador
+    # sum(|sim| * pes). Les similituds i les mitjanes no canvien. Sense timestamps no hi ha decaïment
+    def __init__(self, dades: Dades, k: int = 50, semivida_dies: float = 180.0, ara: Optional[int] = None):
+        super().__init__(dades, k)
+        self._semivida_dies = semivida_dies
+        self._ara = ara
+
+    def _preparar(self):
+        per_files = self._dades.get_rating_matrix_csr()
+        if self._origen is per_files:
+            return
+        super()._preparar()
+        timestamps = self._dades.get_timestamps_csr()
+        if timestamps is None:
+            return
+        ara = self._ara if self._ara is not None else self._dades.timestamp_maxim()
+        # Mateixa màscara que l'eliminate_zeros de la base: els pesos queden alineats amb _valors
+        pesos = _pesos_decaiment(timestamps[per_files.data != 0], ara, self._semivida_dies)
+        valors = self._valors
+        self._pesos_valoracions = sp.csr_matrix((pesos, valors.indices, valors.indptr), shape=valors.shape)
+        self._centrades = sp.csr_matrix((self._centrades.data * pesos, valors.indices, valors.indptr),
+                                        shape=valors.shape)
+
+
+def main():
+    print("=== RECOMANADOR COL·LABORATIU ===")
+    tipus = input("Selecciona el tipus de dades (llibres/pelis): ").lower()
+
+    if tipus == "llibres":
+        dades = DadesLlibres("carpeta_books/", massiu=True)
+        fonts = ["carpeta_books/Users.csv", "carpeta_books/Books.csv", "carpeta_books/Ratings.csv"]
+        if not dades.carregar_cache(fonts):
+            dades.carregar_usuaris("carpeta_books/Users.csv")
+            dades.carregar_items("carpeta_books/Books.csv")
+            dades.carregar_valoracions("carpeta_books/Ratings.csv")
+            dades.desar_cache(fonts)
+    elif tipus == "pelis":
+        dades = DadesPelis("carpeta_movies/", massiu=True)
+        fonts = ["carpeta_movies/ratings.csv", "carpeta_movies/tags.csv", "carpeta_movies/movies.csv"]
+        if not dades.carregar_cache(fonts):
+            dades.carregar_usuaris("carpeta_movies/ratings.csv")
+            dades.carregar_items("carpeta_movies/movies.csv")
+            dades.carregar_valoracions("carpeta_movies/ratings.csv")
+            dades.desar_cache(fonts)
+    else:
+        print("Tipus no vàlid")
+        return
+
+    recomanador = RecomanadorCol·laboratiu(dades, k=50)
+
+    while True:
+        user_input = input("\nIntrodueix ID d'usuari (ENTER per sortir): ").strip()
+        if not user_input:
+            break
+        try:
+            user_id = int(user_input)
+            recomanacions = recomanador.recomana(user_id, 5)
+
+            if not recomanacions:
+                print("No hi ha recomanacions disponibles")
+            else:
+                print(f"\nTop 5 recomanacions per {user_id}:")
+                for idx, (item, puntuacio) in enumerate(recomanacions, 1):
+                    print(f"{idx}. {item.get_titol()} ({item.get_categoria()})")
+                    print(f"   {item.get_info()}")
+                    print(f"   Puntuació estimada: {puntuacio:.2f}\n")
+        except ValueError:
+            print("ID ha de ser un número enter")
+        except Exception as e:
+            print(f"Error: {str(e)}")
+
+if __name__ == "__main__":
+    main()
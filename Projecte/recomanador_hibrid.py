@@ -0,0 +1,138 @@
+import os
+import numpy as np
+import scipy.sparse as sp
+from typing import List, Tuple
+
+from Codi_Matrius import Recomanador, Dades, DadesPelis, DadesLlibres, RecomanadorSimple, RecomanadorItemItem
+from recomenador3 import recomenador_contingut
+
+
+def _calibrar(scores: np.ndarray, valorats: sp.csr_matrix) -> np.ndarray:
+    # Porta les puntuacions d'un component a l'escala de valoracions de cada usuari amb una regressió
+    # lineal per usuari sobre els ítems que ja ha valorat: mitjana_r + beta * (s - mitjana_s), beta >= 0.
+    # Així es poden mitjanar components amb escales diferents (cosinus, predicció de la valoració...).
+    # Si el component no puntua cap ítem valorat per l'usuari, tota la seva fila queda a -inf
+    num_files = scores.shape[0]
+    files = np.repeat(np.arange(num_files), np.diff(valorats.indptr))
+    puntuats = scores[files, valorats.indices]
+    valids = np.isfinite(puntuats)
+    files, puntuats, reals = files[valids], puntuats[valids], valorats.data[valids].astype(np.float64)
+    num = np.bincount(files, minlength=num_files)
+    mitjana_s = np.bincount(files, puntuats, num_files) / np.maximum(num, 1)
+    mitjana_r = np.bincount(files, reals, num_files) / np.maximum(num, 1)
+    centrats = puntuats - mitjana_s[files]
+    variancia = np.bincount(files, centrats * centrats, num_files)
+    covariancia = np.maximum(np.bincount(files, centrats * (reals - mitjana_r[files]), num_files), 0.0)
+    beta = np.divide(covariancia, variancia, out=np.zeros(num_files), where=variancia > 1e-12)
+
+    finites = np.isfinite(scores)
+    calibrats = mitjana_r[:, None] + beta[:, None] * np.where(finites, scores - mitjana_s[:, None], 0.0)
+    calibrats[~finites] = -np.inf
+    calibrats[num == 0] = -np.inf
+    return calibrats
+
+
+class RecomanadorHibrid(Recomanador):
+    # Combina les puntuacions completes (usuaris x ítems) de diversos recomanadors amb pesos.
+    # Cada component retorna -inf als ítems que no pot puntuar; abans de combinar-les, les seves
+    # puntuacions es calibren a l'escala de valoracions de l'usuari (_calibrar), i per a cada ítem
+    # la mitjana ponderada es fa només amb els components que sí que el puntuen. Els usuaris amb menys de
+    # `min_valoracions` valoracions (arrencada en fred) reben només la puntuació de popularitat
+    def __init__(self, dades: Dades, components: List[Tuple[Recomanador, float]],
+                 popularitat: RecomanadorSimple = None, min_valoracions: int = 1):
+        super().__init__(dades)
+        if not components:
+            raise ValueError("Cal com a mínim un component")
+        self._components = components
+        self._popularitat = popularitat if popularitat is not None else RecomanadorSimple(dades)
+        self._min_valoracions = min_valoracions
+
+    def _preparar(self):
+        self._popularitat._preparar()
+        for component, _ in self._components:
+            component._preparar()
+
+    def puntuacions_bloc(self, user_idxs: np.ndarray) -> np.ndarray:
+        user_idxs = np.asarray(user_idxs, dtype=np.int64)
+        vots = np.diff(self._dades.get_rating_matrix_csr().indptr)[user_idxs]
+        en_fred = vots < self._min_valoracions
+        scores = self._popularitat.puntuacions_bloc(user_idxs)
+        calents = np.flatnonzero(~en_fred)
+        if calents.size == 0:
+            return scores
+
+        valorats = self._dades.get_rating_matrix_csr()[user_idxs[calents]]
+        suma = np.zeros((calents.size, scores.shape[1]))
+        pesos = np.zeros((calents.size, scores.shape[1]))
+        for component, pes in self._components:
+            parcial = _calibrar(component.puntuacions_bloc(user_idxs[calents]), valorats)
+            valids = np.isfinite(parcial)
+            suma += pes * np.where(valids, parcial, 0.0)
+            pesos += pes * valids
+        combinats = np.full(suma.shape, -np.inf)
+        np.divide(suma, pesos, out=combinats, where=pesos > 0)
+        scores[calents] = combinats
+        return scores
+
+
+def main():
+    print("=== RECOMANADOR HÍBRID ===")
+    tipus = input("Selecciona el tipus de dades (llibres/pelis): ").lower()
+
+    if tipus == "llibres":
+        dades = DadesLlibres("carpeta_books/", massiu=True)
+        fonts = ["carpeta_books/Users.csv", "carpeta_books/Books.csv", "carpeta_books/Ratings.csv"]
+        cache_valida = dades.carregar_cache(fonts)
+        if not cache_valida:
+            dades.carregar_usuaris("carpeta_books/Users.csv")
+            dades.carregar_items("carpeta_books/Books.csv")
+            dades.carregar_valoracions("carpeta_books/Ratings.csv")
+            dades.desar_cache(fonts)
+    elif tipus == "pelis":
+        dades = DadesPelis("carpeta_movies/", massiu=True)
+        fonts = ["carpeta_movies/ratings.csv", "carpeta_movies/tags.csv", "carpeta_movies/movies.csv"]
+        cache_valida = dades.carregar_cache(fonts)
+        if not cache_valida:
+            dades.carregar_usuaris("carpeta_movies/ratings.csv")
+            dades.carregar_items("carpeta_movies/movies.csv")
+            dades.carregar_valoracions("carpeta_movies/ratings.csv")
+            dades.desar_cache(fonts)
+    else:
+        print("Tipus no vàlid")
+        return
+
+    simple = RecomanadorSimple(dades, min_vots=3)
+    items = RecomanadorItemItem(dades, k=50)
+    fitxer_sims = os.path.join(dades._directori_cache(), "similituds_items.npz")
+    if not (cache_valida and items.carregar_similituds(fitxer_sims)):
+        items.desar_similituds(fitxer_sims)
+    contingut = recomenador_contingut(dades)
+    fitxer_tfidf = os.path.join(dades._directori_cache(), "tfidf_items.npz")
+    if not (cache_valida and contingut.carregar_caracteristiques(fitxer_tfidf)):
+        contingut.desar_caracteristiques(fitxer_tfidf)
+
+    recomanador = RecomanadorHibrid(dades, [(simple, 0.2), (items, 0.5), (contingut, 0.3)], popularitat=simple)
+
+    while True:
+        user_input = input("\nIntrodueix ID d'usuari (ENTER per sortir): ").strip()
+        if not user_input:
+            break
+        try:
+            user_id = int(user_input)
+            recomanacions = recomanador.recomana(user_id, 5)
+
+            if not recomanacions:
+                print("No hi ha recomanacions disponibles")
+            else:
+                print(f"\nTop 5 recomanacions per {user_id}:")
+                for idx, (item, puntuacio) in enumerate(recomanacions, 1):
+                    print(f"{idx}. {item.get_titol()} ({item.get_categoria()})")
+                    print(f"   {item.get_info()}")
+                    print(f"   Puntuació estimada: {puntuacio:.2f}\n")
+        except ValueError:
+            print("ID ha de ser un número enter")
+        except Exception as e:
+            print(f"Error: {str(e)}")
+
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,208 @@
-from sklearn.feature_extraction.text import TfidfVectorizer
+import os
+import re
+import numpy as np
+import scipy.sparse as sp
+from typing import List, Optional, Tuple
 
+from Codi_Matrius import Recomanador, Dades, DadesPelis, DadesLlibres
 
-class recomenador_contingut(Recomenador):
+PATRO_PARAULA = re.compile(r"(?u)\b\w\w+\b")  # Mateixa tokenització que el TfidfVectorizer per defecte
+
+
+def tfidf(textos: List[str]) -> Tuple[sp.csr_matrix, dict]:
+    # TF-IDF amb idf suavitzat i files normalitzades (L2), com el TfidfVectorizer de sklearn
+    vocabulari = {}
+    files, columnes = [], []
+    for fila, text in enumerate(textos):
+        for paraula in PATRO_PARAULA.findall(text.lower()):
+            columnes.append(vocabulari.setdefault(paraula, len(vocabulari)))
+            files.append(fila)
+    # Vocabulari en ordre alfabètic
+    ordenat = sorted(vocabulari)
+    nou_index = np.empty(len(ordenat), dtype=np.int64)
+    for nou, paraula in enumerate(ordenat):
+        nou_index[vocabulari[paraula]] = nou
+    vocabulari = {paraula: nou for nou, paraula in enumerate(ordenat)}
+
+    columnes = nou_index[np.asarray(columnes, dtype=np.int64)]
+    comptes = sp.csr_matrix((np.ones(len(files)), (np.asarray(files, dtype=np.int64), columnes)),
+                            shape=(len(textos), len(vocabulari)))
+    comptes.sum_duplicates()
+    matriu = _normalitzar_files(comptes @ sp.diags(_idf(comptes)))
+    return sp.csr_matrix(matriu, dtype=np.float32), vocabulari
+
+
+def _idf(comptes: sp.csr_matrix) -> np.ndarray:
+    # idf suavitzat a partir del nombre de files on apareix cada columna
+    df = np.diff(comptes.tocsc().indptr)
+    return np.log((1 + comptes.shape[0]) / (1 + df)) + 1
+
+
+def _normalitzar_files(matriu: sp.spmatrix) -> sp.csr_matrix:
+    # Files amb norma L2 unitària (les files buides es queden buides)
+    normes = np.sqrt(np.asarray(matriu.multiply(matriu).sum(axis=1)).ravel())
+    return sp.csr_matrix(sp.diags(np.where(normes > 0, 1.0 / np.maximum(normes, 1e-12), 0.0)) @ matriu)
+
+
+class recomenador_contingut(Recomanador):
     def __init__(self, dades: Dades):
         super().__init__(dades)
         if isinstance(dades, DadesPelis):
-            self.valoracio_maxima= 5.0
+            self.valoracio_maxima = 5.0
         else:
             self.valoracio_maxima = 10.0
-        self._prepara_items()
-
-    def prepara_items(self):
-
-        self.caractersistiques = []
-        items = sorted(self._dades._items.items(), key=lambda x: self._dades._item_id_to_idx[x[0]])
-        
-        for item_id, item in items:
-            if isinstance(item, Peli):
-                genres = item._genere.replace('|', ' ')
-                self.caracteristiques.append(genres)
-            elif isinstance(item, Llibre):
-                features = f"{item._autor} {item._editorial} {item._any}"
-                self.caracteristiques.append(features)
-        
+        self.vectors_items: Optional[sp.csr_matrix] = None
+        self.vocabulari = {}
+
+    def _prepara_items(self):
+        # Una fila de característiques per índex d'ítem (mateix ordre que les columnes de la matriu),
+        # llegides directament de les columnes del catàleg sense crear cap objecte Item
+        cataleg = self._dades._cataleg
+        if isinstance(self._dades, DadesPelis):
+            self.caracteristiques = [genres.replace('|', ' ') for genres in cataleg.valors('genere')]
+        else:
+            self.caracteristiques = [f"{autor} {editorial} {any_publicacio}" for autor, editorial, any_publicacio in
+                                     zip(cataleg.valors('autor'), cataleg.valors('editorial'), cataleg.valors('any'))]
+        num_items = self._dades._ratings_matrix.shape[1]
+        self.caracteristiques = self.caracteristiques[:num_items] + [""] * (num_items - len(self.caracteristiques))
+
         if not self.caracteristiques:
             self.vectors_items = None
         else:
-            self.vectoritzador = TfidfVectorizer()
-            self.vectors_item = self.vectoritzador.fit_transform(self.caracteristiques)
+            self.vectors_items, self.vocabulari = tfidf(self.caracteristiques)
+
+    def desar_caracteristiques(self, fitxer: str):
+        if self.vectors_items is None:
+            self._prepara_items()
+        os.makedirs(os.path.dirname(fitxer) or '.', exist_ok=True)
+        sp.save_npz(fitxer, self.vectors_items)
+
+    def carregar_caracteristiques(self, fitxer: str) -> bool:
+        if not os.path.exists(fitxer):
+            return False
+        vectors = sp.load_npz(fitxer).tocsr()
+        if vectors.shape[0] != self._dades._ratings_matrix.shape[1]:
+            print(f"Característiques de {fitxer} no corresponen a les dades actuals")
+            return False
+        self.vectors_items = vectors
+        return True
+
+    def _preparar(self):
+        # Els ítems afegits amb afegir_valoracions també necessiten la seva fila de característiques
+        if self.vectors_items is None or self.vectors_items.shape[0] != self._dades._ratings_matrix.shape[1]:
+            self._prepara_items()
+
+    def puntuacions_bloc(self, user_idxs: np.ndarray) -> np.ndarray:
+        # Perfil = suma de les files TF-IDF dels ítems valorats ponderada per la valoració;
+        # puntuació = cosinus ítem-perfil escalat a la valoració màxima
+        self._preparar()
+        valorats = self._dades.get_rating_matrix_csr()[user_idxs]
+        perfils = (valorats @ self.vectors_items).toarray()
+        normes = np.linalg.norm(perfils, axis=1, keepdims=True)
+        perfils = np.divide(perfils, normes, out=np.zeros_like(perfils), where=normes > 0)
+        return (self.vectors_items @ perfils.T).T * self.valoracio_maxima
+
+
+class RecomanadorTags(Recomanador):
+    # Contingut a partir de les etiquetes: cada ítem és la seva fila TF-IDF de la matriu
+    # ítems x etiquetes de Dades. El perfil de l'usuari suma els ítems valorats (ponderats per
+    # la valoració) i, amb pes `pes_propies`, les etiquetes que ha posat ell mateix; puntuació =
+    # cosinus ítem-perfil escalat a la valoració màxima. Tot es fa amb productes dispersos, i els
+    # ítems sense etiquetes no es poden puntuar (-inf): és el senyal per a la cua llarga
+    def __init__(self, dades: Dades, pes_propies: float = 1.0):
+        super().__init__(dades)
+        self.valoracio_maxima = 5.0 if isinstance(dades, DadesPelis) else 10.0
+        self._pes_propies = pes_propies
+        # Es construeixen a _preparar a partir de la matriu ítems x etiquetes de Dades
+        self.vectors_items: Optional[sp.csr_matrix] = None
+        self._idf: Optional[sp.dia_matrix] = None
+        self._sense_tags: Optional[np.ndarray] = None
+        self._origen = None  # Matriu de recomptes de la qual s'han derivat els vectors
+
+    def _preparar(self):
+        comptes = self._dades.get_matriu_tags_items()
+        if comptes is self._origen:
+            return
+        self._origen = comptes
+        if comptes is None:
+            self.vectors_items, self._idf, self._sense_tags = None, None, None
+            return
+        self._idf = sp.diags(_idf(comptes))
+        self.vectors_items = sp.csr_matrix(_normalitzar_files(comptes @ self._idf), dtype=np.float32)
+        self._sense_tags = np.diff(comptes.indptr) == 0
+
+    def puntuacions_bloc(self, user_idxs: np.ndarray) -> np.ndarray:
+        self._preparar()
+        user_idxs = np.asarray(user_idxs, dtype=np.int64)
+        if self.vectors_items is None:
+            return np.full((user_idxs.size, self._dades._ratings_matrix.shape[1]), -np.inf)
+        valorats = self._dades.get_rating_matrix_csr()[user_idxs]
+        perfils = _normalitzar_files(valorats @ self.vectors_items)
+        propies = self._dades.get_matriu_tags_usuaris()
+        if self._pes_propies and propies is not None:
+            perfils = perfils + self._pes_propies * _normalitzar_files(propies[user_idxs] @ self._idf)
+        perfils = _normalitzar_files(perfils)
+        scores = (self.vectors_items @ perfils.T).T.toarray() * self.valoracio_maxima
+        scores[:, self._sense_tags] = -np.inf
+        return scores
+
+
+def main():
+    print("=== RECOMANADOR PER CONTINGUT ===")
+    tipus = input("Selecciona el tipus de dades (llibres/pelis): ").lower()
+
+    if tipus == "llibres":
+        dades = DadesLlibres("carpeta_books/", massiu=True)
+        fonts = ["carpeta_books/Users.csv", "carpeta_books/Books.csv", "carpeta_books/Ratings.csv"]
+        cache_valida = dades.carregar_cache(fonts)
+        if not cache_valida:
+            dades.carregar_usuaris("carpeta_books/Users.csv")
+            dades.carregar_items("carpeta_books/Books.csv")
+            dades.carregar_valoracions("carpeta_books/Ratings.csv")
+            dades.desar_cache(fonts)
+    elif tipus == "pelis":
+        dades = DadesPelis("carpeta_movies/", massiu=True)
+        fonts = ["carpeta_movies/ratings.csv", "carpeta_movies/tags.csv", "carpeta_movies/movies.csv"]
+        cache_valida = dades.carregar_cache(fonts)
+        if not cache_valida:
+            dades.carregar_usuaris("carpeta_movies/ratings.csv")
+            dades.carregar_items("carpeta_movies/movies.csv")
+            dades.carregar_valoracions("carpeta_movies/ratings.csv")
+            dades.desar_cache(fonts)
+        dades.carregar_tags("carpeta_movies/tags.csv")
+    else:
+        print("Tipus no vàlid")
+        return
+
+    if tipus == "pelis" and input("Característiques (generes/tags): ").lower() == "tags":
+        recomanador = RecomanadorTags(dades)
+    else:
+        recomanador = recomenador_contingut(dades)
+        # La matriu TF-IDF dels ítems es reaprofita mentre les dades no canviïn
+        fitxer_tfidf = os.path.join(dades._directori_cache(), "tfidf_items.npz")
+        if not (cache_valida and recomanador.carregar_caracteristiques(fitxer_tfidf)):
+            recomanador.desar_caracteristiques(fitxer_tfidf)
+
+    while True:
+        user_input = input("\nIntrodueix ID d'usuari (ENTER per sortir): ").strip()
+        if not user_input:
+            break
+        try:
+            user_id = int(user_input)
+            recomanacions = recomanador.recomana(user_id, 5)
+
+            if not recomanacions:
+                print("No hi ha recomanacions disponibles")
+            else:
+                print(f"\nTop 5 recomanacions per {user_id}:")
+                for idx, (item, puntuacio) in enumerate(recomanacions, 1):
+                    print(f"{idx}. {item.get_titol()} ({item.get_categoria()})")
+                    print(f"   {item.get_info()}")
+                    print(f"   Puntuació estimada: {puntuacio:.2f}\n")
+        except ValueError:
+            print("ID ha de ser un número enter")
+        except Exception as e:
+            print(f"Error: {str(e)}")
 
-        
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+# Els mòduls del projecte són scripts al directori pare, no un paquet
+PROJECTE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECTE)
+DADES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dades')
+
+
+def carregar(carpeta, massiu=True, modul=None, ratings='ratings.csv'):
+    # DadesPelis (de Codi_Matrius si no es diu altra cosa) carregades des de la carpeta de prova
+    if modul is None:
+        import Codi_Matrius as modul
+    dades = modul.DadesPelis(carpeta, massiu=massiu)
+    dades.carregar_usuaris(carpeta + ratings)
+    dades.carregar_items(carpeta + 'movies.csv')
+    dades.carregar_valoracions(carpeta + ratings)
+    return dades
+
+
+@pytest.fixture
+def carpeta(tmp_path):
+    # Còpia de les dades de prova: la cache s'escriu a <carpeta>/.cache
+    desti = tmp_path / 'pelis'
+    shutil.copytree(DADES, desti)
+    return str(desti) + os.sep
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+import scipy.sparse as sp
+
+import avaluacio
+from Codi_Matrius import Recomanador
+from avaluacio import Avaluador, particio_temporal, particions_aleatories
+from conftest import carregar
+
+
+class _Constant(Recomanador):
+    # Prediu 3.0 per a tots els parells: el MAE/RMSE esperat es calcula directament de les dades
+    def puntuacions_bloc(self, user_idxs: np.ndarray) -> np.ndarray:
+        return np.full((len(user_idxs), self._dades._ratings_matrix.shape[1]), 3.0)
+
+
+# === MÈTRIQUES ===
+def test_mae_i_rmse():
+    avaluador = Avaluador()
+    prediccions, reals = np.array([3.0, 4.0, 5.0]), np.array([4.0, 4.0, 3.0])
+    assert avaluador.calcular_mae(prediccions, reals) == pytest.approx(1.0)
+    assert avaluador.calcular_rmse(prediccions, reals) == pytest.approx(np.sqrt(5 / 3))
+    assert avaluador.calcular_mae(np.array([]), np.array([])) == 0.0
+
+
+def test_precisio_recall_i_ndcg():
+    # Usuari 0: rellevants {0, 1}, encert a la posició 2 de 3. Usuari 1: rellevant {3}, encert a la
+    # posició 2 d'una llista amb farciment (-1) que no compta com a encert
+    recomanats = np.array([[2, 1, 4], [0, 3, -1]])
+    rellevants = sp.csr_matrix(np.array([[1, 1, 0, 0, 0], [0, 0, 0, 1, 0]]))
+    precisio, recall, ndcg = Avaluador().calcular_ranking(recomanats, rellevants)
+    descompte = 1 / np.log2(3)
+    assert np.allclose(precisio, [1 / 3, 1 / 3])
+    assert np.allclose(recall, [1 / 2, 1.0])
+    assert np.allclose(ndcg, [descompte / (1 + descompte), descompte])
+
+
+# === PARTICIONS ===
+def test_particions_aleatories_equilibrades_i_reproduibles():
+    particions = particions_aleatories(103, k=5, llavor=7)
+    comptes = np.bincount(particions)
+    assert comptes.size == 5 and comptes.max() - comptes.min() <= 1
+    assert np.array_equal(particions, particions_aleatories(103, k=5, llavor=7))
+    assert not np.array_equal(particions, particions_aleatories(103, k=5, llavor=8))
+
+
+def test_particio_temporal_reserva_les_mes_recents():
+    timestamps = np.random.default_rng(0).permutation(50) * 100
+    particio = particio_temporal(timestamps, fraccio_test=0.2)
+    assert np.array_equal(np.sort(timestamps[particio == 0]), np.arange(40, 50) * 100)
+    assert np.all(particio[particio != 0] == -1)
+
+
+# === AVALUACIÓ CREUADA ===
+def test_avalua_un_predictor_constant(carpeta):
+    dades = carregar(carpeta)
+    reals = dades._ratings_matrix.tocoo().data
+    particions = particions_aleatories(reals.size, k=3)
+    resultats = avaluacio.avalua(dades, {"constant": _Constant}, particions, n=10, processos=2)
+    assert sorted(r["particio"] for r in resultats) == [0, 1, 2]
+    for resultat in resultats:
+        test = reals[particions == resultat["particio"]]
+        assert resultat["cobertura"] == 1.0
+        assert resultat["mae"] == pytest.approx(np.abs(test - 3.0).mean())
+        assert resultat["rmse"] == pytest.approx(np.sqrt(((test - 3.0) ** 2).mean()))
@@ -0,0 +1,91 @@
+import pytest
+
+import Codi_Provisional
+from Codi_Provisional import Item, RecomanadorSimple
+
+
+def _carregar(carpeta):
+    dades = Codi_Provisional.DadesPelis(carpeta)
+    dades.carregar_usuaris(carpeta + 'ratings.csv')
+    dades.carregar_items(carpeta + 'movies.csv')
+    dades.carregar_valoracions(carpeta + 'ratings.csv')
+    return dades
+
+
+def _indexos_consistents(dades):
+    # Els índexs invertits i les estadístiques coincideixen amb els que surten de recórrer el diccionari
+    per_usuari, per_item, estadistiques = {}, {}, {}
+    for (user_id, item_id), valor in dades.valoracions.items():
+        per_usuari.setdefault(user_id, {})[item_id] = valor
+        per_item.setdefault(item_id, {})[user_id] = valor
+        if valor > 0:
+            estadistiques[item_id] = (estadistiques.get(item_id, (0.0, 0))[0] + valor,
+                                      estadistiques.get(item_id, (0.0, 0))[1] + 1)
+    for user_id in per_usuari:
+        assert dades.get_valoracions_usuari(user_id) == per_usuari[user_id]
+    for item_id in per_item:
+        assert dades.get_valoracions_item(item_id) == per_item[item_id]
+        suma, vots = dades.get_estadistiques_item(item_id)
+        assert vots == estadistiques.get(item_id, (0.0, 0))[1]
+        assert suma == pytest.approx(estadistiques.get(item_id, (0.0, 0))[0])
+
+
+def _recomana_directe(dades, user_id, n, min_vots=3):
+    # Versió original: recorre tot el diccionari de valoracions per a cada consulta
+    valorats = {item_id for (u, item_id) in dades.valoracions if u == user_id}
+    sumes, vots = {}, {}
+    for (_, item_id), valor in dades.valoracions.items():
+        if valor > 0:
+            sumes[item_id] = sumes.get(item_id, 0.0) + valor
+            vots[item_id] = vots.get(item_id, 0) + 1
+    mitjanes = [sumes[i] / vots[i] for i in sumes if vots[i] >= min_vots]
+    avg_global = sum(mitjanes) / len(mitjanes)
+    puntuacions = []
+    for item in dades.items:
+        num = vots.get(item.get_id(), 0)
+        if item.get_id() in valorats or num < min_vots:
+            continue
+        avg = sumes[item.get_id()] / num
+        puntuacions.append((item, (num / (num + min_vots)) * avg + (min_vots / (num + min_vots)) * avg_global))
+    puntuacions.sort(key=lambda x: x[1], reverse=True)
+    return puntuacions[:n]
+
+
+def _mateixes_recomanacions(obtingudes, esperades):
+    assert [item.get_id() for item, _ in obtingudes] == [item.get_id() for item, _ in esperades]
+    assert [score for _, score in obtingudes] == pytest.approx([score for _, score in esperades])
+
+
+# === ÍNDEXS PER ID ===
+def test_consultes_per_id(carpeta):
+    dades = _carregar(carpeta)
+    for item in dades.items:
+        assert dades.get_item(item.get_id()) is next(i for i in dades.items if i.get_id() == item.get_id())
+    for usuari in dades.users:
+        assert dades.get_usuari(usuari.get_id()) is usuari
+    assert dades.get_usuari(-1) is None and dades.get_item(-1) is None
+    # Amb ids repetits, com abans, guanya el primer
+    primer, segon = Item(7, "Primer"), Item(7, "Segon")
+    dades._set_items([primer, segon])
+    assert dades.get_item(7) is primer
+
+
+# === ÍNDEXS INVERTITS ===
+def test_indexos_invertits_despres_de_carregar(carpeta):
+    _indexos_consistents(_carregar(carpeta))
+
+
+def test_indexos_invertits_despres_d_afegir(carpeta):
+    dades = _carregar(carpeta)
+    recomanador = RecomanadorSimple(dades)
+    _mateixes_recomanacions(recomanador.recomana(1, 10), _recomana_directe(dades, 1, 10))
+    (user_id, item_id), valor = next(iter(dades.valoracions.items()))
+    dades.afegir_valoracio(user_id, item_id, 5.0 if valor != 5.0 else 1.0)  # Canvi de valor
+    dades.afegir_valoracio(2, 1, 0.0)  # Una valoració 0 no compta a les estadístiques
+    for usuari in range(900, 904):  # Quatre vots de 5.0 fan entrar l'ítem 2 al top-10
+        dades.afegir_valoracio(usuari, 2, 5.0)
+    _indexos_consistents(dades)
+    # La mitjana global en cache es refà amb les valoracions noves
+    recomanacions = recomanador.recomana(1, 10)
+    _mateixes_recomanacions(recomanacions, _recomana_directe(dades, 1, 10))
+    assert 2 in [item.get_id() for item, _ in recomanacions]
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from conftest import carregar
+from recomanador_colaboratiu import RecomanadorCol·laboratiu, RecomanadorCol·laboratiuRecent
+
+
+def _referencia(valors, k, pesos=None):
+    # Versió directa amb bucles sobre la matriu densa (0 = no valorat): cosinus sobre els ítems
+    # comuns, k veïns (empats per índex més baix) i mitjana + desviacions ponderades dels veïns
+    # que han valorat l'ítem. `pesos` és el pes de cada valoració a la predicció (1 si no n'hi ha)
+    pesos = (valors > 0).astype(float) if pesos is None else pesos
+    num_usuaris, num_items = valors.shape
+    valorats = valors > 0
+    mitjanes = np.array([valors[u, valorats[u]].mean() if valorats[u].any() else 0.0 for u in range(num_usuaris)])
+    scores = np.empty(valors.shape)
+    for u in range(num_usuaris):
+        sims = np.zeros(num_usuaris)
+        for v in range(num_usuaris):
+            comuns = valorats[u] & valorats[v]
+            if comuns.any():
+                sims[v] = (valors[u, comuns] @ valors[v, comuns] /
+                           (np.sqrt((valors[u, comuns] ** 2).sum()) * np.sqrt((valors[v, comuns] ** 2).sum())))
+        veins = sorted((v for v in range(num_usuaris) if v != u), key=lambda v: (-sims[v], v))[:k]
+        for i in range(num_items):
+            numerador = sum(sims[v] * pesos[v, i] * (valors[v, i] - mitjanes[v]) for v in veins if valorats[v, i])
+            denominador = sum(abs(sims[v]) * pesos[v, i] for v in veins if valorats[v, i])
+            scores[u, i] = mitjanes[u] + (numerador / denominador if denominador != 0 else 0.0)
+    return scores
+
+
+@pytest.mark.parametrize('k', [5, 50])
+def test_colaboratiu_com_la_versio_directa(carpeta, k):
+    dades = carregar(carpeta)
+    valors = dades.get_rating_matrix_csr().toarray().astype(np.float64)
+    scores = RecomanadorCol·laboratiu(dades, k=k).puntuacions_bloc(np.arange(valors.shape[0]))
+    assert np.allclose(scores, _referencia(valors, k))
+
+
+def test_colaboratiu_recent_com_la_versio_directa(carpeta):
+    dades = carregar(carpeta)
+    per_files = dades.get_rating_matrix_csr()
+    valors = per_files.toarray().astype(np.float64)
+    ara = dades.timestamp_maxim()
+    edats = np.zeros(valors.shape)
+    edats[per_files.nonzero()] = ara - dades.get_timestamps_csr()
+    pesos = np.exp2(-edats / (180.0 * 86400))
+    recomanador = RecomanadorCol·laboratiuRecent(dades, k=5, semivida_dies=180.0)
+    scores = recomanador.puntuacions_bloc(np.arange(valors.shape[0]))
+    assert np.allclose(scores, _referencia(valors, 5, pesos))
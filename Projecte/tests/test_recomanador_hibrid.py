@@ -0,0 +1,41 @@
+import numpy as np
+import scipy.sparse as sp
+
+import avaluacio
+from conftest import carregar
+from recomanador_hibrid import RecomanadorHibrid, _calibrar
+
+
+def test_calibrar_porta_a_l_escala_de_valoracions():
+    # Un component que puntua 2 * valoració + 1 (usuari 0) o el cosinus decreixent amb la
+    # valoració (usuari 1, beta = 0) queda a l'escala de les valoracions de cada usuari
+    valorats = sp.csr_matrix(np.array([[4.0, 2.0, 0.0, 5.0], [3.0, 0.0, 1.0, 0.0], [0.0, 0.0, 0.0, 0.0]]))
+    scores = np.array([[9.0, 5.0, 7.0, 11.0], [0.1, 0.5, 0.9, -np.inf], [1.0, 2.0, 3.0, 4.0]])
+    calibrats = _calibrar(scores, valorats)
+    assert np.allclose(calibrats[0], [4.0, 2.0, 3.0, 5.0])
+    assert np.allclose(calibrats[1, :3], 2.0)
+    assert calibrats[1, 3] == -np.inf
+    assert np.all(calibrats[2] == -np.inf)
+
+
+def test_hibrid_no_es_pitjor_que_el_millor_component(carpeta):
+    dades = carregar(carpeta)
+    particions = avaluacio.particions_aleatories(dades._ratings_matrix.nnz, k=5)
+    noms = ["simple", "items", "contingut", "hibrid"]
+    resultats = avaluacio.avalua(dades, {nom: avaluacio.FABRIQUES[nom] for nom in noms}, particions,
+                                 n=10, processos=2)
+    mae = {nom: np.mean([r["mae"] for r in resultats if r["recomanador"] == nom]) for nom in noms}
+    rmse = {nom: np.mean([r["rmse"] for r in resultats if r["recomanador"] == nom]) for nom in noms}
+    assert mae["hibrid"] <= min(mae[nom] for nom in noms[:-1])
+    assert rmse["hibrid"] <= min(rmse[nom] for nom in noms[:-1])
+
+
+def test_usuaris_en_fred_reben_popularitat(carpeta):
+    dades = carregar(carpeta)
+    dades.afegir_valoracions([(5000, 1, 4.0)])
+    dades.fusionar_valoracions()
+    hibrid = avaluacio._hibrid(dades)
+    hibrid._min_valoracions = 2
+    nou = dades._user_id_to_idx[5000]
+    assert isinstance(hibrid, RecomanadorHibrid)
+    assert np.array_equal(hibrid.puntuacions(nou), hibrid._popularitat.puntuacions(nou))
@@ -0,0 +1,351 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+import Codi_Matrius
+import SHIT
+from Codi_Matrius import SEGONS_DIA, DadesPelis, RecomanadorALS, RecomanadorSimple, RecomanadorRecent
+from benchmark_ann import _recall
+from precalcul import precalcula, carregar_precalcul
+from conftest import DADES, carregar
+
+
+def _fonts(carpeta):
+    return [carpeta + 'ratings.csv', carpeta + 'tags.csv', carpeta + 'movies.csv']
+
+
+def _mateixes_dades(a, b):
+    assert a._ratings_matrix.shape == b._ratings_matrix.shape
+    assert (a._ratings_matrix != b._ratings_matrix).nnz == 0
+    assert np.array_equal(a.get_timestamps(), b.get_timestamps())
+    assert a._user_id_to_idx == b._user_id_to_idx
+    assert a._item_id_to_idx == b._item_id_to_idx
+    assert np.array_equal(a._num_vots, b._num_vots)
+    assert np.allclose(a._suma_valoracions, b._suma_valoracions)
+    for idx in range(len(a._idx_to_item_id)):
+        assert a.get_item_per_idx(idx).get_titol() == b.get_item_per_idx(idx).get_titol()
+        assert a.get_item_per_idx(idx).get_info() == b.get_item_per_idx(idx).get_info()
+
+
+def _valoracions_per_id(dades):
+    # {(user_id, item_id): (valoració, timestamp)}, independent de l'ordre dels índexs
+    matriu = dades._ratings_matrix.tocoo()
+    usuaris = {idx: user_id for user_id, idx in dades._user_id_to_idx.items()}
+    return {(usuaris[fila], dades._idx_to_item_id[columna]): (valor, timestamp)
+            for fila, columna, valor, timestamp in zip(matriu.row, matriu.col, matriu.data, dades.get_timestamps())}
+
+
+# === EQUIVALÈNCIA AMB LA VERSIÓ ORIGINAL ===
+# Recomanacions de la versió inicial del projecte sobre les dades de prova (top-10 de cada usuari)
+with open(os.path.join(DADES, 'recomana_baseline.json'), encoding='utf-8') as f:
+    ESPERAT = json.load(f)
+
+
+@pytest.mark.parametrize('clau', sorted(ESPERAT))
+def test_recomana_com_la_versio_original(carpeta, clau):
+    nom_modul, classe = clau.split('.')
+    modul = Codi_Matrius if nom_modul == 'Codi_Matrius' else SHIT
+    recomanador = getattr(modul, classe)(carregar(carpeta, modul=modul))
+    for user_id, esperat in ESPERAT[clau].items():
+        obtingut = recomanador.recomana(int(user_id), 10)
+        assert [item.get_id() for item, _ in obtingut] == [item_id for item_id, _ in esperat], user_id
+        assert [puntuacio for _, puntuacio in obtingut] == pytest.approx([p for _, p in esperat], rel=1e-6)
+
+
+# === CÀRREGA ===
+@pytest.mark.parametrize('modul', [Codi_Matrius, SHIT])
+def test_carrega_massiva_igual_que_per_linies(carpeta, modul):
+    massiva = carregar(carpeta, massiu=True, modul=modul)
+    per_linies = carregar(carpeta, massiu=False, modul=modul)
+    assert massiva._ratings_matrix.shape == per_linies._ratings_matrix.shape
+    assert (massiva._ratings_matrix != per_linies._ratings_matrix).nnz == 0
+    assert massiva._user_id_to_idx == per_linies._user_id_to_idx
+    assert massiva._item_id_to_idx == per_linies._item_id_to_idx
+    if modul is Codi_Matrius:
+        _mateixes_dades(massiva, per_linies)
+
+
+# === CACHE ===
+def test_cache_anada_i_tornada(carpeta):
+    dades = carregar(carpeta)
+    dades.desar_cache(_fonts(carpeta))
+    carregades = DadesPelis(carpeta, massiu=True)
+    assert carregades.carregar_cache(_fonts(carpeta))
+    _mateixes_dades(dades, carregades)
+
+
+def test_cache_despres_d_afegir_valoracions(carpeta):
+    # Carregar de la cache (columnes mapades), afegir, desar sobre els mateixos fitxers i tornar a carregar
+    carregar(carpeta).desar_cache(_fonts(carpeta))
+    dades = DadesPelis(carpeta, massiu=True)
+    assert dades.carregar_cache(_fonts(carpeta))
+    noves = [(1, 2, 1.5, 1_700_000_000), (9999, 1, 4.0, 1_700_000_001), (2, 424242, 3.0, 1_700_000_002)]
+    assert dades.afegir_valoracions(noves) == 3
+    dades.desar_cache(_fonts(carpeta))
+    carregades = DadesPelis(carpeta, massiu=True)
+    assert carregades.carregar_cache(_fonts(carpeta))
+    _mateixes_dades(dades, carregades)
+    assert carregades.get_item(424242).get_titol() == "(sense títol)"
+    esperat = [item.get_id() for item, _ in RecomanadorSimple(dades).recomana(9999, 10)]
+    assert [item.get_id() for item, _ in RecomanadorSimple(carregades).recomana(9999, 10)] == esperat
+    # Una segona passada sense canvis torna a desar sobre columnes que ara estan totes mapades
+    carregades.desar_cache(_fonts(carpeta))
+    altra = DadesPelis(carpeta, massiu=True)
+    assert altra.carregar_cache(_fonts(carpeta))
+    _mateixes_dades(dades, altra)
+
+
+# === INGESTA INCREMENTAL ===
+@pytest.mark.parametrize('modul', [Codi_Matrius, SHIT])
+def test_pendents_no_es_recomanen(carpeta, modul):
+    # Un ítem que l'usuari acaba de valorar no es recomana encara que no s'hagi fusionat
+    dades = carregar(carpeta, modul=modul)
+    recomanador = modul.RecomanadorSimple(dades)
+    primer = recomanador.recomana(1, 5)[0][0].get_id()
+    dades.afegir_valoracions([(1, primer, 2.0)])
+    assert dades._pendents
+    assert primer not in [item.get_id() for item, _ in recomanador.recomana(1, 5)]
+    indexos, _ = recomanador.recomana_batch([1], 5)
+    assert dades._item_id_to_idx[primer] not in indexos[0]
+
+
+
+def test_veins_en_cache_es_refan_despres_de_fusionar(carpeta):
+    # Els veïns d'un usuari depenen de totes les files: després d'una fusió que només afegeix
+    # usuaris nous, la seva fila no canvia però el resultat ha de ser el d'un recomanador nou
+    dades = carregar(carpeta, modul=SHIT)
+    recomanador = SHIT.RecomanadorCol·laboratiu(dades, k=5)
+    abans = [item.get_id() for item, _ in recomanador.recomana(1, 10)]
+    fila = dades.get_rating_matrix()[dades._user_id_to_idx[1]]
+    valorats = [(dades._idx_to_item_id[c], float(v)) for c, v in zip(fila.indices, fila.data)]
+    nou = next(item_id for item_id in dades._item_id_to_idx if item_id not in dict(valorats))
+    for user_id in range(1001, 1006):
+        dades.afegir_valoracions([(user_id, item_id, valor) for item_id, valor in valorats] + [(user_id, nou, 5.0)])
+    dades.fusionar_valoracions()
+    despres = [(item.get_id(), p) for item, p in recomanador.recomana(1, 10)]
+    esperat = [(item.get_id(), p) for item, p in SHIT.RecomanadorCol·laboratiu(dades, k=5).recomana(1, 10)]
+    assert despres == esperat
+    assert [item_id for item_id, _ in despres] != abans
+
+
+def test_valoracio_0_fusionada_no_es_un_vot_nou(carpeta):
+    # Un 0 fusionat és a l'estructura de la matriu: tornar a valorar la parella no suma cap vot
+    dades = carregar(carpeta)
+    dades.afegir_valoracions([(1, 2, 0.0)])
+    dades.fusionar_valoracions()
+    columna = dades._item_id_to_idx[2]
+    vots = dades._num_vots[columna]
+    dades.afegir_valoracions([(1, 2, 3.0)])
+    assert dades._num_vots[columna] == vots
+    dades.fusionar_valoracions()
+    matriu = dades._ratings_matrix
+    assert np.array_equal(dades._num_vots, np.diff(matriu.indptr))
+    assert np.allclose(dades._suma_valoracions, np.asarray(matriu.sum(axis=0)).ravel())
+    assert dades._mitjana_global == pytest.approx(matriu.data.mean())
+
+
+def test_ingesta_i_fusio_igual_que_recarregar(carpeta):
+    # Base amb una part de les valoracions (sense els últims usuaris ni una de cada cinc línies)
+    # i la resta afegida per lots: després de fusionar ha de coincidir amb carregar-ho tot
+    with open(carpeta + 'ratings.csv', encoding='utf-8') as f:
+        capcalera, *linies = f.read().splitlines()
+    base, resta = [], []
+    for i, linia in enumerate(linies):
+        (base if int(linia.split(',')[0]) <= 20 and i % 5 else resta).append(linia)
+    with open(carpeta + 'ratings_base.csv', 'w', encoding='utf-8') as f:
+        f.write('\n'.join([capcalera] + base) + '\n')
+
+    dades = carregar(carpeta, ratings='ratings_base.csv')
+    noves = [(int(u), int(i), float(r), int(t)) for u, i, r, t in (linia.split(',') for linia in resta)]
+    for inici in range(0, len(noves), 50):
+        dades.afegir_valoracions(noves[inici:inici + 50])
+    dades.fusionar_valoracions()
+    assert not dades._pendents
+    completes = carregar(carpeta)
+    assert _valoracions_per_id(dades) == _valoracions_per_id(completes)
+
+    recomanador, referencia = RecomanadorSimple(dades), RecomanadorSimple(completes)
+    for user_id in completes._user_id_to_idx:
+        obtingut = {item.get_id(): p for item, p in recomanador.recomana(user_id, 10_000)}
+        esperat = {item.get_id(): p for item, p in referencia.recomana(user_id, 10_000)}
+        assert obtingut == pytest.approx(esperat), user_id
+
+
+# === CACHE DE VEÏNS (SHIT) ===
+def test_cache_veins_expulsa_el_menys_usat_recentment():
+    veins, sims = np.arange(10), np.ones(10)
+    mida = veins.size * 4 + sims.size * 4 + SHIT.CacheSimilituds.SOBRECOST_ENTRADA  # int32 + float32
+    cache = SHIT.CacheSimilituds(max_bytes=3 * mida)
+    for user_idx in range(3):
+        cache.desar(user_idx, 0, veins, sims)
+    assert cache.obtenir(0, 0) is not None  # 0 passa a ser el més recent i 1 el més antic
+    cache.desar(3, 0, veins, sims)
+    assert cache.estadistiques()["expulsions"] == 1
+    assert [cache.obtenir(user_idx, 0) is not None for user_idx in range(4)] == [True, False, True, True]
+    assert cache.estadistiques()["bytes"] == 3 * mida
+    # Tornar a desar un usuari el substitueix sense comptar-lo dues vegades
+    cache.desar(3, 0, veins[:5], sims[:5])
+    mida_5 = 5 * 8 + SHIT.CacheSimilituds.SOBRECOST_ENTRADA
+    assert cache.estadistiques()["bytes"] == 2 * mida + mida_5
+    # Una versió diferent és una fallada i allibera l'entrada; una entrada més gran que el màxim no es desa
+    assert cache.obtenir(2, 1) is None
+    cache.desar(4, 0, np.arange(1000), np.ones(1000))
+    assert cache.obtenir(4, 0) is None
+    estadistiques = cache.estadistiques()
+    assert (estadistiques["entrades"], estadistiques["bytes"]) == (2, mida + mida_5)
+    assert (estadistiques["encerts"], estadistiques["fallades"]) == (4, 3)
+
+
+def test_consultes_repetides_surten_de_la_cache(carpeta):
+    recomanador = SHIT.RecomanadorCol·laboratiu(carregar(carpeta, modul=SHIT), k=5)
+    primera = [(item.get_id(), p) for item, p in recomanador.recomana(1, 10)]
+    assert recomanador.get_cache().estadistiques()["fallades"] == 1
+    assert [(item.get_id(), p) for item, p in recomanador.recomana(1, 10)] == primera
+    assert recomanador.get_cache().estadistiques()["encerts"] == 1
+
+
+# === VEÏNS APROXIMATS (LSH, SHIT) ===
+def _veins_de_tots(recomanador):
+    preparat = recomanador._preparat_actual()
+    num_usuaris = recomanador._dades.get_rating_matrix().shape[0]
+    return [recomanador._veins(user_idx, preparat) for user_idx in range(num_usuaris)]
+
+
+@pytest.mark.parametrize('configuracio', [{}, {'num_taules': 1, 'bits': 0}, {'num_taules': 1, 'bits': 62}])
+def test_lsh_com_la_cerca_exacta(carpeta, configuracio):
+    # Per defecte (recall alt), amb una sola cubeta (bits = 0) o amb cubetes buides, on es torna
+    # a la cerca exacta perquè hi ha menys de k candidats, el resultat és el de la cerca exacta
+    dades = carregar(carpeta, modul=SHIT)
+    exacte = SHIT.RecomanadorCol·laboratiu(dades, k=5)
+    aproximat = SHIT.RecomanadorCol·laboratiu(dades, k=5, aproximat=True, **configuracio)
+    referencia = [set(veins.tolist()) for veins, _ in _veins_de_tots(exacte)]
+    assert _recall(referencia, [set(veins.tolist()) for veins, _ in _veins_de_tots(aproximat)]) == 1.0
+    user_idxs = np.arange(dades.get_rating_matrix().shape[0])
+    esperats, _ = exacte.recomana_batch_idx(user_idxs, 10)
+    assert np.array_equal(aproximat.recomana_batch_idx(user_idxs, 10)[0], esperats)
+
+
+def test_lsh_reordena_els_candidats_amb_la_similitud_exacta(carpeta):
+    # Amb poques taules el recall baixa, però els veïns surten dels candidats i amb la mateixa similitud
+    dades = carregar(carpeta, modul=SHIT)
+    exacte = SHIT.RecomanadorCol·laboratiu(dades, k=5)
+    aproximat = SHIT.RecomanadorCol·laboratiu(dades, k=5, aproximat=True, num_taules=2, bits=4)
+    index = aproximat._index_actual()
+    preparat = exacte._preparat_actual()
+    referencia, trobats = [], []
+    for user_idx, (veins, sims) in enumerate(_veins_de_tots(aproximat)):
+        candidats = index.candidats(user_idx)
+        if candidats.size >= 5:
+            assert set(veins.tolist()) <= set(candidats.tolist())
+        totes = exacte._similituds_bloc(np.array([user_idx]), preparat)[0]
+        assert np.allclose(sims, totes[veins])
+        referencia.append(set(exacte._veins(user_idx, preparat)[0].tolist()))
+        trobats.append(set(veins.tolist()))
+    assert 0.0 < _recall(referencia, trobats) < 1.0
+
+
+# === RECÈNCIA ===
+def test_recent_dona_mes_pes_a_les_valoracions_recents(carpeta):
+    # Dos ítems nous amb les mateixes valoracions: les de l'un són de fa un any i les de l'altre d'ara
+    dades = carregar(carpeta)
+    ara = dades.timestamp_maxim()
+    dades.afegir_valoracions([(9000 + u, 880001, 5.0, ara - 365 * SEGONS_DIA) for u in range(3)] +
+                             [(9000 + u, 880002, 5.0, ara) for u in range(3)])
+    dades.fusionar_valoracions()
+    antic, nou = dades._item_id_to_idx[880001], dades._item_id_to_idx[880002]
+    simple = RecomanadorSimple(dades).puntuacions(0)
+    assert simple[antic] == simple[nou]
+    recent = RecomanadorRecent(dades, semivida_dies=30.0).puntuacions(0)
+    assert recent[nou] > recent[antic]
+    finestra = RecomanadorRecent(dades, semivida_dies=30.0, finestra_dies=90.0).puntuacions(0)
+    assert finestra[antic] == -np.inf
+    assert np.isfinite(finestra[nou])
+
+
+def test_valoracions_sense_timestamp_no_mouen_la_recencia(carpeta):
+    # Sense timestamp una valoració compta com la més recent de les dades, no com l'hora actual:
+    # el moment de referència no canvia i les tendències es mantenen (amb l'hora actual, totes
+    # les valoracions històriques pesarien ~0 i el rànquing quedaria en ordre d'índex)
+    dades = carregar(carpeta)
+    ara = dades.timestamp_maxim()
+    recent = RecomanadorRecent(dades, semivida_dies=30.0)
+    abans = [item.get_id() for item, _ in recent.tendencies(10)]
+    dades.afegir_valoracions([(1, 880003, 3.0)])
+    dades.fusionar_valoracions()
+    assert dades.timestamp_maxim() == ara
+    assert _valoracions_per_id(dades)[(1, 880003)] == (3.0, ara)
+    assert len(set(abans) & {item.get_id() for item, _ in recent.tendencies(10)}) >= 8
+
+
+# === ALS ===
+# Valoració = 3 + a_u * b_i: la mitjana global és 3 (b té mitjana 0) i la matriu centrada és de rang 1
+RANG1_USUARIS = [0.5, 0.7, 0.9, 1.0, 1.1, 1.2, 1.3, 1.5]
+RANG1_ITEMS = {1: -1.0, 2: -0.6, 6: -0.2, 10: 0.2, 32: 0.6, 34: 1.0}
+
+
+def _carregar_rang1(carpeta):
+    with open(carpeta + 'ratings_rang1.csv', 'w') as fitxer:
+        fitxer.write('userId,movieId,rating,timestamp\n')
+        for user_id, a in enumerate(RANG1_USUARIS, start=1):
+            for item_id, b in RANG1_ITEMS.items():
+                fitxer.write(f'{user_id},{item_id},{3.0 + a * b},{1000000000 + user_id}\n')
+    return carregar(carpeta, ratings='ratings_rang1.csv')
+
+
+def test_als_reconstrueix_una_matriu_de_rang_1(carpeta):
+    dades = _carregar_rang1(carpeta)
+    als = RecomanadorALS(dades, factors=1, regularitzacio=1e-4, iteracions=20)
+    scores = als.puntuacions_bloc(np.arange(len(RANG1_USUARIS)))
+    for item_id, b in RANG1_ITEMS.items():
+        esperats = [3.0 + a * b for a in RANG1_USUARIS]
+        assert np.allclose(scores[:, dades._item_id_to_idx[item_id]], esperats, atol=1e-2)
+
+
+def test_als_plega_usuaris_nous_sense_reentrenar(carpeta):
+    # Un usuari nou amb a = 0.8 que valora quatre ítems: el plegat incremental prediu els altres
+    # dos sense tocar els factors dels usuaris existents
+    dades = _carregar_rang1(carpeta)
+    als = RecomanadorALS(dades, factors=1, regularitzacio=1e-4, iteracions=20)
+    als.entrenar()
+    abans = als._factors_usuaris.copy()
+    vistos = list(RANG1_ITEMS)[:4]
+    dades.afegir_valoracions([(5000, item_id, 3.0 + 0.8 * RANG1_ITEMS[item_id], 1000000100) for item_id in vistos])
+    dades.fusionar_valoracions()
+    nou = dades._user_id_to_idx[5000]
+    scores = als.puntuacions(nou)
+    assert np.array_equal(als._factors_usuaris[:len(abans)], abans)
+    for item_id in list(RANG1_ITEMS)[4:]:
+        assert scores[dades._item_id_to_idx[item_id]] == pytest.approx(3.0 + 0.8 * RANG1_ITEMS[item_id], abs=1e-2)
+
+
+def test_als_factors_desats_i_carregats(carpeta, tmp_path):
+    dades = carregar(carpeta)
+    usuaris = np.arange(dades._ratings_matrix.shape[0])
+    als = RecomanadorALS(dades, factors=8)
+    directori = str(tmp_path / 'factors')
+    als.desar_factors(directori)
+    carregat = RecomanadorALS(dades, factors=8)
+    assert carregat.carregar_factors(directori)
+    assert np.array_equal(carregat.puntuacions_bloc(usuaris), als.puntuacions_bloc(usuaris))
+    # Uns factors d'unes altres dades no es fan servir
+    dades.afegir_valoracions([(5000, 1, 4.0)])
+    dades.fusionar_valoracions()
+    assert not RecomanadorALS(dades, factors=8).carregar_factors(directori)
+
+
+# === PRECÀLCUL ===
+@pytest.mark.parametrize('modul, classe', [(Codi_Matrius, 'RecomanadorSimple'), (Codi_Matrius, 'RecomanadorItemItem'),
+                                           (SHIT, 'RecomanadorSimple'), (SHIT, 'RecomanadorCol·laboratiu')])
+def test_precalcul_igual_que_en_serie(carpeta, tmp_path, modul, classe):
+    # Diversos processos i tasques petites perquè el resultat es reparteixi entre workers
+    recomanador = getattr(modul, classe)(carregar(carpeta, modul=modul))
+    directori = precalcula(recomanador, str(tmp_path / 'precalcul'), n=10, processos=2, usuaris_per_tasca=7)
+    user_ids, indexos, scores = carregar_precalcul(directori)
+    num_usuaris = recomanador._dades._ratings_matrix.shape[0]
+    esperats, scores_esperats = recomanador.recomana_batch_idx(np.arange(num_usuaris), 10)
+    assert indexos.shape == (num_usuaris, 10)
+    assert np.array_equal(indexos, esperats)
+    assert np.allclose(scores, scores_esperats, equal_nan=True)
+    assert all(recomanador._dades._user_id_to_idx[int(user_id)] == idx for idx, user_id in enumerate(user_ids))
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from conftest import carregar
+from recomenador3 import RecomanadorTags, recomenador_contingut, tfidf
+
+
+# === TF-IDF ===
+def test_tfidf_com_el_calcul_a_ma():
+    # Paraules d'una lletra fora; idf = ln((1 + n) / (1 + df)) + 1; files amb norma L2 unitària
+    matriu, vocabulari = tfidf(["a Gat gos", "gat gat", "peix", ""])
+    assert vocabulari == {'gat': 0, 'gos': 1, 'peix': 2}
+    idf_gat, idf_gos = np.log(5 / 3) + 1, np.log(5 / 2) + 1
+    esperada = np.array([[idf_gat, idf_gos, 0.0], [1.0, 0.0, 0.0], [0.0, 0.0, 1.0], [0.0, 0.0, 0.0]])
+    esperada[0] /= np.hypot(idf_gat, idf_gos)
+    assert np.allclose(matriu.toarray(), esperada)
+
+
+# === RECOMANADOR PER CONTINGUT ===
+def test_contingut_prefereix_els_generes_de_l_usuari(carpeta):
+    # Un usuari nou que només ha valorat Toy Story: els ítems amb els mateixos gèneres puntuen
+    # el màxim, i els que no en comparteixen cap, zero
+    dades = carregar(carpeta)
+    dades.afegir_valoracions([(5000, 1, 4.0)])
+    dades.fusionar_valoracions()
+    scores = recomenador_contingut(dades).puntuacions(dades._user_id_to_idx[5000])
+    generes = [set(text.split('|')) for text in dades._cataleg.valors('genere')]
+    toy_story = generes[dades._item_id_to_idx[1]]
+    iguals = [idx for idx, g in enumerate(generes) if g == toy_story]
+    disjunts = [idx for idx, g in enumerate(generes) if not g & toy_story]
+    assert len(iguals) > 1 and disjunts
+    assert np.allclose(scores[iguals], 5.0)
+    assert np.allclose(scores[disjunts], 0.0)
+    assert scores.max() == pytest.approx(5.0)
+
+
+def test_caracteristiques_desades_i_carregades(carpeta, tmp_path):
+    dades = carregar(carpeta)
+    usuaris = np.arange(dades._ratings_matrix.shape[0])
+    contingut = recomenador_contingut(dades)
+    fitxer = str(tmp_path / 'caracteristiques.npz')
+    contingut.desar_caracteristiques(fitxer)
+    carregat = recomenador_contingut(dades)
+    assert carregat.carregar_caracteristiques(fitxer)
+    assert np.array_equal(carregat.puntuacions_bloc(usuaris), contingut.puntuacions_bloc(usuaris))
+    # Unes característiques amb un altre nombre d'ítems no es fan servir
+    dades.afegir_valoracions([(5000, 880001, 4.0)])
+    dades.fusionar_valoracions()
+    assert not recomenador_contingut(dades).carregar_caracteristiques(fitxer)
+
+
+# === RECOMANADOR PER ETIQUETES ===
+def test_tags_es_preparen_quan_cal(carpeta):
+    # Sense preparar() abans, puntuar construeix els vectors; sense etiquetes, res no es pot puntuar
+    dades = carregar(carpeta)
+    usuaris = np.arange(dades._ratings_matrix.shape[0])
+    tags = RecomanadorTags(dades)
+    assert tags.vectors_items is None and tags._sense_tags is None
+    assert np.all(tags.puntuacions_bloc(usuaris) == -np.inf)
+    dades.carregar_tags(carpeta + 'tags.csv')
+    scores = tags.puntuacions_bloc(usuaris)
+    assert tags.vectors_items.shape[0] == dades._ratings_matrix.shape[1]
+    preparat = RecomanadorTags(dades)
+    preparat.preparar()
+    assert np.array_equal(scores, preparat.puntuacions_bloc(usuaris))
+    sense_tags = np.diff(dades.get_matriu_tags_items().indptr) == 0
+    assert sense_tags.any() and np.all(scores[:, sense_tags] == -np.inf)
+    assert np.all(np.isfinite(scores[:, ~sense_tags]))
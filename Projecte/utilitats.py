@@ -0,0 +1,235 @@
+import os
+import time
+from itertools import islice
+import numpy as np
+import scipy.sparse as sp
+from typing import Iterable, List, Dict, Tuple
+
+# Peces compartides per Codi_Matrius i SHIT: lectura massiva, ingesta incremental i selecció top-n
+
+# === CÀRREGA MASSIVA DE VALORACIONS ===
+MIDA_BLOC = 1_000_000  # Línies per bloc en la lectura massiva
+
+def _parsejar_linies(linies: List[str], dtype, usecols: Tuple[int, ...]) -> Tuple[np.ndarray, int]:
+    # Parseja un bloc sencer amb NumPy; si hi ha línies mal formades es divideix
+    # el bloc per la meitat fins aïllar-les, de manera que només es descarten aquestes
+    try:
+        return np.loadtxt(linies, delimiter=',', quotechar='"', dtype=dtype, usecols=usecols, ndmin=1), 0
+    except ValueError:
+        if len(linies) == 1:
+            return np.empty(0, dtype=dtype), int(bool(linies[0].strip()))
+        meitat = len(linies) // 2
+        esquerra, rebutjades_e = _parsejar_linies(linies[:meitat], dtype, usecols)
+        dreta, rebutjades_d = _parsejar_linies(linies[meitat:], dtype, usecols)
+        return np.concatenate((esquerra, dreta)), rebutjades_e + rebutjades_d
+
+def _llegir_blocs(fitxer: str, dtype, usecols: Tuple[int, ...], mida_bloc: int = MIDA_BLOC):
+    # Genera (bloc_estructurat, línies_rebutjades) sense carregar tot el fitxer a memòria
+    try:
+        with open(fitxer, 'r', encoding='utf-8') as f:
+            next(f, None)  # Saltar capçalera
+            while True:
+                linies = list(islice(f, mida_bloc))
+                if not linies:
+                    break
+                yield _parsejar_linies(linies, dtype, usecols)
+    except OSError as e:
+        print(f"Error llegint {fitxer}: {str(e)}")
+
+def _index_ordenat(mapa: Dict) -> Tuple[np.ndarray, np.ndarray]:
+    # Claus ordenades + índex associat per fer cerques vectoritzades amb searchsorted
+    claus = np.array(list(mapa.keys()))
+    idx = np.fromiter(mapa.values(), dtype=np.int64, count=len(mapa))
+    ordre = np.argsort(claus, kind='stable')
+    return claus[ordre], idx[ordre]
+
+def _buscar_idx(claus: np.ndarray, idx: np.ndarray, valors: np.ndarray) -> np.ndarray:
+    # Índex de cada valor o -1 si no existeix
+    if claus.size == 0 or valors.size == 0:
+        return np.full(valors.size, -1, dtype=np.int64)
+    pos = np.minimum(np.searchsorted(claus, valors), claus.size - 1)
+    return np.where(claus[pos] == valors, idx[pos], -1)
+
+def _mostrar_informe(fitxer: str, informe: Dict[str, int]):
+    print(f"{os.path.basename(fitxer)}: {informe['acceptades']} valoracions carregades, "
+          f"descartades {informe['format']} per format, {informe['rang']} fora de rang "
+          f"i {informe['desconeguts']} d'usuaris o ítems desconeguts")
+
+def _llegir_valoracions_massiu(path: str, user_id_to_idx: Dict, item_id_to_idx: Dict, dtype_item, valida_rang,
+                               mida_bloc: int = MIDA_BLOC) -> Tuple[Tuple[np.ndarray, np.ndarray, np.ndarray], Dict[str, int]]:
+    # Lectura per blocs en arrays tipats: validació de rang amb màscares i
+    # traducció d'ids a índexs amb searchsorted sobre els ids ordenats.
+    # Retorna (files, columnes, valors) i l'informe de valoracions acceptades i descartades
+    claus_u, idx_u = _index_ordenat(user_id_to_idx)
+    claus_i, idx_i = _index_ordenat(item_id_to_idx)
+    dtype = [('user', np.int64), ('item', dtype_item), ('rating', np.float32)]
+    rows, cols, vals = [], [], []
+    informe = {'acceptades': 0, 'format': 0, 'rang': 0, 'desconeguts': 0}
+    for bloc, rebutjades in _llegir_blocs(path, dtype, (0, 1, 2), mida_bloc):
+        informe['format'] += rebutjades
+        en_rang = valida_rang(bloc['rating'])
+        informe['rang'] += int(np.count_nonzero(~en_rang))
+        bloc = bloc[en_rang]
+        u = _buscar_idx(claus_u, idx_u, bloc['user'])
+        i = _buscar_idx(claus_i, idx_i, bloc['item'])
+        coneguts = (u >= 0) & (i >= 0)
+        informe['desconeguts'] += int(np.count_nonzero(~coneguts))
+        rows.append(u[coneguts])
+        cols.append(i[coneguts])
+        vals.append(bloc['rating'][coneguts])
+    rows = np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+    cols = np.concatenate(cols) if cols else np.empty(0, dtype=np.int64)
+    vals = np.concatenate(vals) if vals else np.empty(0, dtype=np.float32)
+    informe['acceptades'] = int(vals.size)
+    _mostrar_informe(path, informe)
+    return (rows, cols, vals), informe
+
+def _dtype_isbn(item_id_to_idx: Dict) -> str:
+    # Amplada suficient perquè un ISBN truncat no pugui coincidir amb cap clau
+    return 'U%d' % (max((len(str(k)) for k in item_id_to_idx), default=1) + 1)
+
+# === INGESTA INCREMENTAL ===
+MIN_PENDENTS_FUSIO = 10_000  # Valoracions pendents a partir de les quals es fusionen amb la matriu base
+FRACCIO_PENDENTS_FUSIO = 0.01  # ... o, si és més gran, aquesta fracció de les valoracions de la base
+
+class IngestaIncremental:
+    # Part comuna de la ingesta de les classes Dades: el buffer de pendents (user_idx, item_idx) ->
+    # valoració i l'assignació d'índexs nous. Cada Dades aporta _usuari_nou, _registrar_items_nous,
+    # _ampliar_matriu, _valoracions_afegides, fusionar_valoracions i get_rating_matrix_csr
+    _valorats_pendents = None  # Matriu (usuaris x ítems) amb l'estructura dels pendents, per a get_valorats
+
+    def afegir_valoracions(self, batch: Iterable[Tuple]) -> int:
+        """Afegeix valoracions (user_id, item_id, valoració[, timestamp]) sense reconstruir la matriu.
+
+        Les valoracions van al buffer de pendents, que es fusiona amb la matriu base quan supera
+        el llindar o amb fusionar_valoracions(). Els usuaris i ítems nous reben l'índex següent
+        sense renumerar els existents. Sense timestamp es pren el més recent de les dades
+        (_timestamp_per_defecte), no l'hora actual: amb dades històriques l'hora actual faria que
+        el decaïment per recència només donés pes a les valoracions ingerides. Retorna el nombre
+        de valoracions acceptades."""
+        num_files, num_columnes = self._ratings_matrix.shape
+        ara = self._timestamp_per_defecte()
+        files, columnes, valors, anteriors, timestamps = [], [], [], [], []
+        nous_ids = []
+        for linia in batch:
+            try:
+                user_id, item_id, rating = int(linia[0]), self._convertir_item_id(linia[1]), float(linia[2])
+                timestamp = int(linia[3]) if len(linia) > 3 else ara
+            except (ValueError, TypeError, IndexError):
+                print(f"Valoració invàlida: {linia}")
+                continue
+            if not self._valoracio_valida(rating):
+                continue
+            user_idx = self._user_id_to_idx.get(user_id)
+            if user_idx is None:
+                user_idx = num_files
+                num_files += 1
+                self._user_id_to_idx[user_id] = user_idx
+                self._users.setdefault(user_id, self._usuari_nou(user_id))
+            item_idx = self._item_id_to_idx.get(item_id)
+            if item_idx is None:
+                item_idx = num_columnes
+                num_columnes += 1
+                self._item_id_to_idx[item_id] = item_idx
+                nous_ids.append(item_id)
+            clau = (user_idx, item_idx)
+            # NaN: la valoració anterior (si n'hi ha) és a la matriu base
+            anteriors.append(self._pendents.get(clau, np.nan))
+            self._pendents[clau] = rating
+            files.append(user_idx)
+            columnes.append(item_idx)
+            valors.append(rating)
+            timestamps.append(timestamp)
+
+        if nous_ids:
+            ids = np.empty(len(nous_ids), dtype=object)
+            ids[:] = nous_ids
+            self._idx_to_item_id = np.concatenate([self._idx_to_item_id, ids])
+            self._registrar_items_nous(nous_ids)
+        if (num_files, num_columnes) != self._ratings_matrix.shape:
+            self._ampliar_matriu(num_files, num_columnes)
+        if not valors:
+            return 0
+        self._valorats_pendents = None
+        self._valoracions_afegides(np.asarray(files, dtype=np.int64), np.asarray(columnes, dtype=np.int64),
+                                   np.asarray(valors, dtype=np.float64), np.asarray(anteriors, dtype=np.float64),
+                                   np.asarray(timestamps, dtype=np.int64))
+        if len(self._pendents) >= max(MIN_PENDENTS_FUSIO, FRACCIO_PENDENTS_FUSIO * self._ratings_matrix.nnz):
+            self.fusionar_valoracions()
+        return len(valors)
+
+    def _timestamp_per_defecte(self) -> int:
+        # Timestamp de les valoracions que arriben sense; les classes amb timestamps hi posen el
+        # més recent de les seves dades
+        return int(time.time())
+
+    def _valoracions_afegides(self, files: np.ndarray, columnes: np.ndarray, valors: np.ndarray,
+                              anteriors: np.ndarray, timestamps: np.ndarray):
+        # Valoracions que acaben d'entrar al buffer, per si la classe en manté estadístiques
+        pass
+
+    def get_valorats(self, user_idxs) -> sp.csr_matrix:
+        # Files CSR amb els ítems que cada usuari ja ha valorat, incloses les valoracions encara
+        # pendents de fusionar, per no recomanar-los. Només n'és significativa l'estructura
+        files = self.get_rating_matrix_csr()[user_idxs]
+        if not self._pendents:
+            return files
+        if self._valorats_pendents is None:
+            files_p, columnes_p, _ = self._claus_pendents()
+            self._valorats_pendents = sp.csr_matrix((np.ones(files_p.size, dtype=np.int8), (files_p, columnes_p)),
+                                                    shape=self._ratings_matrix.shape)
+        pendents = self._valorats_pendents[user_idxs]
+        unio_files = np.concatenate([np.repeat(np.arange(files.shape[0]), np.diff(files.indptr)),
+                                     np.repeat(np.arange(pendents.shape[0]), np.diff(pendents.indptr))])
+        unio_columnes = np.concatenate([files.indices, pendents.indices])
+        return sp.csr_matrix((np.ones(unio_files.size, dtype=np.int8), (unio_files, unio_columnes)),
+                             shape=files.shape)
+
+    def _claus_pendents(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # Files, columnes i valors del buffer de pendents en l'ordre d'inserció
+        claus = np.fromiter((x for clau in self._pendents for x in clau), dtype=np.int64,
+                            count=2 * len(self._pendents)).reshape(-1, 2)
+        valors = np.fromiter(self._pendents.values(), dtype=np.float64, count=len(self._pendents))
+        return claus[:, 0], claus[:, 1], valors
+
+# === SELECCIÓ TOP-N ===
+MAX_ELEMENTS_BLOC = 1 << 24  # Mida màxima (usuaris x columnes) dels blocs densos en lot
+
+def _mida_bloc(columnes: int) -> int:
+    return max(1, min(256, MAX_ELEMENTS_BLOC // max(columnes, 1)))
+
+def _top_n_files(scores: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    # Top-n per files amb selecció parcial: scores (b, m) amb -inf als ítems no candidats.
+    # Retorna índexs (b, n) i puntuacions, amb -1 / NaN on no hi ha prou candidats
+    b, m = scores.shape
+    n_ef = min(n, m)
+    indexos = np.full((b, n), -1, dtype=np.int32)
+    valors = np.full((b, n), np.nan, dtype=scores.dtype if scores.dtype.kind == 'f' else np.float32)
+    if b == 0 or n_ef <= 0:
+        return indexos, valors
+    llindar = -np.partition(-scores, n_ef - 1, axis=1)[:, n_ef - 1]
+    majors = scores > llindar[:, None]
+    iguals = scores == llindar[:, None]
+    falten = n_ef - majors.sum(axis=1)
+    # Entre empats al llindar es queden els d'índex més baix, com en un sort estable
+    seleccio = majors | (iguals & (np.cumsum(iguals, axis=1) <= falten[:, None]))
+    columnes = np.nonzero(seleccio)[1].reshape(b, n_ef)
+    seleccionats = np.take_along_axis(scores, columnes, axis=1)
+    ordre = np.lexsort((columnes, -seleccionats), axis=1)
+    columnes = np.take_along_axis(columnes, ordre, axis=1)
+    seleccionats = np.take_along_axis(seleccionats, ordre, axis=1)
+    valids = np.isfinite(seleccionats)
+    indexos[:, :n_ef] = np.where(valids, columnes, -1)
+    valors[:, :n_ef] = np.where(valids, seleccionats, np.nan)
+    return indexos, valors
+
+def _top_n_fila(scores: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    # _top_n_files per a un sol vector, sense el farciment: només els candidats trobats
+    indexos, valors = _top_n_files(scores[None, :], n)
+    valids = indexos[0] >= 0
+    return indexos[0][valids], valors[0][valids]
+
+def _top_n_no_valorats(scores: np.ndarray, valorats: sp.csr_matrix, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    # Top-n per files excloent els ítems valorats (files de la matriu CSR del mateix bloc)
+    scores[np.repeat(np.arange(scores.shape[0]), np.diff(valorats.indptr)), valorats.indices] = -np.inf
+    return _top_n_files(scores, n)